@@ -195,6 +195,37 @@ UNFOLD_SETTINGS = {
 
 CART_SESSION_ID = 'cart'
 
+# Caches
+# 'availability': versioned availability results (rentals/services/availability_cache.py).
+# LocMemCache evicts least-recently-used keys; CULL_FREQUENCY=10 drops the oldest 10% when full.
+# 'dashboard': DashboardSnapshot (rentals/services/dashboard_snapshot.py). Must be shared by every
+# process (web workers + the warm_dashboard_stats cron) so invalidation and the recompute lock work
+# across them -> database cache (table created by migration 0030 / python manage.py createcachetable).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'availability': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'availability',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    'dashboard': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'rentals_dashboard_cache',
+    },
+}
+
+# Dashboard stats snapshot lifetime (invalidated early when bookings/products change)
+DASHBOARD_SNAPSHOT_SECONDS = 30
+
+# Cart holds (StockHold) and unconfirmed drafts stop blocking stock after these periods
+STOCK_HOLD_MINUTES = 20
+DRAFT_EXPIRY_DAYS = 3
+
 # Media files (User uploaded)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
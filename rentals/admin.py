@@ -6,12 +6,13 @@ from django.http import HttpResponse
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.db.models import Q
-from django.db import models # Fix missing import
+from django.db import models, transaction # Fix missing import
 
 from .models import Staff, Equipment, Studio, Booking, IssueReport, Product, BookingItem, Package, PackageItem, Notification
 
 from .forms import BookingAdminForm, EquipmentAdminForm, StudioAdminForm, StaffAdminForm  # Forms ปรับแต่ง
 from .services.notify import send_line_notify # Integrity Service
+from .services.ics_feed import IcsFeedService
 
 
 
@@ -28,10 +29,12 @@ class StaffAdmin(ModelAdmin, SimpleHistoryAdmin):
     search_fields = ['name', 'phone', 'position']
     ordering = ['name']
     
+    readonly_fields = ['ics_feed_link']
+    
     # จัดกลุ่มฟิลด์ด้วย Tabs ของ Unfold
     fieldsets = (
         ('👤 ข้อมูลพนักงาน', {
-            'fields': (('name', 'position'), 'phone', 'is_active'),
+            'fields': (('name', 'position'), 'phone', 'is_active', 'ics_feed_link'),
             'description': 'ข้อมูลเบื้องต้นของพนักงาน',
             'classes': ('tab',), 
         }),
@@ -49,6 +52,15 @@ class StaffAdmin(ModelAdmin, SimpleHistoryAdmin):
         )
     is_active_display.short_description = 'สถานะ'
 
+    def ics_feed_link(self, obj):
+        if not obj or not obj.pk:
+            return '-'
+        return format_html(
+            '<a href="{0}" target="_blank">📅 {0}</a><div class="text-xs text-gray-500">คัดลอกลิงก์นี้ไปเพิ่มในแอปปฏิทิน (Subscribe)</div>',
+            IcsFeedService.feed_url('staff', obj.pk)
+        )
+    ics_feed_link.short_description = 'ปฏิทิน (ICS)'
+
     def edit_button(self, obj):
         return format_html(
             '<a href="{}/change/" class="bg-blue-600 text-white px-3 py-1 rounded hover:bg-blue-700 font-bold text-xs" style="text-decoration: none;">✏️ แก้ไข</a>',
@@ -277,7 +289,7 @@ class StudioAdmin(ModelAdmin, SimpleHistoryAdmin):
     list_display_links = ['name', 'daily_rate', 'created_by']
     search_fields = ['name']
     ordering = ['name']
-    readonly_fields = ['created_by']
+    readonly_fields = ['created_by', 'ics_feed_link']
     
     fieldsets = (
         ('🎬 ข้อมูลสตูดิโอ', {
@@ -285,11 +297,20 @@ class StudioAdmin(ModelAdmin, SimpleHistoryAdmin):
             'classes': ('tab',),
         }),
         ('⚙️ ข้อมูลระบบ', {
-            'fields': ('created_by',),
+            'fields': ('created_by', 'ics_feed_link'),
             'classes': ('tab',),
         }),
     )
 
+    def ics_feed_link(self, obj):
+        if not obj or not obj.pk:
+            return '-'
+        return format_html(
+            '<a href="{0}" target="_blank">📅 {0}</a><div class="text-xs text-gray-500">คัดลอกลิงก์นี้ไปเพิ่มในแอปปฏิทิน (Subscribe)</div>',
+            IcsFeedService.feed_url('studio', obj.pk)
+        )
+    ics_feed_link.short_description = 'ปฏิทิน (ICS)'
+
     def edit_button(self, obj):
         return format_html(
             '<a href="{}/change/" class="bg-blue-600 text-white px-3 py-1 rounded hover:bg-blue-700 font-bold text-xs" style="text-decoration: none;">✏️ แก้ไข</a>',
@@ -434,7 +455,7 @@ class BookingAdmin(ModelAdmin, SimpleHistoryAdmin):
     )
     
     # กำหนด actions ที่จะแสดงใน dropdown
-    actions = ['print_quotation', 'approve_bookings']
+    actions = ['print_quotation', 'approve_bookings', 'auto_assign_serials']
     
     def save_model(self, request, obj, form, change):
         if not obj.created_by:
@@ -502,6 +523,7 @@ class BookingAdmin(ModelAdmin, SimpleHistoryAdmin):
             'active': ('#dbeafe', '#1e40af'),         # Blue-100, Blue-800
             'completed': ('#3730a3', '#ffffff'),      # Indigo-800, White
             'problem': ('#fee2e2', '#991b1b'),        # Red-100, Red-800
+            'expired': ('#f3f4f6', '#9ca3af'),        # Gray-100, Gray-400
         }
         
         bg, text = styles.get(obj.status, ('#e5e7eb', '#374151'))
@@ -665,14 +687,15 @@ class BookingAdmin(ModelAdmin, SimpleHistoryAdmin):
     # Removed independent Media class to rely on direct injection
 
     def calculate_total_price_display(self, obj):
-        """แสดงราคารวมในรูปแบบเงินบาท"""
-        total = obj.calculate_total_price()
+        """แสดงราคารวมในรูปแบบเงินบาท (ใช้ยอดที่บันทึกไว้ ไม่ Query ทีละแถวในหน้ารายการ)"""
+        total = obj.total_amount
         # แปลงเป็น float ก่อนส่งเข้า format_html เพื่อหลีกเลี่ยง ValueError
         return format_html(
             '<span style="color: green; font-weight: bold;">฿{}</span>',
             f'{float(total):,.2f}'
         )
     calculate_total_price_display.short_description = 'ราคารวม'
+    calculate_total_price_display.admin_order_field = 'total_amount'
     
     def edit_button(self, obj):
         return format_html(
@@ -883,9 +906,40 @@ class BookingAdmin(ModelAdmin, SimpleHistoryAdmin):
         """
         Action อนุมัติการจองทีละหลายรายการ
         """
-        # อนุมัติเฉพาะที่ยังเป็น draft
+        from .services.availability import AvailabilityService
+
+        # อนุมัติเฉพาะที่ยังเป็น draft และไม่มีทรัพยากรชนกับการจองอื่น
+        # (อนุมัติทีละรายการ เพื่อให้รายการที่อนุมัติก่อนหน้าถูกนับเป็นการจองที่ Block แล้ว)
         draft_bookings = queryset.filter(status='draft')
-        count = draft_bookings.update(status='approved')
+        count = 0
+        for booking_id in draft_bookings.values_list('pk', flat=True):
+            with transaction.atomic():
+                # ยังเป็น Draft อยู่หรือไม่ (กันการอนุมัติซ้ำจากอีกหน้าต่าง) - ใช้แถวที่ล็อกแล้ว (วันเวลาล่าสุด)
+                booking = Booking.objects.select_for_update().filter(pk=booking_id, status='draft').first()
+                if booking is None:
+                    continue
+                # ล็อกทรัพยากรของรายการนี้ก่อนตรวจชน: การอนุมัติอื่นที่ใช้ทรัพยากรเดียวกันต้องรอจน Commit
+                # แล้วจึงเห็นรายการนี้เป็นการจองที่ Block แล้ว (ล็อกเรียงตาม pk กัน Deadlock)
+                conflicts = AvailabilityService.check_resource_overlaps(
+                    booking.start_time, booking.end_time,
+                    equipment=Equipment.objects.select_for_update(of=('self',)).select_related('product')
+                                               .filter(bookings=booking).order_by('pk'),
+                    studios=Studio.objects.select_for_update().filter(bookings=booking).order_by('pk'),
+                    staff=Staff.objects.select_for_update().filter(bookings=booking).order_by('pk'),
+                    exclude_booking_id=booking.pk
+                )
+                if conflicts:
+                    self.message_user(
+                        request,
+                        f"ไม่อนุมัติ #{booking.id} ({booking.customer_name}): "
+                        + "; ".join(AvailabilityService.conflict_message(conflict) for conflict in conflicts),
+                        level='error'
+                    )
+                    continue
+                # save() ไม่ใช่ update(): Signals อัปเดต ProductDayLoad / ยอดรายวัน / Dashboard และขยับ updated_at (ICS, ETag)
+                booking.status = 'approved'
+                booking.save(update_fields=['status', 'updated_at'])
+            count += 1
         
         # แสดงข้อความแจ้งผู้ใช้
         if count == 0:
@@ -903,6 +957,32 @@ class BookingAdmin(ModelAdmin, SimpleHistoryAdmin):
     
     approve_bookings.short_description = "✅ อนุมัติการจองที่เลือก"
 
+    def auto_assign_serials(self, request, queryset):
+        """
+        Action จัด Serial Number อัตโนมัติให้การจองที่อนุมัติแล้ว
+        """
+        from .services.assignment import SerialAssignmentService
+
+        bookings = list(queryset.filter(status='approved').values_list('id', 'start_time', 'end_time'))
+        if not bookings:
+            self.message_user(request, "ไม่มีการจองที่อนุมัติแล้วในรายการที่เลือก", level='warning')
+            return
+
+        assignments, shortages = SerialAssignmentService.assign(
+            min(start for _, start, _ in bookings),
+            max(end for _, _, end in bookings),
+            booking_ids=[booking_id for booking_id, _, _ in bookings]
+        )
+        self.message_user(request, f"จัด Serial อัตโนมัติสำเร็จ {len(assignments)} ชิ้น", level='success')
+        for booking_id, product_id, missing in shortages:
+            product = Product.objects.filter(pk=product_id).first()
+            self.message_user(
+                request,
+                f"การจอง #{booking_id}: Serial ของ '{product}' ไม่พอ (ขาด {missing} ชิ้น)",
+                level='warning'
+            )
+    auto_assign_serials.short_description = "🔢 จัด Serial Number อัตโนมัติ"
+
     class Media:
         css = {
             "all": ("rentals/css/admin_theme_v100.css",)
@@ -1,6 +1,6 @@
 from django.contrib import admin as django_admin
-from django.utils import timezone
-from rentals.models import Booking, Equipment, Staff
+from rentals.models import Booking
+from rentals.services.dashboard_snapshot import DashboardSnapshot
 
 class CustomAdminSite(django_admin.AdminSite):
     """
@@ -14,32 +14,14 @@ class CustomAdminSite(django_admin.AdminSite):
         """
         Override index to show custom dashboard with stats
         """
-        from rentals.models import Booking, Equipment, Staff, Studio
-        from django.utils import timezone
-        
-        today = timezone.now().date()
-        
-        # Stats
+        stats_data = DashboardSnapshot.get_stats()
         stats = {
-            'bookings_today': Booking.objects.filter(start_time__date=today).count(),
-            'bookings_pending': Booking.objects.filter(status='draft').count(),
-            'bookings_this_month': Booking.objects.filter(
-                start_time__year=today.year,
-                start_time__month=today.month
-            ).count(),
-            'equipment_total': Equipment.objects.count(),
-            'equipment_available': Equipment.objects.filter(status='available').count(),
-            'equipment_maintenance': Equipment.objects.filter(status='maintenance').count(),
-            'studio_total': Studio.objects.count(),
-            'staff_active': Staff.objects.filter(is_active=True).count(),
-            'revenue_this_month': sum(
-                booking.calculate_total_price()
-                for booking in Booking.objects.filter(
-                    start_time__year=today.year,
-                    start_time__month=today.month,
-                    status__in=['approved', 'completed']
-                )
-            ),
+            key: stats_data[key]
+            for key in (
+                'bookings_today', 'bookings_pending', 'bookings_this_month',
+                'equipment_total', 'equipment_available', 'equipment_maintenance',
+                'studio_total', 'staff_active', 'revenue_this_month',
+            )
         }
         
         # Recent bookings
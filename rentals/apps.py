@@ -8,3 +8,7 @@ class RentalsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rentals'
     verbose_name = 'ระบบจัดการการเช่า MCOT'
+
+    def ready(self):
+        # ลงทะเบียน Signals สำหรับตารางสรุป (ProductDayLoad ฯลฯ)
+        from . import signals  # noqa: F401
@@ -1,6 +1,8 @@
 from decimal import Decimal
 from django.conf import settings
-from .models import Product
+from .models import Product, Package
+
+PACKAGE_KEY_PREFIX = 'package-'
 
 class Cart:
     def __init__(self, request):
@@ -28,6 +30,31 @@ class Cart:
             self.cart[product_id]['quantity'] += quantity
         self.save()
 
+    def add_package(self, package, quantity=1, update_quantity=False):
+        """
+        Add a package (bundle) to the cart or update its quantity.
+        Stored as its own line at the package price; expanded into
+        BookingItems only when the booking is created.
+        """
+        key = f"{PACKAGE_KEY_PREFIX}{package.id}"
+        if key not in self.cart:
+            self.cart[key] = {'quantity': 0, 'price': str(package.price)}
+
+        if update_quantity:
+            self.cart[key]['quantity'] = quantity
+        else:
+            self.cart[key]['quantity'] += quantity
+        self.save()
+
+    def remove_package(self, package):
+        """
+        Remove a package from the cart.
+        """
+        key = f"{PACKAGE_KEY_PREFIX}{package.id}"
+        if key in self.cart:
+            del self.cart[key]
+            self.save()
+
     def remove(self, product):
         """
         Remove a product from the cart.
@@ -41,13 +68,19 @@ class Cart:
         """
         Iterate over the items in the cart and get the products from the database.
         """
-        product_ids = self.cart.keys()
+        product_ids = [key for key in self.cart.keys() if not key.startswith(PACKAGE_KEY_PREFIX)]
+        package_ids = [key[len(PACKAGE_KEY_PREFIX):] for key in self.cart.keys() if key.startswith(PACKAGE_KEY_PREFIX)]
         products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
+        # Copy each line too: Product/Decimal objects must never end up in the (JSON) session
+        cart = {key: item.copy() for key, item in self.cart.items()}
         
         for product in products:
             cart[str(product.id)]['product'] = product
 
+        if package_ids:
+            for package in Package.objects.filter(id__in=package_ids).prefetch_related('items__product'):
+                cart[f"{PACKAGE_KEY_PREFIX}{package.id}"]['package'] = package
+
         for item in cart.values():
             item['price'] = Decimal(item['price'])
             item['total_price'] = item['price'] * item['quantity']
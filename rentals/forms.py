@@ -119,43 +119,32 @@ class BookingAdminForm(forms.ModelForm):
             self.add_error('end_time', "วันเวลาสิ้นสุดต้องมากกว่าวันเวลาเริ่มต้น")
 
         # 2. ตรวจสอบ M2M (ใช้ข้อมูลจาก cleaned_data)
+        # รวบรวม Error ทั้งหมดแล้วแจ้งทีเดียว (ไม่หยุดที่รายการแรก)
+        errors = []
         
         # ตรวจสอบสถานะอุปกรณ์ (Maintenance/Lost)
         for equip in equipment:
             equip_name = equip.product.name if equip.product else "Unknown"
             if equip.status == 'maintenance':
-                raise forms.ValidationError(f"อุปกรณ์ '{equip_name} - {equip.serial_number}' ซ่อมบำรุง (Maintenance)")
+                errors.append(f"อุปกรณ์ '{equip_name} - {equip.serial_number}' ซ่อมบำรุง (Maintenance)")
             elif equip.status == 'lost':
-                raise forms.ValidationError(f"อุปกรณ์ '{equip_name} - {equip.serial_number}' สูญหาย (Lost)")
+                errors.append(f"อุปกรณ์ '{equip_name} - {equip.serial_number}' สูญหาย (Lost)")
 
-        # ตรวจสอบการจองซ้อน (Conflict) - ใช้ Service กลาง
+        # ตรวจสอบการจองซ้อน (Conflict) - ใช้ Service กลาง (1 Query ต่อประเภททรัพยากร)
         if start_time and end_time:
             from rentals.services.availability import AvailabilityService
             
-            # เช็คอุปกรณ์ชน
-            for equip in equipment:
-                is_valid, conflict = AvailabilityService.check_resource_overlap('equipment', equip, start_time, end_time, instance_pk)
-                if not is_valid:
-                    equip_name = equip.product.name if equip.product else "Unknown"
-                    raise forms.ValidationError(
-                        f"อุปกรณ์ '{equip_name} - {equip.serial_number}' ถูกจองแล้วในช่วงเวลานี้ (Booked by: {conflict.customer_name})"
-                    )
-            
-            # เช็คสตูดิโอชน
-            for studio in studios:
-                is_valid, conflict = AvailabilityService.check_resource_overlap('studios', studio, start_time, end_time, instance_pk)
-                if not is_valid:
-                    raise forms.ValidationError(
-                        f"สตูดิโอ '{studio.name}' ถูกจองแล้วในช่วงเวลานี้ (Booked by: {conflict.customer_name})"
-                    )
-                    
-            # เช็คพนักงานชน
-            for staff_member in staff:
-                is_valid, conflict = AvailabilityService.check_resource_overlap('staff', staff_member, start_time, end_time, instance_pk)
-                if not is_valid:
-                    raise forms.ValidationError(
-                         f"พนักงาน '{staff_member.name}' ติดงานแล้วในช่วงเวลานี้ (Booked by: {conflict.customer_name})"
-                    )
+            conflicts = AvailabilityService.check_resource_overlaps(
+                start_time, end_time,
+                equipment=equipment,
+                studios=studios,
+                staff=staff,
+                exclude_booking_id=instance_pk
+            )
+            errors.extend(AvailabilityService.conflict_message(conflict) for conflict in conflicts)
+
+        if errors:
+            raise forms.ValidationError(errors)
 
         return cleaned_data
 
@@ -0,0 +1,25 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rentals.services.assignment import SerialAssignmentService
+
+class Command(BaseCommand):
+    help = 'Automatically assign free Equipment serials to approved bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Planning horizon from now (days)')
+        parser.add_argument('--dry-run', action='store_true', help='Show the plan without saving it')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        assignments, shortages = SerialAssignmentService.assign(
+            now, now + timedelta(days=options['days']), dry_run=options['dry_run']
+        )
+
+        verb = 'Planned' if options['dry_run'] else 'Assigned'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(assignments)} serials'))
+
+        for booking_id, product_id, missing in shortages:
+            self.stdout.write(self.style.WARNING(
+                f'Booking #{booking_id}: missing {missing} unit(s) of product #{product_id}'
+            ))
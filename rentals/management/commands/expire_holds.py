@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from rentals.services.holds import StockHoldService
+
+class Command(BaseCommand):
+    help = 'Delete expired cart holds and expire stale draft bookings (run from cron every few minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--draft-days', type=int, default=None, help='Expire drafts untouched for this many days (default: DRAFT_EXPIRY_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per batch')
+
+    def handle(self, *args, **options):
+        holds_deleted, drafts_expired = StockHoldService.expire(
+            draft_days=options['draft_days'], batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {holds_deleted} expired holds, expired {drafts_expired} stale drafts'
+        ))
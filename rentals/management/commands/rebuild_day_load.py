@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from rentals.services.day_load import DayLoadService
+
+class Command(BaseCommand):
+    help = 'Rebuild the ProductDayLoad table from live bookings and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Only compare the stored table with live data, do not rewrite it',
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            rows = DayLoadService.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt ProductDayLoad: {rows} rows'))
+
+        mismatches = DayLoadService.verify()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('✅ ProductDayLoad matches live bookings'))
+            return
+
+        for product_id, day, stored, expected in mismatches[:50]:
+            self.stdout.write(self.style.WARNING(
+                f'Product #{product_id} {day}: stored={stored} expected={expected}'
+            ))
+        self.stdout.write(self.style.ERROR(f'❌ {len(mismatches)} mismatching rows'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from rentals.services.revenue_rollup import RevenueRollupService
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailyRevenueRollup table from live bookings and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Only compare the stored table with live data, do not rewrite it',
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            rows = RevenueRollupService.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt DailyRevenueRollup: {rows} rows'))
+
+        mismatches = RevenueRollupService.verify()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('✅ DailyRevenueRollup matches live bookings'))
+            return
+
+        for day, status, stored, expected in mismatches[:50]:
+            self.stdout.write(self.style.WARNING(
+                f'{day} {status}: stored={stored} expected={expected}'
+            ))
+        self.stdout.write(self.style.ERROR(f'❌ {len(mismatches)} mismatching rows'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from rentals.services.booking_totals import BookingTotalsService
+
+class Command(BaseCommand):
+    help = 'Backfill and verify the stored Booking totals (rental_days, subtotal, total_amount)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Only compare stored totals with computed ones, do not rewrite them',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Bookings per batch')
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            rows = BookingTotalsService.rebuild(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Recomputed totals for {rows} bookings'))
+
+        mismatches = BookingTotalsService.verify(batch_size=options['batch_size'])
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('✅ Stored booking totals match line items'))
+            return
+
+        for booking_id, stored, expected in mismatches[:50]:
+            self.stdout.write(self.style.WARNING(
+                f'Booking #{booking_id}: stored={stored} expected={expected}'
+            ))
+        self.stdout.write(self.style.ERROR(f'❌ {len(mismatches)} mismatching bookings'))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rentals.services.dashboard_snapshot import DashboardSnapshot
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached dashboard stats snapshot (run from cron, or with --interval as a loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0, help='Keep running and rebuild every N seconds (default: once)')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            stats = DashboardSnapshot.refresh()
+            self.stdout.write(self.style.SUCCESS(
+                f"Dashboard snapshot rebuilt for {stats['today']} ({stats['bookings_this_month']} bookings this month)"
+            ))
+            if interval <= 0:
+                break
+            time.sleep(interval)
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-18 09:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0018_alter_booking_status_alter_historicalbooking_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDayLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='วันที่')),
+                ('reserved', models.IntegerField(default=0, verbose_name='จำนวนที่ถูกจอง')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_loads', to='rentals.product')),
+            ],
+            options={
+                'verbose_name': 'ยอดจองรายวัน',
+                'verbose_name_plural': 'ยอดจองรายวัน',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productdayload',
+            constraint=models.UniqueConstraint(fields=('product', 'date'), name='unique_product_day_load'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-18 09:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0019_productdayload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='เวอร์ชันสต็อก'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.27 on 2026-10-18 09:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0020_product_stock_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('draft', 'สอบถาม / รอใบเสนอราคา (Draft)'), ('quotation_sent', 'ส่งใบเสนอราคาแล้ว (Quotation Sent)'), ('pending_deposit', 'รอชำระเงินมัดจำ (Waiting for Deposit)'), ('approved', 'ยืนยันแล้ว / รอรับของ (Approved)'), ('active', 'กำลังใช้งาน (Active)'), ('completed', 'จบงาน / คืนของแล้ว (Completed)'), ('problem', 'มีปัญหา / แจ้งซ่อม (Problem)'), ('expired', 'หมดอายุ / ไม่ได้ยืนยัน (Expired)')], default='draft', max_length=20, verbose_name='สถานะ'),
+        ),
+        migrations.AlterField(
+            model_name='historicalbooking',
+            name='status',
+            field=models.CharField(choices=[('draft', 'สอบถาม / รอใบเสนอราคา (Draft)'), ('quotation_sent', 'ส่งใบเสนอราคาแล้ว (Quotation Sent)'), ('pending_deposit', 'รอชำระเงินมัดจำ (Waiting for Deposit)'), ('approved', 'ยืนยันแล้ว / รอรับของ (Approved)'), ('active', 'กำลังใช้งาน (Active)'), ('completed', 'จบงาน / คืนของแล้ว (Completed)'), ('problem', 'มีปัญหา / แจ้งซ่อม (Problem)'), ('expired', 'หมดอายุ / ไม่ได้ยืนยัน (Expired)')], default='draft', max_length=20, verbose_name='สถานะ'),
+        ),
+        migrations.CreateModel(
+            name='StockHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_key', models.CharField(db_index=True, max_length=40, verbose_name='Session')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='จำนวน')),
+                ('start_time', models.DateTimeField(verbose_name='วันเวลาเริ่มต้น')),
+                ('end_time', models.DateTimeField(verbose_name='วันเวลาสิ้นสุด')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='หมดอายุ')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_holds', to='rentals.product', verbose_name='สินค้า')),
+            ],
+            options={
+                'verbose_name': 'การกันสต็อกชั่วคราว',
+                'verbose_name_plural': 'การกันสต็อกชั่วคราว',
+                'indexes': [models.Index(fields=['product', 'expires_at'], name='stock_hold_product_expiry')],
+            },
+        ),
+    ]
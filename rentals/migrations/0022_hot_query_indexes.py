@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-18 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0021_stockhold_booking_expired'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'end_time'], name='booking_status_end'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['start_time'], name='booking_start_time'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingitem',
+            index=models.Index(fields=['product', 'booking'], name='bookingitem_product_booking'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read'], name='notification_unread'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at'], name='notification_recent'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.27 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0022_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='rental_days',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='จำนวนวันเช่า'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='ราคาต่อวัน'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='ราคารวม'),
+        ),
+        migrations.AddField(
+            model_name='historicalbooking',
+            name='rental_days',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='จำนวนวันเช่า'),
+        ),
+        migrations.AddField(
+            model_name='historicalbooking',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='ราคาต่อวัน'),
+        ),
+        migrations.AddField(
+            model_name='historicalbooking',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='ราคารวม'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'start_time', 'total_amount'], name='booking_revenue'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0023_booking_stored_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='วันที่')),
+                ('status', models.CharField(choices=[('draft', 'สอบถาม / รอใบเสนอราคา (Draft)'), ('quotation_sent', 'ส่งใบเสนอราคาแล้ว (Quotation Sent)'), ('pending_deposit', 'รอชำระเงินมัดจำ (Waiting for Deposit)'), ('approved', 'ยืนยันแล้ว / รอรับของ (Approved)'), ('active', 'กำลังใช้งาน (Active)'), ('completed', 'จบงาน / คืนของแล้ว (Completed)'), ('problem', 'มีปัญหา / แจ้งซ่อม (Problem)'), ('expired', 'หมดอายุ / ไม่ได้ยืนยัน (Expired)')], max_length=20, verbose_name='สถานะ')),
+                ('booking_count', models.IntegerField(default=0, verbose_name='จำนวนการจอง')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='ยอดรวม')),
+            ],
+            options={
+                'verbose_name': 'สรุปรายได้รายวัน',
+                'verbose_name_plural': 'สรุปรายได้รายวัน',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrevenuerollup',
+            constraint=models.UniqueConstraint(fields=('date', 'status'), name='unique_revenue_rollup_day_status'),
+        ),
+    ]
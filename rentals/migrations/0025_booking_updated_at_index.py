@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-18 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0024_daily_revenue_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_at'], name='booking_updated_at'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+# สำเนา ณ ตอนสร้าง Migration (ห้าม import จาก services: โค้ดนั้นเปลี่ยนได้ภายหลัง)
+ACTIVE_STATUSES = ['draft', 'quotation_sent', 'pending_deposit', 'approved', 'active']
+
+
+def booking_days(start_time, end_time):
+    """Local calendar dates touched by [start_time, end_time) (ending at midnight excludes the next day)."""
+    if not start_time or not end_time or start_time >= end_time:
+        return []
+    first_day = timezone.localtime(start_time).date()
+    last_day = timezone.localtime(end_time - timedelta(microseconds=1)).date()
+    return [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+
+
+def rebuild_day_load(apps, schema_editor):
+    """
+    Fills ProductDayLoad for bookings created before the table existed
+    (same rule as DayLoadService.rebuild(), on the historical models).
+    """
+    BookingItem = apps.get_model('rentals', 'BookingItem')
+    ProductDayLoad = apps.get_model('rentals', 'ProductDayLoad')
+
+    expected = {}
+    rows = BookingItem.objects.filter(
+        booking__status__in=ACTIVE_STATUSES
+    ).values_list('product_id', 'quantity', 'booking__start_time', 'booking__end_time')
+    for product_id, quantity, start_time, end_time in rows.iterator(chunk_size=2000):
+        for day in booking_days(start_time, end_time):
+            key = (product_id, day)
+            expected[key] = expected.get(key, 0) + quantity
+
+    ProductDayLoad.objects.all().delete()
+    ProductDayLoad.objects.bulk_create(
+        [
+            ProductDayLoad(product_id=product_id, date=day, reserved=reserved)
+            for (product_id, day), reserved in expected.items() if reserved
+        ],
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0025_booking_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_day_load, migrations.RunPython.noop),
+    ]
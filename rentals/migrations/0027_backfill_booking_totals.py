@@ -0,0 +1,66 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations
+
+MICROSECONDS_PER_DAY = 24 * 3600 * 10 ** 6
+BATCH_SIZE = 500
+
+
+def rental_days(start_time, end_time):
+    """Booking.get_rental_days() at the time of this migration: whole days, rounded up, at least 1."""
+    if not start_time or not end_time:
+        return 1
+    duration = (end_time - start_time) // timedelta(microseconds=1)
+    return max(1, -(-duration // MICROSECONDS_PER_DAY))
+
+
+def backfill_booking_totals(apps, schema_editor):
+    """
+    Writes rental_days / subtotal / total_amount for bookings saved before the
+    columns existed, with the rules of Booking.objects.with_totals() computed on
+    the historical models (items; legacy equipment only when a booking has no
+    items; studios). Must run before the revenue rollup rebuild, which sums
+    total_amount.
+    """
+    Booking = apps.get_model('rentals', 'Booking')
+    BookingItem = apps.get_model('rentals', 'BookingItem')
+    EquipmentLink = Booking._meta.get_field('equipment').remote_field.through
+    StudioLink = Booking._meta.get_field('studios').remote_field.through
+
+    ids = list(Booking.objects.order_by('pk').values_list('pk', flat=True))
+    for index in range(0, len(ids), BATCH_SIZE):
+        batch = ids[index:index + BATCH_SIZE]
+        items, equipment, studios = {}, {}, {}
+        for booking_id, price, quantity in BookingItem.objects.filter(booking_id__in=batch).values_list(
+            'booking_id', 'price_at_booking', 'quantity'
+        ):
+            items[booking_id] = items.get(booking_id, Decimal(0)) + (price or 0) * quantity
+        for booking_id, price in EquipmentLink.objects.filter(
+            booking_id__in=batch, equipment__product__isnull=False
+        ).values_list('booking_id', 'equipment__product__price'):
+            equipment[booking_id] = equipment.get(booking_id, Decimal(0)) + price
+        for booking_id, rate in StudioLink.objects.filter(booking_id__in=batch).values_list('booking_id', 'studio__daily_rate'):
+            studios[booking_id] = studios.get(booking_id, Decimal(0)) + rate
+
+        updated = []
+        for booking in Booking.objects.filter(pk__in=batch).only('pk', 'start_time', 'end_time'):
+            # อุปกรณ์ (แบบเก่า) นับเฉพาะ Booking ที่ไม่มี BookingItem
+            subtotal = items[booking.pk] if booking.pk in items else equipment.get(booking.pk, Decimal(0))
+            subtotal += studios.get(booking.pk, Decimal(0))
+            booking.rental_days = rental_days(booking.start_time, booking.end_time)
+            booking.subtotal = subtotal
+            booking.total_amount = subtotal * booking.rental_days
+            updated.append(booking)
+        Booking.objects.bulk_update(updated, ['rental_days', 'subtotal', 'total_amount'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0026_rebuild_product_day_load'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_booking_totals, migrations.RunPython.noop),
+    ]
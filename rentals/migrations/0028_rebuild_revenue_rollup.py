@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def rebuild_revenue_rollup(apps, schema_editor):
+    """
+    Fills DailyRevenueRollup for existing bookings from the stored total_amount
+    backfilled in 0027: one row per (local start date, status), computed on the
+    historical models (same grouping as RevenueRollupService.rebuild()).
+    """
+    Booking = apps.get_model('rentals', 'Booking')
+    DailyRevenueRollup = apps.get_model('rentals', 'DailyRevenueRollup')
+
+    rollup = {}
+    rows = Booking.objects.exclude(start_time=None).values_list('start_time', 'status', 'total_amount')
+    for start_time, status, total_amount in rows.iterator(chunk_size=2000):
+        key = (timezone.localtime(start_time).date(), status)
+        count, revenue = rollup.get(key, (0, 0))
+        rollup[key] = (count + 1, revenue + (total_amount or 0))
+
+    DailyRevenueRollup.objects.all().delete()
+    DailyRevenueRollup.objects.bulk_create(
+        [
+            DailyRevenueRollup(date=day, status=status, booking_count=count, revenue=revenue)
+            for (day, status), (count, revenue) in rollup.items()
+        ],
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0027_backfill_booking_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_revenue_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0028_rebuild_revenue_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedRemoval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('staff', 'พนักงาน'), ('studio', 'สตูดิโอ')], max_length=10, verbose_name='ประเภท')),
+                ('resource_id', models.PositiveIntegerField(verbose_name='รหัสพนักงาน/สตูดิโอ')),
+                ('booking_id', models.PositiveIntegerField(verbose_name='รหัสการจอง')),
+                ('start_time', models.DateTimeField(verbose_name='วันเวลาเริ่มต้น')),
+                ('removed_at', models.DateTimeField(auto_now_add=True, verbose_name='ถอดออกเมื่อ')),
+            ],
+            options={
+                'verbose_name': 'ประวัติการถอดออกจากปฏิทิน',
+                'verbose_name_plural': 'ประวัติการถอดออกจากปฏิทิน',
+                'indexes': [models.Index(fields=['kind', 'resource_id', 'id'], name='feed_removal_resource')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0030_dashboard_cache_table'),
+    ]
+
+    operations = [
+        migrations.RenameModel(old_name='FeedRemoval', new_name='FeedChange'),
+        migrations.RenameField(model_name='feedchange', old_name='removed_at', new_name='created_at'),
+        migrations.RenameIndex(model_name='feedchange', new_name='feed_change_resource', old_name='feed_removal_resource'),
+        migrations.AlterModelOptions(
+            name='feedchange',
+            options={'verbose_name': 'ประวัติการเปลี่ยนแปลงปฏิทิน', 'verbose_name_plural': 'ประวัติการเปลี่ยนแปลงปฏิทิน'},
+        ),
+        migrations.AlterField(
+            model_name='feedchange',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='บันทึกเมื่อ'),
+        ),
+        migrations.AlterField(
+            model_name='feedchange',
+            name='kind',
+            field=models.CharField(blank=True, choices=[('staff', 'พนักงาน'), ('studio', 'สตูดิโอ')], default='', max_length=10, verbose_name='ประเภท'),
+        ),
+        migrations.AlterField(
+            model_name='feedchange',
+            name='resource_id',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='รหัสพนักงาน/สตูดิโอ'),
+        ),
+        migrations.AlterField(
+            model_name='feedchange',
+            name='start_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='วันเวลาเริ่มต้น'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.db.models import Q, F, Sum, Case, When, Exists, OuterRef, Subquery, Value, ExpressionWrapper
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from datetime import timedelta
 from simple_history.models import HistoricalRecords  # สำหรับ Audit Trail
 
 
@@ -77,6 +79,8 @@ class Product(models.Model):
     )
     quantity = models.IntegerField(default=1, verbose_name="จำนวนทั้งหมด")
     is_active = models.BooleanField(default=True, verbose_name="เปิดให้เช่า")
+    # เพิ่มค่าทุกครั้งที่มีการจองสต็อก ใช้เป็นตัวล็อกรายสินค้าตอน Checkout (ดู BookingService.reserve_booking_from_cart)
+    stock_version = models.PositiveIntegerField(default=0, editable=False, verbose_name="เวอร์ชันสต็อก")
 
     class Meta:
         verbose_name = "สินค้า (Product)"
@@ -209,6 +213,70 @@ class Studio(models.Model):
         return f"{self.name} (฿{self.daily_rate:,.0f}/วัน)"
 
 
+MONEY_FIELD = models.DecimalField(max_digits=14, decimal_places=2)
+MICROSECONDS_PER_DAY = 24 * 3600 * 10 ** 6
+
+
+class RentalDays(models.Func):
+    """
+    จำนวนวันเช่า (ปัดขึ้น, อย่างน้อย 1 วัน) จาก Duration end_time - start_time
+    ให้ผลเหมือน Booking.get_rental_days() ใน Python
+    """
+    output_field = models.IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Duration ของ SQLite เป็นไมโครวินาที (จำนวนเต็ม) -> หารปัดขึ้นด้วยเลขจำนวนเต็ม
+        return self.as_sql(
+            compiler, connection,
+            template=f'MAX(1, (%(expressions)s + {MICROSECONDS_PER_DAY - 1}) / {MICROSECONDS_PER_DAY})',
+            **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='GREATEST(1, CEIL(EXTRACT(EPOCH FROM %(expressions)s) / 86400))::integer',
+            **extra_context
+        )
+
+
+class BookingQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        คำนวณราคารวมใน Database (ไม่ต้องวนลูป Query ทีละ Booking) เพิ่มฟิลด์:
+            computed_rental_days, items_subtotal, equipment_subtotal (แบบเก่า: ไม่มี BookingItem),
+            studio_subtotal, total_price
+        total_price ตรงกับ Booking.calculate_total_price() และใช้กับ aggregate(Sum('total_price')) ได้
+        """
+        items = BookingItem.objects.filter(booking=OuterRef('pk')).order_by().values('booking')
+        equipment = Booking.equipment.through.objects.filter(
+            booking=OuterRef('pk'), equipment__product__isnull=False
+        ).order_by().values('booking')
+        studios = Booking.studios.through.objects.filter(booking=OuterRef('pk')).order_by().values('booking')
+
+        def subtotal(rows, expression):
+            return Coalesce(
+                Subquery(rows.annotate(subtotal=Sum(expression, output_field=MONEY_FIELD)).values('subtotal')[:1]),
+                Value(0), output_field=MONEY_FIELD
+            )
+
+        return self.annotate(
+            computed_rental_days=RentalDays(ExpressionWrapper(F('end_time') - F('start_time'), output_field=models.DurationField())),
+            items_subtotal=subtotal(items, F('price_at_booking') * F('quantity')),
+            equipment_subtotal=Case(
+                When(Exists(items), then=Value(0)),
+                default=subtotal(equipment, F('equipment__product__price')),
+                output_field=MONEY_FIELD
+            ),
+            studio_subtotal=subtotal(studios, F('studio__daily_rate')),
+        ).annotate(
+            total_price=ExpressionWrapper(
+                (F('items_subtotal') + F('equipment_subtotal') + F('studio_subtotal')) * F('computed_rental_days'),
+                output_field=MONEY_FIELD
+            )
+        )
+
+
 class Booking(models.Model):
     """
     โมเดลสำหรับจัดการการจองอุปกรณ์ สตูดิโอ และพนักงาน
@@ -225,6 +293,7 @@ class Booking(models.Model):
         ('active', 'กำลังใช้งาน (Active)'),
         ('completed', 'จบงาน / คืนของแล้ว (Completed)'),
         ('problem', 'มีปัญหา / แจ้งซ่อม (Problem)'),
+        ('expired', 'หมดอายุ / ไม่ได้ยืนยัน (Expired)'),
     ]
     
     customer_name = models.CharField(max_length=200, verbose_name="ชื่อลูกค้า")
@@ -260,6 +329,13 @@ class Booking(models.Model):
         verbose_name="จองโดย"
     )
     
+    # ยอดรวมที่บันทึกไว้ (Denormalized) - อัปเดตอัตโนมัติผ่าน Signals (rentals/signals.py)
+    # ใช้สำหรับ Dashboard/รายงาน: Sum('total_amount') แทนการคำนวณจากรายการทุกครั้ง
+    # ตรวจสอบ/สร้างใหม่ได้ด้วยคำสั่ง: python manage.py recompute_booking_totals
+    rental_days = models.PositiveIntegerField(default=1, editable=False, verbose_name="จำนวนวันเช่า")
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False, verbose_name="ราคาต่อวัน")
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False, verbose_name="ราคารวม")
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="สร้างเมื่อ")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="แก้ไขล่าสุด")
@@ -284,50 +360,85 @@ class Booking(models.Model):
         related_name='bookings'
     )
     
+    objects = BookingQuerySet.as_manager()
+
+    def get_rental_days(self):
+        """
+        จำนวนวันเช่า (ปัดขึ้นเป็นวัน อย่างน้อย 1 วัน)
+        """
+        duration = self.end_time - self.start_time
+        return max(1, -(-(duration // timedelta(microseconds=1)) // MICROSECONDS_PER_DAY))
+
     def calculate_total_price(self):
         """
-        คำนวณราคารวม (Estimate)
+        คำนวณราคารวม (Estimate) ตามลำดับ:
+        1. total_amount ที่บันทึกไว้ (ถ้าโหลดฟิลด์นี้มา) - Signals อัปเดตใน Database ทุกครั้งที่รายการ/สตูดิโอ/อุปกรณ์เปลี่ยน
+           Instance ที่โหลดไว้ก่อนการเปลี่ยนแปลงจะเห็นค่าเดิม: ใช้ refresh_from_db()
+        2. total_price จาก Booking.objects.with_totals() (เช่น โหลดด้วย .defer('total_amount'))
+        3. คำนวณจากรายการ (Query เพิ่ม)
         """
         if not self.start_time or not self.end_time:
             return 0
-            
-        duration = self.end_time - self.start_time
-        days = duration.total_seconds() / (24 * 3600)
-        days = int(days) + (1 if days % 1 > 0 else 0) or 1
-        
-        total = 0
-        # Items
-        for item in self.items.all():
-            total += (item.price_at_booking or 0) * item.quantity
-            
-        # Studios
-        for studio in self.studios.all():
-            total += studio.daily_rate
-            
-        return total * days
+
+        if self.pk and 'total_amount' not in self.get_deferred_fields():
+            return self.total_amount
+
+        annotated = getattr(self, 'total_price', None)
+        if annotated is not None:
+            return annotated
+
+        return self.calculate_total_price_per_day() * self.get_rental_days()
 
     def calculate_total_price_per_day(self):
         """
         คำนวณราคารวมต่อวัน (Daily Items + Services)
+        Booking แบบเก่าที่ไม่มี BookingItem ใช้ราคาสินค้าของอุปกรณ์ (Equipment) แทน เหมือน calculate_total_price()
         """
         total = 0
         # Items
-        for item in self.items.all():
+        items = list(self.items.all())
+        for item in items:
             total += (item.price_at_booking or 0) * item.quantity
-            
+
+        # Equipment (แบบเก่า: ไม่มี BookingItem)
+        if not items:
+            for equip in self.equipment.select_related('product'):
+                if equip.product:
+                    total += equip.product.price
+
         # Studios
         for studio in self.studios.all():
             total += studio.daily_rate
-            
+
         return total
 
     def get_issues(self):
         """
         ตรวจสอบปัญหาของการจอง (เช่น อุปกรณ์ชน, สถานะไม่พร้อม)
+        คืนค่าเป็น list ของข้อความ error
         """
         issues = []
-        # TODO: Implement complex conflict logic here
-        # For now return empty list to prevent crash
+        if not self.pk or not self.start_time or not self.end_time:
+            return issues
+
+        from rentals.services.availability import AvailabilityService
+
+        equipment = list(self.equipment.select_related('product'))
+        for equip in equipment:
+            equip_name = equip.product.name if equip.product else "Unknown"
+            if equip.status == 'maintenance':
+                issues.append(f"อุปกรณ์ '{equip_name} - {equip.serial_number}' ซ่อมบำรุง (Maintenance)")
+            elif equip.status == 'lost':
+                issues.append(f"อุปกรณ์ '{equip_name} - {equip.serial_number}' สูญหาย (Lost)")
+
+        conflicts = AvailabilityService.check_resource_overlaps(
+            self.start_time, self.end_time,
+            equipment=equipment,
+            studios=self.studios.all(),
+            staff=self.staff.all(),
+            exclude_booking_id=self.pk
+        )
+        issues.extend(AvailabilityService.conflict_message(conflict) for conflict in conflicts)
         return issues
 
     # Audit Trail - บันทึกประวัติการเปลี่ยนแปลงทั้งหมด
@@ -337,6 +448,17 @@ class Booking(models.Model):
         verbose_name = "การจอง"
         verbose_name_plural = "การจอง"
         ordering = ['-created_at']
+        indexes = [
+            # ชนคิว: status IN (...) AND end_time > ? (ส่วนที่คัดกรองได้มากสำหรับงานในอนาคต)
+            # เกินกำหนดคืน: status='active' AND end_time < now
+            models.Index(fields=['status', 'end_time'], name='booking_status_end'),
+            # Dashboard "วันนี้": start_time ในช่วง [00:00, 24:00)
+            models.Index(fields=['start_time'], name='booking_start_time'),
+            # รายได้: status IN (...) + ช่วง start_time -> Sum(total_amount) อ่านจาก Index ได้เลย
+            models.Index(fields=['status', 'start_time', 'total_amount'], name='booking_revenue'),
+            # ICS Feed: sync token = Max(updated_at) และ ?since= -> updated_at > token
+            models.Index(fields=['updated_at'], name='booking_updated_at'),
+        ]
     
     def __str__(self):
         return f"{self.customer_name} - {self.start_time.strftime('%d/%m/%Y %H:%M')}"
@@ -351,6 +473,12 @@ class BookingItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     price_at_booking = models.DecimalField(max_digits=10, decimal_places=2, null=True, help_text="ราคาต่อหน่วย ณ วันที่จอง")
 
+    class Meta:
+        indexes = [
+            # เช็คของว่าง: product_id IN (...) แล้ว Join ไปที่ Booking
+            models.Index(fields=['product', 'booking'], name='bookingitem_product_booking'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.price_at_booking and self.product:
             self.price_at_booking = self.product.price
@@ -362,6 +490,104 @@ class BookingItem(models.Model):
     def __str__(self):
         return f"{self.product.name} ({self.quantity})"
 
+class ProductDayLoad(models.Model):
+    """
+    ตารางสรุปจำนวนที่ถูกจองต่อสินค้าต่อวัน (Materialized Daily Occupancy)
+    อัปเดตแบบ Incremental ผ่าน Signals (rentals/signals.py)
+    ใช้กับจำนวนว่างรายวัน (AvailabilityService.get_daily_availability) แทนการ Scan BookingItem
+    สร้างใหม่/ตรวจสอบได้ด้วยคำสั่ง: python manage.py rebuild_day_load
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='day_loads')
+    date = models.DateField(verbose_name="วันที่")
+    reserved = models.IntegerField(default=0, verbose_name="จำนวนที่ถูกจอง")
+
+    class Meta:
+        verbose_name = "ยอดจองรายวัน"
+        verbose_name_plural = "ยอดจองรายวัน"
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='unique_product_day_load'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.date}: {self.reserved}"
+
+class DailyRevenueRollup(models.Model):
+    """
+    ตารางสรุปยอดจองรายวันแยกตามสถานะ (วันที่ = วันเริ่มเช่าตามเวลาท้องถิ่น)
+    อัปเดตแบบ Incremental ผ่าน Signals และ BookingTotalsService.refresh()
+    ใช้กับกราฟแนวโน้มรายได้/การเติบโตรายเดือน ด้วยการอ่านช่วงวันที่ครั้งเดียว
+    สร้างใหม่/ตรวจสอบได้ด้วยคำสั่ง: python manage.py rebuild_revenue_rollup
+    """
+    date = models.DateField(verbose_name="วันที่")
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES, verbose_name="สถานะ")
+    booking_count = models.IntegerField(default=0, verbose_name="จำนวนการจอง")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="ยอดรวม")
+
+    class Meta:
+        verbose_name = "สรุปรายได้รายวัน"
+        verbose_name_plural = "สรุปรายได้รายวัน"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'status'], name='unique_revenue_rollup_day_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status}: {self.booking_count} / {self.revenue}"
+
+class FeedChange(models.Model):
+    """
+    Log การเปลี่ยนแปลงสำหรับ ICS feed แบบ Incremental (rentals/services/ics_feed.py)
+    Signals เขียนแถวหลัง Commit (transaction.on_commit) -> id เรียงตามลำดับ Commit ใช้เป็น Sync token ได้
+    - kind ว่าง: Booking ถูกแก้ไข หรือเพิ่มพนักงาน/สตูดิโอ
+    - kind + resource_id: ถอดพนักงาน/สตูดิโอออกจาก Booking หรือ Booking ถูกลบ (ส่ง CANCELLED เฉพาะปฏิทินนั้น)
+    """
+    KIND_CHOICES = [
+        ('staff', 'พนักงาน'),
+        ('studio', 'สตูดิโอ'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, blank=True, default='', verbose_name="ประเภท")
+    resource_id = models.PositiveIntegerField(null=True, blank=True, verbose_name="รหัสพนักงาน/สตูดิโอ")
+    booking_id = models.PositiveIntegerField(verbose_name="รหัสการจอง")  # Booking อาจถูกลบไปแล้ว
+    start_time = models.DateTimeField(null=True, blank=True, verbose_name="วันเวลาเริ่มต้น")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="บันทึกเมื่อ")
+
+    class Meta:
+        verbose_name = "ประวัติการเปลี่ยนแปลงปฏิทิน"
+        verbose_name_plural = "ประวัติการเปลี่ยนแปลงปฏิทิน"
+        indexes = [
+            # ?since=<token>: kind + resource แล้วอ่านเฉพาะ id ที่ใหม่กว่า token
+            models.Index(fields=['kind', 'resource_id', 'id'], name='feed_change_resource'),
+        ]
+
+    def __str__(self):
+        if self.kind:
+            return f"{self.kind} {self.resource_id}: booking {self.booking_id} removed"
+        return f"booking {self.booking_id} changed"
+
+class StockHold(models.Model):
+    """
+    การกันสต็อกชั่วคราวของตะกร้า (Cart Hold) มีวันหมดอายุ
+    สร้างตอนเพิ่มสินค้าลงตะกร้า แปลงเป็น Booking ตอน Checkout
+    Hold ที่หมดอายุจะไม่ถูกนับในการเช็คของว่าง และถูกลบด้วยคำสั่ง: python manage.py expire_holds
+    """
+    session_key = models.CharField(max_length=40, db_index=True, verbose_name="Session")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_holds', verbose_name="สินค้า")
+    quantity = models.PositiveIntegerField(default=1, verbose_name="จำนวน")
+    start_time = models.DateTimeField(verbose_name="วันเวลาเริ่มต้น")
+    end_time = models.DateTimeField(verbose_name="วันเวลาสิ้นสุด")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="หมดอายุ")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "การกันสต็อกชั่วคราว"
+        verbose_name_plural = "การกันสต็อกชั่วคราว"
+        indexes = [
+            models.Index(fields=['product', 'expires_at'], name='stock_hold_product_expiry'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} x {self.quantity} (until {self.expires_at})"
+
 class Package(models.Model):
     """
     โมเดลสำหรับ "แพ็คเกจโปรโมชั่น" (Bundles)
@@ -634,6 +860,10 @@ class Notification(models.Model):
         verbose_name = "การแจ้งเตือน"
         verbose_name_plural = "การแจ้งเตือน"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'is_read'], name='notification_unread'),
+            models.Index(fields=['recipient', '-created_at'], name='notification_recent'),
+        ]
         
     def __str__(self):
         return f"{self.recipient} - {self.message}"
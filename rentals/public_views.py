@@ -1,19 +1,63 @@
 # Standard library
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Django
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.db.models import Q
 from django.views.decorators.http import require_POST
 from django.utils import timezone
 from django.contrib.auth.models import User
+from django.http import JsonResponse
+from django.conf import settings
 
 # Local
-from .models import Equipment, Studio, Product, Package, Booking, BookingItem, Notification
+from .models import Equipment, Studio, Product, Package, Booking, Notification
 from .cart import Cart
 from .forms import BookingAdminForm
 from .services.notify import send_line_notify
 from .services.availability import AvailabilityService
+from .services.holds import StockHoldService
+
+
+def parse_rental_dates(start_date, end_date):
+    """
+    แปลงช่วงวันที่จากฟอร์ม (YYYY-MM-DD, รวมวันสุดท้าย) เป็นช่วงเวลา [start, end)
+    เช่น 12-15 มี.ค. -> 12 มี.ค. 00:00 ถึง 16 มี.ค. 00:00
+
+    Raises:
+        ValueError: รูปแบบวันที่ไม่ถูกต้อง
+    """
+    s_date = datetime.strptime(start_date, "%Y-%m-%d")
+    e_date = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    return timezone.make_aware(s_date), timezone.make_aware(e_date)
+
+
+def hold_session_key(request):
+    """
+    Session ที่ต้องไม่นับ Hold ของตัวเองตอนเช็คของว่าง
+    คืน None ถ้าตะกร้าว่าง (ไม่มี Hold) เพื่อให้ใช้ Availability Cache ร่วมกับผู้เข้าชมคนอื่น
+    """
+    if request.session.get(settings.CART_SESSION_ID):
+        return request.session.session_key
+    return None
+
+
+def refresh_cart_holds(request, cart):
+    """
+    กันสต็อกของตะกร้าชั่วคราว (StockHold) ตามช่วงวันที่ใน Session
+    เรียกทุกครั้งที่ตะกร้าเปลี่ยน -> Hold ถูกสร้างใหม่และต่ออายุ
+    """
+    if not request.session.session_key:
+        request.session.save()
+    try:
+        start, end = parse_rental_dates(
+            request.session.get('booking_start_date'), request.session.get('booking_end_date')
+        )
+    except (TypeError, ValueError):
+        StockHoldService.release(request.session.session_key)
+        return
+    StockHoldService.hold_cart(request.session.session_key, cart, start, end)
 
 
 def home(request):
@@ -66,19 +110,16 @@ def equipment_catalog(request):
     
     if start_date and end_date:
         try:
-            from django.db.models import Sum
-            
-            # Parse Date (Assuming format YYYY-MM-DD from HTML5 input)
-            search_start_date = datetime.strptime(start_date, "%Y-%m-%d")
-            search_end_date = datetime.strptime(end_date, "%Y-%m-%d")
-            
-            # Adjust end date to cover the full day (if needed) or assuming user inputs inclusive range
-            # For simplicity, let's assume end_date is inclusive 23:59:59 or handle as date object comparison
+            # Parse Date (Assuming format YYYY-MM-DD from HTML5 input, end date inclusive)
+            search_start_date, search_end_date = parse_rental_dates(start_date, end_date)
             
-            # Calculate Remaining for EACH product in the list
-            from rentals.services.availability import AvailabilityService
+            # Calculate Remaining for ALL products in the list (one batched query)
+            available = AvailabilityService.get_available_quantities(
+                product_list, search_start_date, search_end_date,
+                exclude_session_key=hold_session_key(request)
+            )
             for product in product_list:
-                product.calculated_remaining = AvailabilityService.get_available_quantity(product, search_start_date, search_end_date)
+                product.calculated_remaining = available[product.id]
                 product.is_date_filtered = True
                 
         except ValueError:
@@ -113,6 +154,7 @@ def product_detail(request, product_id):
     
     search_start_date = None
     search_end_date = None
+    suggested_slots = []
     
     # Default: Show "Total Available Now" if no date selected
     # But if date selected, calculate "Available in Range"
@@ -120,15 +162,24 @@ def product_detail(request, product_id):
     
     if start_date and end_date:
         try:
-            from django.db.models import Sum
-            
-            search_start_date = datetime.strptime(start_date, "%Y-%m-%d")
-            search_end_date = datetime.strptime(end_date, "%Y-%m-%d")
+            search_start_date, search_end_date = parse_rental_dates(start_date, end_date)
             
             # Check overlap via Service
-            from rentals.services.availability import AvailabilityService
-            product.calculated_remaining = AvailabilityService.get_available_quantity(product, search_start_date, search_end_date)
+            available = AvailabilityService.get_available_quantities(
+                [product], search_start_date, search_end_date,
+                exclude_session_key=hold_session_key(request)
+            )
+            product.calculated_remaining = available[product.id]
             product.is_date_filtered = True
+
+            # ไม่ว่างในช่วงที่เลือก -> แนะนำช่วงเวลาที่ว่างถัดไป (ความยาวเท่าเดิม)
+            if product.calculated_remaining < 1:
+                suggested_slots = AvailabilityService.find_available_slots(
+                    [(product, 1)],
+                    search_start_date.date(),
+                    (search_end_date - search_start_date).days,
+                    exclude_session_key=hold_session_key(request)
+                )
             
         except ValueError:
             pass 
@@ -144,6 +195,59 @@ def product_detail(request, product_id):
         'related_products': related_products,
         'start_date': start_date,
         'end_date': end_date,
+        'suggested_slots': suggested_slots,
+    })
+
+def availability_calendar_api(request):
+    """
+    API จำนวนว่างรายวัน (Heatmap) สำหรับ Date Picker
+    GET ?product=1&product=2&start=YYYY-MM-DD&days=31
+    - ไม่ระบุ product = ทุกสินค้าที่เปิดให้เช่า
+    - days สูงสุด 90 วัน
+    """
+    try:
+        start = datetime.strptime(request.GET['start'], "%Y-%m-%d").date() if request.GET.get('start') else timezone.localdate()
+        days = min(max(int(request.GET.get('days', 31)), 1), 90)
+        product_ids = [int(pid) for value in request.GET.getlist('product') for pid in value.split(',') if pid]
+    except ValueError:
+        return JsonResponse({'error': 'Invalid parameters'}, status=400)
+
+    products = Product.objects.filter(is_active=True).only('id', 'quantity')
+    if product_ids:
+        products = products.filter(id__in=product_ids)
+
+    free = AvailabilityService.get_daily_availability(products, start, days)
+    return JsonResponse({
+        'start': start.isoformat(),
+        'days': days,
+        'free': {str(product_id): values for product_id, values in free.items()},
+    })
+
+def available_slots_api(request):
+    """
+    API หาช่วงเวลาที่ว่างถัดไป
+    GET ?product=1&quantity=2&days=3&start=YYYY-MM-DD&count=3
+    - ไม่ระบุ product = ใช้สินค้าในตะกร้าทั้งหมด
+    """
+    try:
+        start = datetime.strptime(request.GET['start'], "%Y-%m-%d").date() if request.GET.get('start') else timezone.localdate()
+        days = min(max(int(request.GET.get('days', 1)), 1), 90)
+        count = min(max(int(request.GET.get('count', 3)), 1), 10)
+        product_id = int(request.GET['product']) if request.GET.get('product') else None
+        quantity = int(request.GET.get('quantity', 1))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid parameters'}, status=400)
+
+    if product_id:
+        requirements = [(get_object_or_404(Product, id=product_id), quantity)]
+    else:
+        requirements = AvailabilityService.cart_requirements(Cart(request))
+
+    slots = AvailabilityService.find_available_slots(
+        requirements, start, days, count=count, exclude_session_key=hold_session_key(request)
+    )
+    return JsonResponse({
+        'slots': [{'start_date': s.isoformat(), 'end_date': e.isoformat()} for s, e in slots],
     })
 
 def studios(request):
@@ -160,8 +264,26 @@ def packages(request):
     หน้าแสดงแพ็คเกจราคา (Packages)
     """
     packages = Package.objects.filter(is_active=True).prefetch_related('items__product').order_by('price')
+
+    # ตรวจสอบว่าแพ็คเกจว่างในช่วงวันที่เลือกหรือไม่ (ทุกแพ็คเกจใน Query เดียว)
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+    if start_date and end_date:
+        try:
+            search_start_date, search_end_date = parse_rental_dates(start_date, end_date)
+            availability = AvailabilityService.get_packages_availability(
+                packages, search_start_date, search_end_date, hold_session_key(request)
+            )
+            for package in packages:
+                package.availability = availability[package.id]
+                package.is_date_filtered = True
+        except ValueError:
+            pass
+
     return render(request, 'rentals/public/packages.html', {
-        'packages': packages
+        'packages': packages,
+        'start_date': start_date,
+        'end_date': end_date,
     })
 
 def portfolio(request):
@@ -206,35 +328,67 @@ def cart_add(request, product_id):
     
     # Check Stock for Specific Dates
     # (Re-calculate availability for server-side security)
+    try:
+        s_date, e_date = parse_rental_dates(start_date, end_date)
+    except ValueError:
+        return redirect('product_detail', product_id=product.id)
 
-    from django.db.models import Sum
-    from .models import BookingItem
-    
-    s_date = datetime.strptime(start_date, "%Y-%m-%d")
-    e_date = datetime.strptime(end_date, "%Y-%m-%d")
-    
-    booked_qty = BookingItem.objects.filter(
-        product=product,
-        booking__status__in=['draft', 'quotation_sent', 'pending_deposit', 'approved', 'active'],
-        booking__start_time__lte=e_date,
-        booking__end_time__gte=s_date
-    ).aggregate(Sum('quantity'))['quantity__sum'] or 0
-    
-    real_available = max(0, product.quantity - booked_qty)
-    
-    if real_available < quantity:
+    is_available, _ = AvailabilityService.check_availability(
+        product, s_date, e_date, quantity, exclude_session_key=hold_session_key(request)
+    )
+    if not is_available:
         # Stock might have changed or was invalid
         return redirect('product_detail', product_id=product.id)
         
     # Use update_quantity=True to REPLACE the quantity instead of adding to it
     # This prevents accidental "9x" if user clicks repeatedly
     cart.add(product=product, quantity=quantity, update_quantity=True)
+    refresh_cart_holds(request, cart)
+    return redirect('cart_detail')
+
+@require_POST
+def cart_add_package(request, package_id):
+    """
+    เพิ่มแพ็คเกจลงตะกร้า (ตรวจสอบสินค้าย่อยทุกชิ้นก่อน)
+    """
+    cart = Cart(request)
+    package = get_object_or_404(Package.objects.prefetch_related('items__product'), id=package_id, is_active=True)
+    quantity = int(request.POST.get('quantity', 1))
+
+    start_date = request.POST.get('start_date')
+    end_date = request.POST.get('end_date')
+    if not start_date or not end_date:
+        return redirect('packages')
+
+    try:
+        s_date, e_date = parse_rental_dates(start_date, end_date)
+    except ValueError:
+        return redirect('packages')
+
+    is_available, _ = AvailabilityService.check_package_availability(
+        package, s_date, e_date, quantity, hold_session_key(request)
+    )
+    if not is_available:
+        return redirect(f"{reverse('packages')}?start_date={start_date}&end_date={end_date}")
+
+    request.session['booking_start_date'] = start_date
+    request.session['booking_end_date'] = end_date
+    cart.add_package(package=package, quantity=quantity, update_quantity=True)
+    refresh_cart_holds(request, cart)
+    return redirect('cart_detail')
+
+def cart_remove_package(request, package_id):
+    cart = Cart(request)
+    package = get_object_or_404(Package, id=package_id)
+    cart.remove_package(package)
+    refresh_cart_holds(request, cart)
     return redirect('cart_detail')
 
 def cart_remove(request, product_id):
     cart = Cart(request)
     product = get_object_or_404(Product, id=product_id)
     cart.remove(product)
+    refresh_cart_holds(request, cart)
     return redirect('cart_detail')
 
 def cart_detail(request):
@@ -280,15 +434,10 @@ def checkout(request):
         
         # Combine Date & Time
         try:
-            start_dt = datetime.strptime(f"{start_date} {start_time}", "%Y-%m-%d %H:%M")
-            end_dt = datetime.strptime(f"{end_date} {end_time}", "%Y-%m-%d %H:%M")
-            
-            # Validate stock availability
-            is_valid, error = AvailabilityService.validate_cart(cart, start_dt, end_dt)
-            if not is_valid:
-                return render(request, 'rentals/public/checkout.html', {'cart': cart, 'error': error})
+            start_dt = timezone.make_aware(datetime.strptime(f"{start_date} {start_time}", "%Y-%m-%d %H:%M"))
+            end_dt = timezone.make_aware(datetime.strptime(f"{end_date} {end_time}", "%Y-%m-%d %H:%M"))
             
-            # Create booking using service
+            # Create booking using service (stock is re-checked and reserved atomically)
             from rentals.services.booking_service import BookingService
             booking_data = {
                 'customer_name': customer_name,
@@ -299,11 +448,25 @@ def checkout(request):
                 'status': 'draft'
             }
             
-            booking = BookingService.create_booking_from_cart(
+            booking, error = BookingService.reserve_booking_from_cart(
                 cart=cart,
                 booking_data=booking_data,
-                user=request.user if request.user.is_authenticated else None
+                user=request.user if request.user.is_authenticated else None,
+                session_key=request.session.session_key
             )
+            if booking is None:
+                # แนะนำช่วงเวลาที่ของในตะกร้าว่างครบทุกชิ้น
+                suggested_slots = AvailabilityService.find_available_slots(
+                    AvailabilityService.cart_requirements(cart),
+                    start_dt.date(),
+                    max(1, (end_dt.date() - start_dt.date()).days + 1),
+                    exclude_session_key=hold_session_key(request)
+                )
+                return render(request, 'rentals/public/checkout.html', {
+                    'cart': cart,
+                    'error': error,
+                    'suggested_slots': suggested_slots,
+                })
             
             # Clear cart
             cart.clear()
@@ -1,12 +1,42 @@
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count, Sum, F
-from django.db.models.functions import TruncMonth
+from django.db.models import Count, Sum
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 import csv
-from django.http import HttpResponse
-from .models import Booking, Equipment, Studio, IssueReport
+from django.http import JsonResponse, StreamingHttpResponse
+from .models import Booking, Equipment, IssueReport, Product
+from .services.revenue_rollup import RevenueRollupService
+from .services.stock_series import StockSeriesService
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Pseudo-buffer สำหรับ csv.writer: คืนค่าบรรทัดแทนการเขียนลงไฟล์"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, header, rows):
+    """
+    ส่ง CSV แบบ Streaming ทีละบรรทัด (หน่วยความจำคงที่, ไบต์แรกออกทันที)
+    rows ควรเป็น Generator ที่อ่านจาก .iterator(chunk_size=...)
+    """
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def local_datetime(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M') if value else '-'
 
 @staff_member_required
 def reports_dashboard(request):
@@ -31,70 +61,55 @@ def reports_dashboard(request):
         start_date = today - timedelta(days=365)
         end_date = today
 
+    range_start = timezone.make_aware(datetime.combine(start_date, time.min))
+    range_end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+
     # 2. จัดการ Export CSV
-    if request.GET.get('export') == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="revenue_report_{today}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Month', 'Revenue (THB)', 'Bookings Count'])
-        
-        # Calculate data for export
-        current = start_date.replace(day=1)
-        while current <= end_date:
-            next_month = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
-            
-            bookings = Booking.objects.filter(
-                start_time__year=current.year,
-                start_time__month=current.month,
-                status__in=['approved', 'completed']
+    if request.GET.get('export') == 'bookings':
+        status_labels = dict(Booking.STATUS_CHOICES)
+        bookings = Booking.objects.filter(
+            start_time__gte=range_start, start_time__lt=range_end
+        ).order_by('start_time', 'id').annotate(
+            item_quantity=Sum('items__quantity')
+        ).values_list(
+            'id', 'customer_name', 'status', 'start_time', 'end_time',
+            'item_quantity', 'rental_days', 'total_amount', 'created_by__username'
+        )
+        return stream_csv(
+            f'booking_report_{start_date}_{end_date}.csv',
+            ['ID', 'Customer', 'Status', 'Start', 'End', 'Items', 'Days', 'Total (THB)', 'Created By'],
+            (
+                [booking_id, customer, status_labels.get(status, status), local_datetime(start), local_datetime(end),
+                 items or 0, days, total, created_by or '-']
+                for booking_id, customer, status, start, end, items, days, total, created_by
+                in bookings.iterator(chunk_size=EXPORT_CHUNK_SIZE)
             )
-            
-            total_revenue = sum(b.calculate_total_price() for b in bookings)
-            writer.writerow([current.strftime('%B %Y'), total_revenue, bookings.count()])
-            
-            current = next_month
-            
-        return response
+        )
 
-    # 3. คำนวณข้อมูลสำหรับแสดงผล
-    
-    # กราฟรายเดือน
-    monthly_data = []
-    
-    # Create distinct months list from start_date to end_date
-    current = start_date.replace(day=1)
-    chart_end_date = end_date
-    
-    while current <= chart_end_date:
-        next_month = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
-        
-        bookings = Booking.objects.filter(
-            start_time__year=current.year,
-            start_time__month=current.month,
-            status__in=['approved', 'completed']
+    # รายได้รายเดือน: Query เดียว (TruncMonth บน DailyRevenueRollup) ใช้ร่วมกันทั้งหน้าเว็บและ CSV
+    monthly_data = [
+        {'month': row['month'].strftime('%B %Y'), 'revenue': row['revenue'], 'count': row['count']}
+        for row in RevenueRollupService.get_monthly_revenue(start_date, end_date)
+    ]
+
+    if request.GET.get('export') == 'csv':
+        return stream_csv(
+            f'revenue_report_{today}.csv',
+            ['Month', 'Revenue (THB)', 'Bookings Count'],
+            ([row['month'], row['revenue'], row['count']] for row in monthly_data)
         )
-        
-        total_revenue = sum(b.calculate_total_price() for b in bookings)
-        monthly_data.append({
-            'month': current.strftime('%B %Y'),
-            'revenue': total_revenue,
-            'count': bookings.count()
-        })
-        
-        current = next_month
 
+    # 3. คำนวณข้อมูลสำหรับแสดงผล
     # อุปกรณ์ยอดนิยม (Top 5) ในช่วงเวลาที่เลือก
     top_equipment = Equipment.objects.filter(
-        bookings__start_time__date__range=[start_date, end_date]
+        bookings__start_time__gte=range_start,
+        bookings__start_time__lt=range_end
     ).annotate(
         usage_count=Count('bookings')
     ).order_by('-usage_count').distinct()[:5]
     
     # สัดส่วนสถานะการจอง ในช่วงเวลาที่เลือก
-    status_counts = Booking.objects.filter(
-        start_time__date__range=[start_date, end_date]
-    ).values('status').annotate(total=Count('id'))
+    status_counts = RevenueRollupService.get_status_counts(start_date, end_date)
     
     context = {
         'monthly_data': monthly_data,
@@ -106,6 +121,43 @@ def reports_dashboard(request):
     
     return render(request, 'rentals/reports.html', context)
 
+@staff_member_required
+def reports_stock(request):
+    """
+    คงเหลือรายวันของสินค้าทุกตัวในช่วงวันที่ (ค่าเริ่มต้น: วันนี้ + 1 ไตรมาส)
+    GET ?start_date=&end_date=[&export=csv | &format=json]
+    """
+    try:
+        start_date, end_date = StockSeriesService.parse_range(request.GET.get('start_date'), request.GET.get('end_date'))
+    except ValueError:
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'error': 'Invalid parameters'}, status=400)
+        start_date, end_date = StockSeriesService.parse_range()
+
+    products = Product.objects.filter(is_active=True).order_by('category', 'name')
+    series = StockSeriesService.series(products, start_date, end_date)
+    dates = StockSeriesService.dates(start_date, end_date)
+
+    if request.GET.get('export') == 'csv':
+        return stream_csv(
+            f'stock_levels_{start_date}_{end_date}.csv',
+            ['ID', 'Product', 'Category', 'Total', *[day.isoformat() for day in dates]],
+            StockSeriesService.csv_rows(series)
+        )
+
+    compact = StockSeriesService.compact(series, start_date, end_date)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(compact, json_dumps_params={'ensure_ascii': False})
+
+    context = {
+        'series': series,
+        'dates': dates,
+        'compact': compact,
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+    }
+    return render(request, 'rentals/stock_series.html', context)
+
 @staff_member_required
 def reports_maintenance(request):
     """
@@ -116,46 +168,45 @@ def reports_maintenance(request):
     priority_filter = request.GET.get('priority')
     
     # 2. Query ข้อมูล
-    issues = IssueReport.objects.all().select_related('equipment', 'studio', 'booking', 'reporter').order_by('-created_at')
+    issues = IssueReport.objects.all().select_related('equipment__product', 'studio', 'booking', 'reporter').order_by('-created_at')
     
     if status_filter:
         issues = issues.filter(status=status_filter)
         
     if priority_filter:
         issues = issues.filter(priority=priority_filter)
+
+    # 3. Export CSV (Streaming: อ่านเฉพาะคอลัมน์ที่ใช้ ทีละ chunk)
+    if request.GET.get('export') == 'csv':
+        priority_labels = dict(IssueReport.PRIORITY_CHOICES)
+        status_labels = dict(IssueReport.STATUS_CHOICES)
+        rows = issues.values_list(
+            'id', 'title', 'priority', 'status',
+            'equipment__product__name', 'equipment__serial_number', 'studio__name',
+            'booking_id', 'booking__customer_name', 'reporter__username', 'created_at'
+        )
+        return stream_csv(
+            f'maintenance_report_{timezone.localdate()}.csv',
+            ['ID', 'Title', 'Priority', 'Status', 'Equipment', 'Studio', 'Booking', 'Reporter', 'Date'],
+            (
+                [
+                    issue_id, title, priority_labels.get(priority, priority), status_labels.get(status, status),
+                    f"{product_name or 'Unknown'} - {serial}" if serial else '-',
+                    studio_name or '-',
+                    f"{customer_name} ({booking_id})" if booking_id else '-',
+                    reporter or '-',
+                    local_datetime(created_at),
+                ]
+                for issue_id, title, priority, status, product_name, serial, studio_name,
+                    booking_id, customer_name, reporter, created_at
+                in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+            )
+        )
         
-    # 3. สรุปข้อมูล (Summary Stats)
+    # 4. สรุปข้อมูล (Summary Stats)
     total_issues = IssueReport.objects.count()
     open_issues = IssueReport.objects.exclude(status='closed').count()
     critical_issues = IssueReport.objects.filter(priority='critical').exclude(status='closed').count()
-    
-    # 4. Export CSV
-    if request.GET.get('export') == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="maintenance_report_{timezone.now().date()}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['ID', 'Title', 'Priority', 'Status', 'Equipment', 'Studio', 'Booking', 'Reporter', 'Date'])
-        
-        for issue in issues:
-            equip_name = issue.equipment.name if issue.equipment else '-'
-            studio_name = issue.studio.name if issue.studio else '-'
-            booking_info = f"{issue.booking.customer_name} ({issue.booking.id})" if issue.booking else '-'
-            reporter_name = issue.reporter.username if issue.reporter else '-'
-            
-            writer.writerow([
-                issue.id, 
-                issue.title, 
-                issue.get_priority_display(), 
-                issue.get_status_display(),
-                equip_name,
-                studio_name,
-                booking_info,
-                reporter_name,
-                issue.created_at.strftime('%Y-%m-%d %H:%M')
-            ])
-            
-        return response
 
     context = {
         'issues': issues,
@@ -0,0 +1,101 @@
+import json
+
+from django.contrib.admin.models import ADDITION, CHANGE, DELETION, LogEntry
+from django.core.cache import caches
+
+
+def summarize_change_message(change_message):
+    """
+    Turns an admin LogEntry.change_message (JSON list) into a short summary
+    such as "Changed: status, end_time".
+    """
+    try:
+        data = json.loads(change_message)
+    except (TypeError, ValueError):
+        return change_message or "Changed"
+    if not isinstance(data, list):
+        return change_message or "Changed"
+
+    actions = []
+    for item in data:
+        if 'added' in item:
+            actions.append("Created")
+        elif 'changed' in item:
+            fields = item['changed'].get('fields', [])
+            actions.append(f"Changed: {', '.join(fields)}")
+        elif 'deleted' in item:
+            actions.append("Deleted")
+    return "; ".join(actions)
+
+
+class ActivityFeedService:
+    """
+    Admin activity feed (django.contrib.admin LogEntry) with keyset pagination.
+
+    LogEntry rows never change once written, so each parsed entry is cached by id
+    without invalidation. A page costs one index-only query on the primary key
+    (id order is write order, which is action_time order) plus, for entries not
+    cached yet, one query that loads and parses just those rows.
+    """
+
+    ALIAS = 'default'
+    PAGE_SIZE = 10
+    MAX_PAGE_SIZE = 50
+    TIMEOUT = 24 * 60 * 60
+
+    @staticmethod
+    def _cache_key(entry_id):
+        return f"activity:entry:{entry_id}"
+
+    @staticmethod
+    def serialize(log):
+        return {
+            'id': log.id,
+            'username': log.user.get_username() if log.user_id else '',
+            'object_repr': log.object_repr,
+            'action_time': log.action_time,
+            'is_addition': log.action_flag == ADDITION,
+            'is_change': log.action_flag == CHANGE,
+            'is_deletion': log.action_flag == DELETION,
+            'message': summarize_change_message(log.change_message),
+        }
+
+    @staticmethod
+    def get_entries(entry_ids):
+        """
+        Returns:
+            dict: {entry_id: entry dict} read from the cache, parsing the missing ones
+        """
+        cache = caches[ActivityFeedService.ALIAS]
+        keys = {entry_id: ActivityFeedService._cache_key(entry_id) for entry_id in entry_ids}
+        cached = cache.get_many(keys.values())
+        entries = {entry_id: cached[key] for entry_id, key in keys.items() if key in cached}
+
+        missing = [entry_id for entry_id in entry_ids if entry_id not in entries]
+        if missing:
+            parsed = {
+                log.id: ActivityFeedService.serialize(log)
+                for log in LogEntry.objects.filter(id__in=missing).select_related('user')
+            }
+            cache.set_many({keys[entry_id]: entry for entry_id, entry in parsed.items()}, ActivityFeedService.TIMEOUT)
+            entries.update(parsed)
+        return entries
+
+    @staticmethod
+    def page(before=None, limit=PAGE_SIZE):
+        """
+        Newest-first page of entries older than the `before` cursor (a LogEntry id).
+
+        Returns:
+            (entries, next_cursor): next_cursor is None on the last page
+        """
+        limit = min(max(int(limit), 1), ActivityFeedService.MAX_PAGE_SIZE)
+        ids = LogEntry.objects.order_by('-id')
+        if before:
+            ids = ids.filter(id__lt=before)
+        ids = list(ids.values_list('id', flat=True)[:limit + 1])
+
+        has_more = len(ids) > limit
+        ids = ids[:limit]
+        entries = ActivityFeedService.get_entries(ids)
+        return [entries[entry_id] for entry_id in ids if entry_id in entries], (ids[-1] if has_more else None)
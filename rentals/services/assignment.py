@@ -0,0 +1,145 @@
+from bisect import bisect_left, insort
+
+from django.db import transaction
+from django.db.models import Q
+
+from rentals.models import Booking, BookingItem, Equipment
+from rentals.services.availability import AvailabilityService
+
+
+class SerialAssignmentService:
+    """
+    Assigns physical Equipment serials to approved bookings automatically.
+
+    Bookings reserve stock at the Product level (BookingItem). This engine turns
+    those reservations into Booking.equipment rows with interval scheduling:
+    requests are processed by start time and each unit goes to the free serial
+    whose previous job ended most recently (best fit). That keeps serials packed
+    back-to-back, leaves untouched serials free for long rentals, and keeps the
+    number of different serials in rotation (and therefore swaps) low.
+    Serials in 'maintenance' or 'lost' status are never assigned.
+    """
+
+    @staticmethod
+    def plan(horizon_start, horizon_end, booking_ids=None, lock=False):
+        """
+        Computes assignments without writing anything.
+
+        Args:
+            horizon_start, horizon_end: only approved bookings overlapping this window are planned.
+            booking_ids: (Optional) restrict planning to these bookings.
+            lock: lock the candidate Equipment rows (SELECT ... FOR UPDATE) before reading
+                  their current assignments. Needs an open transaction - see assign().
+
+        Returns:
+            (assignments, shortages):
+                assignments: list of (booking_id, equipment_id)
+                shortages: list of (booking_id, product_id, missing_quantity)
+        """
+        needs_query = Q(booking__status='approved') & \
+                      Q(booking__start_time__lt=horizon_end) & \
+                      Q(booking__end_time__gt=horizon_start)
+        if booking_ids is not None:
+            needs_query &= Q(booking_id__in=booking_ids)
+
+        needed = {}
+        windows = {}
+        for booking_id, product_id, quantity, start_time, end_time in BookingItem.objects.filter(needs_query).values_list(
+            'booking_id', 'product_id', 'quantity', 'booking__start_time', 'booking__end_time'
+        ):
+            key = (booking_id, product_id)
+            needed[key] = needed.get(key, 0) + quantity
+            windows[booking_id] = (start_time, end_time)
+
+        if not needed:
+            return [], []
+
+        product_ids = {product_id for _, product_id in needed}
+        window_start = min(start for start, _ in windows.values())
+        window_end = max(end for _, end in windows.values())
+
+        # Lock first: a concurrent run (or admin action) cannot hand out the same
+        # serials between reading the busy intervals below and writing.
+        serials = Equipment.objects.filter(product_id__in=product_ids, status='available')
+        if lock:
+            serials = serials.select_for_update()
+        serials_by_product = {}
+        for equipment_id, product_id in serials.order_by('serial_number').values_list('id', 'product_id'):
+            serials_by_product.setdefault(product_id, []).append(equipment_id)
+
+        # Existing assignments that block serials (and count toward what is already fulfilled)
+        through = Booking.equipment.through
+        busy = {}
+        for booking_id, equipment_id, product_id, start_time, end_time in through.objects.filter(
+            equipment__product_id__in=product_ids,
+            booking__status__in=AvailabilityService.RESOURCE_BLOCKING_STATUSES,
+            booking__start_time__lt=window_end,
+            booking__end_time__gt=window_start,
+        ).values_list('booking_id', 'equipment_id', 'equipment__product_id', 'booking__start_time', 'booking__end_time'):
+            insort(busy.setdefault(equipment_id, []), (start_time, end_time))
+            key = (booking_id, product_id)
+            if key in needed:
+                needed[key] -= 1
+
+        requests = sorted(
+            ((windows[booking_id], booking_id, product_id, missing)
+             for (booking_id, product_id), missing in needed.items() if missing > 0),
+            key=lambda request: (request[0][0], request[1])
+        )
+
+        assignments = []
+        shortages = []
+        for (start_time, end_time), booking_id, product_id, missing in requests:
+            for _ in range(missing):
+                equipment_id = SerialAssignmentService._best_fit(
+                    serials_by_product.get(product_id, []), busy, start_time, end_time
+                )
+                if equipment_id is None:
+                    shortages.append((booking_id, product_id, missing))
+                    break
+                insort(busy.setdefault(equipment_id, []), (start_time, end_time))
+                assignments.append((booking_id, equipment_id))
+                missing -= 1
+
+        return assignments, shortages
+
+    @staticmethod
+    def _best_fit(serial_ids, busy, start_time, end_time):
+        """
+        Picks the serial that is free over [start_time, end_time) and whose previous
+        job ends closest to start_time (never-used serials come last).
+        """
+        best_id = None
+        best_previous_end = None
+        for equipment_id in serial_ids:
+            intervals = busy.get(equipment_id, [])
+            # Intervals starting before end_time are the only ones that can overlap
+            earlier = intervals[:bisect_left(intervals, (end_time,))]
+            previous_end = max((b_end for _, b_end in earlier), default=None)
+            if previous_end is not None and previous_end > start_time:
+                continue
+
+            if best_id is None or (previous_end is not None and (best_previous_end is None or previous_end > best_previous_end)):
+                best_id = equipment_id
+                best_previous_end = previous_end
+        return best_id
+
+    @staticmethod
+    def assign(horizon_start, horizon_end, booking_ids=None, dry_run=False):
+        """
+        Plans with the candidate serials locked and writes the assignments through
+        booking.equipment.add() (one insert per booking; m2m_changed signals fire as
+        for a manual assignment), all in one transaction.
+
+        Returns:
+            (assignments, shortages) - see plan()
+        """
+        with transaction.atomic():
+            assignments, shortages = SerialAssignmentService.plan(horizon_start, horizon_end, booking_ids, lock=True)
+            if assignments and not dry_run:
+                by_booking = {}
+                for booking_id, equipment_id in assignments:
+                    by_booking.setdefault(booking_id, []).append(equipment_id)
+                for booking in Booking.objects.filter(pk__in=by_booking):
+                    booking.equipment.add(*by_booking[booking.pk])
+        return assignments, shortages
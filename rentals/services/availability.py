@@ -1,9 +1,42 @@
+from datetime import datetime, timedelta
+
+import numpy as np
 from django.utils import timezone
-from django.db.models import Sum, Q
+from django.db.models import Q
 
 # Import models inside functions to avoid circular imports if strictly necessary, 
 # but usually service layers are imported by views/forms, so importing models here is fine.
-from rentals.models import BookingItem, Booking
+from rentals.models import BookingItem, Booking, ProductDayLoad, StockHold
+from rentals.services.availability_cache import AvailabilityCache
+
+
+def peak_concurrent_usage(intervals):
+    """
+    Sweep-line over (start, end, quantity) intervals.
+    Returns the highest number of units in use at any single instant.
+
+    Intervals are half-open [start, end): a rental that ends exactly when
+    another one starts does not overlap it, so releases are processed
+    before pickups at the same timestamp.
+    """
+    events = []
+    for start, end, quantity in intervals:
+        if start >= end or quantity <= 0:
+            continue
+        events.append((start, quantity))
+        events.append((end, -quantity))
+
+    # (time, delta) ordering puts negative deltas (returns) first on ties
+    events.sort()
+
+    peak = 0
+    in_use = 0
+    for _, delta in events:
+        in_use += delta
+        if in_use > peak:
+            peak = in_use
+    return peak
+
 
 class AvailabilityService:
     """
@@ -11,71 +44,428 @@ class AvailabilityService:
     Replaces ad-hoc logic in views and models.
     """
 
+    # Status that consumes availability:
+    # - draft (temporarily locks stock)
+    # - quotation_sent
+    # - pending_deposit
+    # - approved
+    # - active
+    # (completed/problem/cancelled do NOT consume stock for future dates, usually)
+    # Note: 'problem' items might need manual check, but for now we assume they are returned or handled separately.
+    ACTIVE_STATUSES = ['draft', 'quotation_sent', 'pending_deposit', 'approved', 'active']
+
+    # Live cart holds (StockHold with expires_at in the future) also consume availability;
+    # stale drafts are moved to 'expired' by the expire_holds command.
+
+    # Statuses that block resources (Equipment serial, Studio, Staff)
+    RESOURCE_BLOCKING_STATUSES = ['approved', 'active', 'quotation_sent', 'pending_deposit']
+
+    @staticmethod
+    def get_booking_intervals(product, start_time, end_time, exclude_booking_id=None, exclude_session_key=None):
+        """
+        Loads every reservation of a product that overlaps the window in one query.
+
+        Returns:
+            list of (start, end, quantity) tuples clipped to [start_time, end_time).
+        """
+        intervals = AvailabilityService.get_booking_intervals_by_product(
+            [product.id], start_time, end_time, exclude_booking_id, exclude_session_key
+        )
+        return intervals.get(product.id, [])
+
+    @staticmethod
+    def get_booking_intervals_by_product(product_ids, start_time, end_time, exclude_booking_id=None, exclude_session_key=None):
+        """
+        Same as get_booking_intervals() but for a set of products, still in one query.
+        Booking items and live cart holds are read together with UNION ALL.
+
+        Args:
+            exclude_session_key: (Optional) ignore this session's own cart holds.
+
+        Returns:
+            dict: {product_id: [(start, end, quantity), ...]} (products without bookings are omitted)
+        """
+        if not start_time or not end_time or not product_ids:
+            return {}
+
+        # Clipping compares with aware DB values (USE_TZ=True)
+        if timezone.is_naive(start_time):
+            start_time = timezone.make_aware(start_time)
+        if timezone.is_naive(end_time):
+            end_time = timezone.make_aware(end_time)
+
+        query = Q(booking__status__in=AvailabilityService.ACTIVE_STATUSES) & \
+                Q(product_id__in=product_ids) & \
+                Q(booking__start_time__lt=end_time) & \
+                Q(booking__end_time__gt=start_time)
+
+        if exclude_booking_id:
+            query &= ~Q(booking__id=exclude_booking_id)
+
+        rows = BookingItem.objects.filter(query).values_list(
+            'product_id', 'booking__start_time', 'booking__end_time', 'quantity'
+        ).union(
+            AvailabilityService.hold_rows(product_ids, start_time, end_time, exclude_session_key),
+            all=True
+        )
+
+        intervals = {}
+        for product_id, b_start, b_end, quantity in rows:
+            intervals.setdefault(product_id, []).append(
+                (max(b_start, start_time), min(b_end, end_time), quantity)
+            )
+        return intervals
+
+    @staticmethod
+    def hold_rows(product_ids, start_time, end_time, exclude_session_key=None):
+        """
+        Live cart holds overlapping the window.
+
+        Returns:
+            values_list QuerySet of (product_id, start_time, end_time, quantity)
+        """
+        hold_query = Q(product_id__in=product_ids) & \
+                     Q(expires_at__gt=timezone.now()) & \
+                     Q(start_time__lt=end_time) & \
+                     Q(end_time__gt=start_time)
+
+        if exclude_session_key:
+            hold_query &= ~Q(session_key=exclude_session_key)
+
+        return StockHold.objects.filter(hold_query).values_list('product_id', 'start_time', 'end_time', 'quantity')
+
     @staticmethod
-    def get_booked_quantity(product, start_time, end_time, exclude_booking_id=None):
+    def get_booked_quantity(product, start_time, end_time, exclude_booking_id=None, exclude_session_key=None):
         """
         Calculates how many units of a product are booked/reserved 
         during the specified time range.
+
+        This is the PEAK concurrent usage inside the window, not the plain sum:
+        two back-to-back 1-unit rentals inside a week-long search only use 1 unit.
         
         Args:
             product: The Product instance.
             start_time: datetime object (inclusive start).
             end_time: datetime object (exclusive end).
             exclude_booking_id: (Optional) ID of a booking to ignore (for edit mode).
+            exclude_session_key: (Optional) session whose own cart holds are ignored.
             
         Returns:
-            int: Total quantity booked.
+            int: Maximum quantity booked at the same time.
         """
         if not start_time or not end_time:
             return 0
 
-        # Query for overlapping bookings
-        # Status that consumes availability:
-        # - draft (temporarily locks stock)
-        # - quotation_sent
-        # - pending_deposit
-        # - approved
-        # - active
-        # (completed/problem/cancelled do NOT consume stock for future dates, usually)
-        # Note: 'problem' items might need manual check, but for now we assume they are returned or handled separately.
+        intervals = AvailabilityService.get_booking_intervals(
+            product, start_time, end_time, exclude_booking_id, exclude_session_key
+        )
+        return peak_concurrent_usage(intervals)
+
+    @staticmethod
+    def get_available_quantity(product, start_time, end_time, exclude_booking_id=None, exclude_session_key=None):
+        """
+        Returns the actual number of items available for booking in the given range.
         
-        active_statuses = ['draft', 'quotation_sent', 'pending_deposit', 'approved', 'active']
+        Formula: Total Stock - Peak concurrent booked quantity in the window
+        Served from AvailabilityCache unless exclude_booking_id is given (admin edit mode).
+        """
+        if exclude_booking_id is None and start_time and end_time:
+            return AvailabilityService.get_available_quantities(
+                [product], start_time, end_time, exclude_session_key=exclude_session_key
+            )[product.id]
+
+        booked_qty = AvailabilityService.get_booked_quantity(
+            product, start_time, end_time, exclude_booking_id, exclude_session_key
+        )
+        return max(0, product.quantity - booked_qty)
+
+    @staticmethod
+    def get_available_quantities(products, start_time, end_time, exclude_booking_id=None, exclude_session_key=None):
+        """
+        Batched version of get_available_quantity() for catalog pages and carts.
+        Results are cached per product (AvailabilityCache); only cache misses are
+        queried, still in one query.
         
-        query = Q(booking__status__in=active_statuses) & \
-                Q(product=product) & \
-                Q(booking__start_time__lt=end_time) & \
-                Q(booking__end_time__gt=start_time)
+        Args:
+            products: iterable of Product instances (list or queryset).
+            
+        Returns:
+            dict: {product_id: available quantity}
+        """
+        products = list(products)
+        if not start_time or not end_time:
+            return {product.id: product.quantity for product in products}
 
-        if exclude_booking_id:
-            query &= ~Q(booking__id=exclude_booking_id)
+        if exclude_booking_id is None:
+            return AvailabilityCache.get_available_quantities(
+                products, start_time, end_time, exclude_session_key,
+                lambda missing: AvailabilityService._compute_available_quantities(
+                    missing, start_time, end_time, None, exclude_session_key
+                )
+            )
+        return AvailabilityService._compute_available_quantities(
+            products, start_time, end_time, exclude_booking_id, exclude_session_key
+        )
 
-        booked_qty = BookingItem.objects.filter(query).aggregate(Sum('quantity'))['quantity__sum'] or 0
-        return booked_qty
+    @staticmethod
+    def _compute_available_quantities(products, start_time, end_time, exclude_booking_id, exclude_session_key):
+        """
+        Uncached get_available_quantities(): one interval query + sweep per product.
+        """
+        intervals = AvailabilityService.get_booking_intervals_by_product(
+            [product.id for product in products], start_time, end_time, exclude_booking_id, exclude_session_key
+        )
+        return {
+            product.id: max(0, product.quantity - peak_concurrent_usage(intervals.get(product.id, [])))
+            for product in products
+        }
 
     @staticmethod
-    def get_available_quantity(product, start_time, end_time, exclude_booking_id=None):
+    def get_daily_availability(products, start_date, days):
         """
-        Returns the actual number of items available for booking in the given range.
+        Free units per product for each calendar day (heatmap / date picker / stock series).
+        
+        Booked units come from ProductDayLoad (reserved units per product per local day,
+        kept current by signals) with one indexed range read. Live cart holds are not in
+        that table, so they are loaded in a second query and spread over the days they
+        touch with NumPy difference arrays + cumulative sums. A booking occupies every
+        local day it touches (day granularity).
         
-        Formula: Total Stock - Max(Booked Quantity in overlap)
+        Args:
+            products: list of Product instances.
+            start_date: date of the first column.
+            days: number of columns.
+            
+        Returns:
+            dict: {product_id: [free units for day 0, day 1, ...]}
         """
-        booked_qty = AvailabilityService.get_booked_quantity(product, start_time, end_time, exclude_booking_id)
-        return max(0, product.quantity - booked_qty)
+        products = list(products)
+        if not products or days <= 0:
+            return {}
+
+        window_start = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+        window_end = timezone.make_aware(datetime.combine(start_date + timedelta(days=days), datetime.min.time()))
+        row_of = {product.id: row for row, product in enumerate(products)}
+
+        occupancy = np.zeros((len(products), days), dtype=np.int64)
+        loads = ProductDayLoad.objects.filter(
+            product_id__in=list(row_of), date__gte=start_date, date__lt=start_date + timedelta(days=days)
+        ).values_list('product_id', 'date', 'reserved')
+        for product_id, day, reserved in loads:
+            occupancy[row_of[product_id], (day - start_date).days] = reserved
+
+        rows, firsts, lasts, quantities = [], [], [], []
+        for product_id, h_start, h_end, quantity in AvailabilityService.hold_rows(list(row_of), window_start, window_end):
+            h_start, h_end = max(h_start, window_start), min(h_end, window_end)
+            rows.append(row_of[product_id])
+            firsts.append((timezone.localtime(h_start).date() - start_date).days)
+            lasts.append((timezone.localtime(h_end - timedelta(microseconds=1)).date() - start_date).days)
+            quantities.append(quantity)
+
+        # Difference array: +q on the first day, -q the day after the last day
+        if rows:
+            diff = np.zeros((len(products), days + 1), dtype=np.int64)
+            rows = np.asarray(rows)
+            quantities = np.asarray(quantities, dtype=np.int64)
+            np.add.at(diff, (rows, np.asarray(firsts)), quantities)
+            np.add.at(diff, (rows, np.asarray(lasts) + 1), -quantities)
+            occupancy += np.cumsum(diff[:, :days], axis=1)
+
+        stock = np.array([product.quantity for product in products], dtype=np.int64)
+        free = np.maximum(stock[:, None] - occupancy, 0)
+
+        return {product.id: free[row].tolist() for row, product in enumerate(products)}
+
+    @staticmethod
+    def find_available_slots(requirements, start_date, duration_days, count=3, horizon_days=90, exclude_session_key=None):
+        """
+        Earliest windows of `duration_days` whole days where every requirement is free.
+        
+        One interval fetch covers all products and the whole horizon; a sweep over the
+        sorted events gives the peak usage of each day, and a sliding window over the
+        "blocked day" flags finds the valid start dates (no day-by-day queries).
+        
+        Args:
+            requirements: list of (Product, quantity) - a single product or a whole cart.
+            start_date: first candidate start date.
+            duration_days: rental length in days (inclusive range like the cart).
+            count: how many windows to return; windows returned do not overlap each other.
+            horizon_days: how far ahead to search.
+            exclude_session_key: (Optional) session whose own cart holds are ignored.
+            
+        Returns:
+            list of (start_date, end_date) tuples, end_date inclusive.
+        """
+        requirements = [(product, quantity) for product, quantity in requirements if quantity > 0]
+        if not requirements or duration_days <= 0:
+            return []
+
+        total_days = horizon_days + duration_days
+        day_starts = [
+            timezone.make_aware(datetime.combine(start_date + timedelta(days=i), datetime.min.time()))
+            for i in range(total_days + 1)
+        ]
+        intervals = AvailabilityService.get_booking_intervals_by_product(
+            [product.id for product, _ in requirements], day_starts[0], day_starts[-1],
+            exclude_session_key=exclude_session_key
+        )
+
+        blocked = [False] * total_days
+        for product, quantity in requirements:
+            limit = product.quantity - quantity
+            if limit < 0:
+                return []
+
+            events = []
+            for b_start, b_end, b_quantity in intervals.get(product.id, []):
+                events.append((b_start, b_quantity))
+                events.append((b_end, -b_quantity))
+            events.sort()
+
+            position = 0
+            in_use = 0
+            for day in range(total_days):
+                # Events up to (and including) midnight set the usage at the start of the day
+                while position < len(events) and events[position][0] <= day_starts[day]:
+                    in_use += events[position][1]
+                    position += 1
+                day_peak = in_use
+                while position < len(events) and events[position][0] < day_starts[day + 1]:
+                    in_use += events[position][1]
+                    position += 1
+                    day_peak = max(day_peak, in_use)
+                if day_peak > limit:
+                    blocked[day] = True
+
+        # prefix[i] = number of blocked days before day i
+        prefix = [0]
+        for is_blocked in blocked:
+            prefix.append(prefix[-1] + is_blocked)
+
+        slots = []
+        day = 0
+        while day <= horizon_days and len(slots) < count:
+            if prefix[day + duration_days] - prefix[day] == 0:
+                slots.append((start_date + timedelta(days=day), start_date + timedelta(days=day + duration_days - 1)))
+                day += duration_days
+            else:
+                day += 1
+        return slots
 
     @staticmethod
-    def check_availability(product, start_time, end_time, requested_quantity=1, exclude_booking_id=None):
+    def check_availability(product, start_time, end_time, requested_quantity=1, exclude_booking_id=None, exclude_session_key=None):
         """
         Checks if a specific quantity can be booked.
         
         Returns:
             (bool, str): (True, "") if available, (False, "Error message") if not.
         """
-        available = AvailabilityService.get_available_quantity(product, start_time, end_time, exclude_booking_id)
+        available = AvailabilityService.get_available_quantity(
+            product, start_time, end_time, exclude_booking_id, exclude_session_key
+        )
         if available >= requested_quantity:
             return True, ""
         
-        msg = f"สินค้า '{product.name}' ไม่พอสำหรับการจองในช่วงเวลานี้ (เหลือ {available} ชิ้น)"
-        return False, msg
+        return False, AvailabilityService.shortage_message(product, available)
+
+    @staticmethod
+    def shortage_message(product, available):
+        return f"สินค้า '{product.name}' ไม่พอสำหรับการจองในช่วงเวลานี้ (เหลือ {available} ชิ้น)"
+
+    @staticmethod
+    def package_components(package):
+        """
+        Expands a Package into [(Product, quantity per package)], merging duplicate products.
+        Uses package.items.all(), so prefetch 'items__product' when looping over packages.
+        """
+        components = {}
+        for item in package.items.all():
+            product, quantity = components.get(item.product_id, (item.product, 0))
+            components[item.product_id] = (product, quantity + item.quantity)
+        return list(components.values())
+
+    @staticmethod
+    def get_packages_availability(packages, start_time, end_time, exclude_session_key=None):
+        """
+        Availability of several packages at once: every component of every package
+        is checked in ONE batched query (get_available_quantities).
+        
+        Returns:
+            dict: {package_id: {
+                'max_quantity': how many whole packages can be booked,
+                'bottleneck': component Product that limits max_quantity (None for an empty package),
+                'components': [{'product', 'quantity', 'available'}, ...],
+            }}
+        """
+        packages = list(packages)
+        components = {package.id: AvailabilityService.package_components(package) for package in packages}
+        products = {product.id: product for items in components.values() for product, _ in items}
+        available = AvailabilityService.get_available_quantities(
+            products.values(), start_time, end_time, exclude_session_key=exclude_session_key
+        )
+
+        result = {}
+        for package in packages:
+            max_quantity = None
+            bottleneck = None
+            rows = []
+            for product, quantity in components[package.id]:
+                fits = available[product.id] // quantity
+                if max_quantity is None or fits < max_quantity:
+                    max_quantity = fits
+                    bottleneck = product
+                rows.append({'product': product, 'quantity': quantity, 'available': available[product.id]})
+            result[package.id] = {
+                'max_quantity': max_quantity or 0,
+                'bottleneck': bottleneck,
+                'components': rows,
+            }
+        return result
+
+    @staticmethod
+    def check_package_availability(package, start_time, end_time, requested_quantity=1, exclude_session_key=None):
+        """
+        Checks if `requested_quantity` packages can be booked.
+        
+        Returns:
+            (bool, str): (True, "") if available, (False, "Error message naming the bottleneck") if not.
+        """
+        info = AvailabilityService.get_packages_availability(
+            [package], start_time, end_time, exclude_session_key
+        )[package.id]
+        if not info['components']:
+            return False, f"แพ็คเกจ '{package.name}' ยังไม่มีรายการสินค้า"
+        if info['max_quantity'] >= requested_quantity:
+            return True, ""
+
+        # หา Component ที่ไม่พอสำหรับจำนวนที่ขอ
+        for row in info['components']:
+            if row['available'] < row['quantity'] * requested_quantity:
+                return False, (
+                    f"แพ็คเกจ '{package.name}' ไม่พอสำหรับการจองในช่วงเวลานี้: "
+                    f"{AvailabilityService.shortage_message(row['product'], row['available'])}"
+                )
+        return False, f"แพ็คเกจ '{package.name}' ไม่พอสำหรับการจองในช่วงเวลานี้"
+
+    @staticmethod
+    def cart_requirements(cart):
+        """
+        Total quantity needed per product for a cart, with packages expanded.
+        
+        Returns:
+            list of (Product, quantity)
+        """
+        requirements = {}
+        for item in cart:
+            if item.get('package'):
+                lines = [(product, quantity * item['quantity'])
+                         for product, quantity in AvailabilityService.package_components(item['package'])]
+            else:
+                lines = [(item['product'], item['quantity'])]
+            for product, quantity in lines:
+                _, total = requirements.get(product.id, (product, 0))
+                requirements[product.id] = (product, total + quantity)
+        return list(requirements.values())
 
     @staticmethod
     def check_resource_overlap(resource_field, resource_instance, start_time, end_time, exclude_booking_id=None):
@@ -92,10 +482,7 @@ class AvailabilityService:
             (bool, Booking/None): (True, None) if available.
                                   (False, ConflictingBooking) if overlapping.
         """
-        # Statuses that block resources
-        blocking_statuses = ['approved', 'active', 'quotation_sent', 'pending_deposit'] 
-        
-        query = Q(status__in=blocking_statuses) & \
+        query = Q(status__in=AvailabilityService.RESOURCE_BLOCKING_STATUSES) & \
                 Q(start_time__lt=end_time) & \
                 Q(end_time__gt=start_time)
 
@@ -113,9 +500,74 @@ class AvailabilityService:
         return True, None
 
     @staticmethod
-    def validate_cart(cart, start_time, end_time):
+    def check_resource_overlaps(start_time, end_time, equipment=None, studios=None, staff=None, exclude_booking_id=None):
         """
-        Validates an entire cart against the requested time range.
+        Bulk version of check_resource_overlap() for a whole booking form.
+        Runs at most one query per M2M through-table (equipment / studios / staff)
+        and reports EVERY conflict instead of stopping at the first one.
+        
+        Args:
+            start_time, end_time: datetime range.
+            equipment, studios, staff: iterables of Equipment / Studio / Staff instances.
+            exclude_booking_id: ID to exclude (edit mode).
+            
+        Returns:
+            list of dict: [{'field': 'equipment', 'resource': <Equipment>,
+                            'booking_id': 12, 'customer_name': '...'}, ...]
+                          Empty list when everything is free.
+        """
+        if not start_time or not end_time:
+            return []
+
+        conflicts = []
+        resources = [('equipment', equipment), ('studios', studios), ('staff', staff)]
+        for field, instances in resources:
+            by_id = {instance.pk: instance for instance in (instances or [])}
+            if not by_id:
+                continue
+
+            m2m_field = Booking._meta.get_field(field)
+            through = m2m_field.remote_field.through
+            resource_column = m2m_field.m2m_reverse_field_name()
+
+            query = Q(**{f'{resource_column}__in': list(by_id)}) & \
+                    Q(booking__status__in=AvailabilityService.RESOURCE_BLOCKING_STATUSES) & \
+                    Q(booking__start_time__lt=end_time) & \
+                    Q(booking__end_time__gt=start_time)
+
+            if exclude_booking_id:
+                query &= ~Q(booking_id=exclude_booking_id)
+
+            rows = through.objects.filter(query).order_by('booking__start_time').values_list(
+                resource_column, 'booking_id', 'booking__customer_name'
+            )
+            for resource_id, booking_id, customer_name in rows:
+                conflicts.append({
+                    'field': field,
+                    'resource': by_id[resource_id],
+                    'booking_id': booking_id,
+                    'customer_name': customer_name,
+                })
+
+        return conflicts
+
+    @staticmethod
+    def conflict_message(conflict):
+        """ข้อความ Error (ภาษาไทย) สำหรับผลลัพธ์หนึ่งรายการจาก check_resource_overlaps()"""
+        resource = conflict['resource']
+        customer_name = conflict['customer_name']
+        if conflict['field'] == 'equipment':
+            equip_name = resource.product.name if resource.product else "Unknown"
+            return f"อุปกรณ์ '{equip_name} - {resource.serial_number}' ถูกจองแล้วในช่วงเวลานี้ (Booked by: {customer_name})"
+        if conflict['field'] == 'studios':
+            return f"สตูดิโอ '{resource.name}' ถูกจองแล้วในช่วงเวลานี้ (Booked by: {customer_name})"
+        return f"พนักงาน '{resource.name}' ติดงานแล้วในช่วงเวลานี้ (Booked by: {customer_name})"
+
+    @staticmethod
+    def validate_cart(cart, start_time, end_time, exclude_session_key=None):
+        """
+        Validates an entire cart against the requested time range (always uncached).
+        Pass the cart's session key so its own holds do not count against it.
         
         Returns:
             (bool, str): (True, "") if all items are available.
@@ -123,13 +575,16 @@ class AvailabilityService:
         """
         if not start_time or not end_time:
             return False, "กรุณาระบุวันเวลารับ-คืนของ"
+
+        # แพ็คเกจจะถูกแตกเป็นสินค้าย่อย และรวมจำนวนกับสินค้าชนิดเดียวกันในตะกร้า
+        # ไม่ใช้ Cache: ผลนี้ใช้ตัดสินการจองจริง (Cache ของแต่ละ Process อาจช้ากว่า DB ได้)
+        requirements = AvailabilityService.cart_requirements(cart)
+        available = AvailabilityService._compute_available_quantities(
+            [product for product, _ in requirements], start_time, end_time, None, exclude_session_key
+        )
             
-        for item in cart:
-            product = item['product']
-            quantity = item['quantity']
-            
-            is_valid, error_msg = AvailabilityService.check_availability(product, start_time, end_time, quantity)
-            if not is_valid:
-                return False, error_msg
+        for product, quantity in requirements:
+            if available[product.id] < quantity:
+                return False, AvailabilityService.shortage_message(product, available[product.id])
                 
         return True, ""
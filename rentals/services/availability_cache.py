@@ -0,0 +1,123 @@
+import threading
+import time
+
+from django.core.cache import InvalidCacheBackendError, caches
+from django.db import transaction
+
+
+class AvailabilityCache:
+    """
+    Versioned result cache in front of AvailabilityService.get_available_quantities().
+
+    Entries are keyed by product, window, session and the product's version counter.
+    Writes never delete entries: signals (rentals/signals.py) bump the version of the
+    products they touch, so old entries are simply never read again and age out of
+    the backend's LRU. Use the 'availability' cache alias (see CACHES in settings);
+    LocMemCache evicts least-recently-used keys once MAX_ENTRIES is reached.
+    """
+
+    ALIAS = 'availability'
+    # Live StockHolds expire without any write, so results must not live long
+    TIMEOUT = 60
+
+    _lock = threading.Lock()
+    _stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def backend():
+        try:
+            return caches[AvailabilityCache.ALIAS]
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    @staticmethod
+    def _version_key(product_id):
+        return f"availability:version:{product_id}"
+
+    @staticmethod
+    def get_versions(product_ids):
+        """
+        Current version per product. A missing counter (never set, or evicted) is
+        seeded with a nanosecond timestamp so it can never match an older entry.
+        """
+        cache = AvailabilityCache.backend()
+        keys = {product_id: AvailabilityCache._version_key(product_id) for product_id in product_ids}
+        stored = cache.get_many(keys.values())
+
+        versions = {}
+        for product_id, key in keys.items():
+            if key not in stored:
+                cache.add(key, time.time_ns(), None)
+                stored[key] = cache.get(key)
+            versions[product_id] = stored[key]
+        return versions
+
+    @staticmethod
+    def bump(product_ids):
+        """
+        Invalidates every cached result of these products. Bumps now (same-transaction
+        readers) and again on commit (readers that cached pre-commit data meanwhile).
+        """
+        product_ids = {product_id for product_id in product_ids if product_id}
+        if not product_ids:
+            return
+
+        def _bump():
+            cache = AvailabilityCache.backend()
+            for product_id in product_ids:
+                try:
+                    cache.incr(AvailabilityCache._version_key(product_id))
+                except ValueError:
+                    cache.set(AvailabilityCache._version_key(product_id), time.time_ns(), None)
+
+        _bump()
+        transaction.on_commit(_bump)
+
+    @staticmethod
+    def get_available_quantities(products, start_time, end_time, session_key, compute):
+        """
+        Returns {product_id: available} for `products`, calling compute(missing_products)
+        once for every product not in the cache and storing its results.
+        """
+        products = list(products)
+        if not products:
+            return {}
+
+        cache = AvailabilityCache.backend()
+        versions = AvailabilityCache.get_versions([product.id for product in products])
+        window = f"{start_time.isoformat()}:{end_time.isoformat()}:{session_key or '-'}"
+        keys = {product.id: f"availability:{product.id}:{versions[product.id]}:{window}" for product in products}
+
+        cached = cache.get_many(keys.values())
+        result = {product_id: cached[key] for product_id, key in keys.items() if key in cached}
+        missing = [product for product in products if product.id not in result]
+
+        with AvailabilityCache._lock:
+            AvailabilityCache._stats['hits'] += len(result)
+            AvailabilityCache._stats['misses'] += len(missing)
+
+        if missing:
+            computed = compute(missing)
+            cache.set_many({keys[product_id]: value for product_id, value in computed.items()}, AvailabilityCache.TIMEOUT)
+            result.update(computed)
+        return result
+
+    @staticmethod
+    def stats():
+        """
+        Hit/miss counters of this process (per product lookup).
+
+        Returns:
+            dict: {'hits', 'misses', 'hit_rate'}
+        """
+        with AvailabilityCache._lock:
+            hits = AvailabilityCache._stats['hits']
+            misses = AvailabilityCache._stats['misses']
+        total = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
+
+    @staticmethod
+    def reset_stats():
+        with AvailabilityCache._lock:
+            AvailabilityCache._stats['hits'] = 0
+            AvailabilityCache._stats['misses'] = 0
@@ -1,6 +1,13 @@
+import random
+import time
+from decimal import Decimal
 from django.contrib.auth.models import User
-from .models import Booking, BookingItem, Notification
-from .services.notify import send_line_notify
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from rentals.models import Booking, BookingItem, Notification, Product
+from rentals.services.availability import AvailabilityService
+from rentals.services.holds import StockHoldService
+from rentals.services.notify import send_line_notify
 
 
 class BookingService:
@@ -9,6 +16,52 @@ class BookingService:
     Centralizes booking logic to keep views thin.
     """
     
+    # SQLite ตอบ "database is locked" เมื่อมีคน Checkout พร้อมกัน -> ลองใหม่หลังรอสักครู่
+    RESERVATION_ATTEMPTS = 20
+    RESERVATION_BACKOFF_SECONDS = 0.01
+    
+    @staticmethod
+    def reserve_booking_from_cart(cart, booking_data, user=None, session_key=None):
+        """
+        Re-checks stock and creates the booking as one atomic step, so two customers
+        checking out the last unit at the same moment cannot both succeed.
+        
+        Every product in the cart (packages expanded) has its stock_version row
+        bumped before availability is checked. That write locks only those
+        products' rows (in id order, so checkouts cannot deadlock); checkouts
+        for other products proceed in parallel. On SQLite, which only allows one
+        writer, the first write takes the database lock and busy errors are retried.
+        
+        The session's own cart holds (session_key) do not count against it and are
+        released once the booking exists - the hold is converted into the booking.
+        
+        Returns:
+            (Booking, "") on success, (None, "Error message") if stock ran out.
+        """
+        requirements = AvailabilityService.cart_requirements(cart)
+        product_ids = sorted(product.id for product, _ in requirements)
+        
+        for attempt in range(BookingService.RESERVATION_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    if connection.features.has_select_for_update:
+                        list(Product.objects.select_for_update().filter(id__in=product_ids).order_by('id').values_list('id', flat=True))
+                    Product.objects.filter(id__in=product_ids).update(stock_version=F('stock_version') + 1)
+                    
+                    is_valid, error = AvailabilityService.validate_cart(
+                        cart, booking_data.get('start_time'), booking_data.get('end_time'), session_key
+                    )
+                    if not is_valid:
+                        return None, error
+                    
+                    booking = BookingService.create_booking_from_cart(cart, booking_data, user)
+                    StockHoldService.release(session_key)
+                    return booking, ""
+            except OperationalError as e:
+                if 'locked' not in str(e) or attempt == BookingService.RESERVATION_ATTEMPTS - 1:
+                    raise
+                time.sleep(BookingService.RESERVATION_BACKOFF_SECONDS * (attempt + 1) * (1 + random.random()))
+    
     @staticmethod
     def create_booking_from_cart(cart, booking_data, user=None):
         """
@@ -52,8 +105,18 @@ class BookingService:
         # Create booking
         booking = Booking.objects.create(**booking_data)
         
-        # Create booking items from cart
+        # Create booking items from cart (packages are expanded into their components)
         for item in cart:
+            if item.get('package'):
+                for product, quantity, unit_price in BookingService.package_item_prices(item['package']):
+                    BookingItem.objects.create(
+                        booking=booking,
+                        product=product,
+                        quantity=quantity * item['quantity'],
+                        price_at_booking=unit_price
+                    )
+                continue
+
             BookingItem.objects.create(
                 booking=booking,
                 product=item['product'],
@@ -61,11 +124,40 @@ class BookingService:
                 price_at_booking=item['price']
             )
         
-        # Send notifications
-        BookingService._send_booking_notifications(booking)
+        # Send notifications after commit: a rolled-back reservation never notifies staff,
+        # and a failing notification (robust=True) never undoes or retries a committed booking
+        transaction.on_commit(lambda: BookingService._send_booking_notifications(booking), robust=True)
         
         return booking
     
+    @staticmethod
+    def package_item_prices(package):
+        """
+        Splits the package price over its components in proportion to their list price,
+        so the BookingItems of one package add up to the package price.
+        
+        Returns:
+            list of (Product, quantity per package, unit price)
+        """
+        # Components with quantity 1 go last so they can absorb the rounding remainder exactly
+        components = sorted(AvailabilityService.package_components(package), key=lambda c: c[1] == 1)
+        total_weight = sum(product.price * quantity for product, quantity in components)
+        total_units = sum(quantity for _, quantity in components)
+
+        lines = []
+        remaining = package.price
+        for index, (product, quantity) in enumerate(components):
+            if index == len(components) - 1:
+                line_total = remaining
+            elif total_weight:
+                line_total = package.price * product.price * quantity / total_weight
+            else:
+                line_total = package.price * quantity / total_units
+            unit_price = (line_total / quantity).quantize(Decimal('0.01'))
+            remaining -= unit_price * quantity
+            lines.append((product, quantity, unit_price))
+        return lines
+    
     @staticmethod
     def _send_booking_notifications(booking):
         """
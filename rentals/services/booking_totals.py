@@ -0,0 +1,86 @@
+from rentals.models import Booking
+from rentals.services.revenue_rollup import RevenueRollupService
+
+STORED_FIELDS = ['rental_days', 'subtotal', 'total_amount']
+
+
+class BookingTotalsService:
+    """
+    Keeps the stored Booking.rental_days / subtotal / total_amount columns in line
+    with Booking.objects.with_totals(). Signals call refresh() for the bookings they
+    touch; recompute_booking_totals backfills and verifies everything in batches.
+
+    Rate changes (Studio.daily_rate, Product.price for legacy equipment-only bookings)
+    are not tracked by signals: re-run the command after changing rates.
+    """
+
+    @staticmethod
+    def compute(booking_ids):
+        """
+        Returns:
+            dict: {booking_id: (rental_days, subtotal, total_amount)} - one query
+        """
+        rows = Booking.objects.filter(pk__in=booking_ids).with_totals().order_by().values_list(
+            'pk', 'computed_rental_days', 'items_subtotal', 'equipment_subtotal', 'studio_subtotal', 'total_price'
+        )
+        return {
+            pk: (days, items + equipment + studios, total)
+            for pk, days, items, equipment, studios, total in rows
+        }
+
+    @staticmethod
+    def refresh(booking_ids):
+        """
+        Recomputes and stores the totals of these bookings with bulk_update
+        (no save(), so no signals, history rows or updated_at changes), then
+        refreshes their DailyRevenueRollup days.
+
+        Returns:
+            int: number of bookings written
+        """
+        booking_ids = {booking_id for booking_id in booking_ids if booking_id}
+        if not booking_ids:
+            return 0
+
+        computed = BookingTotalsService.compute(booking_ids)
+        Booking.objects.bulk_update(
+            [
+                Booking(pk=pk, rental_days=days, subtotal=subtotal, total_amount=total)
+                for pk, (days, subtotal, total) in computed.items()
+            ],
+            STORED_FIELDS
+        )
+        RevenueRollupService.refresh_bookings(computed)
+        return len(computed)
+
+    @staticmethod
+    def _batches(batch_size):
+        ids = list(Booking.objects.order_by('pk').values_list('pk', flat=True))
+        for index in range(0, len(ids), batch_size):
+            yield ids[index:index + batch_size]
+
+    @staticmethod
+    def rebuild(batch_size=500):
+        """
+        Backfills every booking, `batch_size` bookings per query.
+
+        Returns:
+            int: number of bookings written
+        """
+        return sum(BookingTotalsService.refresh(batch) for batch in BookingTotalsService._batches(batch_size))
+
+    @staticmethod
+    def verify(batch_size=500):
+        """
+        Compares stored columns with freshly computed values.
+
+        Returns:
+            list of (booking_id, stored, expected) tuples, each a (rental_days, subtotal, total_amount)
+        """
+        mismatches = []
+        for batch in BookingTotalsService._batches(batch_size):
+            computed = BookingTotalsService.compute(batch)
+            for pk, *stored in Booking.objects.filter(pk__in=batch).order_by('pk').values_list('pk', *STORED_FIELDS):
+                if tuple(stored) != computed[pk]:
+                    mismatches.append((pk, tuple(stored), computed[pk]))
+        return mismatches
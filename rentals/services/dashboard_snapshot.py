@@ -0,0 +1,126 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from rentals.services.dashboard_stats import DashboardStatsService
+
+
+class DashboardSnapshot:
+    """
+    Short-lived cached copy of DashboardStatsService.get_stats() shared by every
+    dashboard request, in the 'dashboard' cache alias. That alias must be visible to
+    every process (database cache in settings), otherwise invalidation, the lock and
+    the cron warm-up only affect the process that ran them.
+
+    - Fresh for DASHBOARD_SNAPSHOT_SECONDS, and only while the version counter is
+      unchanged: signals call invalidate() when a Booking, BookingItem or Product changes.
+    - Stampede protection: only the request holding the cache.add() lock recomputes.
+      Everyone else gets the previous (stale) snapshot of the same day, or waits
+      briefly for the new one.
+    - warm_dashboard_stats rebuilds it ahead of time (cron) so requests rarely compute.
+    """
+
+    ALIAS = 'dashboard'
+    KEY = 'dashboard:snapshot'
+    VERSION_KEY = 'dashboard:version'
+    LOCK_KEY = 'dashboard:snapshot:lock'
+    LOCK_TIMEOUT = 30
+    # Stale copies are kept this long so they can be served during a recompute
+    STALE_TIMEOUT = 60 * 60
+    WAIT_SECONDS = 2
+    POLL_SECONDS = 0.05
+
+    @staticmethod
+    def backend():
+        return caches[DashboardSnapshot.ALIAS]
+
+    @staticmethod
+    def ttl():
+        return getattr(settings, 'DASHBOARD_SNAPSHOT_SECONDS', 30)
+
+    @staticmethod
+    def version():
+        cache = DashboardSnapshot.backend()
+        version = cache.get(DashboardSnapshot.VERSION_KEY)
+        if version is None:
+            cache.add(DashboardSnapshot.VERSION_KEY, time.time_ns(), None)
+            version = cache.get(DashboardSnapshot.VERSION_KEY)
+        return version
+
+    @staticmethod
+    def invalidate():
+        """
+        Marks the current snapshot stale. Bumps now and again on commit, like
+        AvailabilityCache.bump().
+        """
+        def _bump():
+            cache = DashboardSnapshot.backend()
+            try:
+                cache.incr(DashboardSnapshot.VERSION_KEY)
+            except ValueError:
+                cache.set(DashboardSnapshot.VERSION_KEY, time.time_ns(), None)
+
+        _bump()
+        transaction.on_commit(_bump)
+
+    @staticmethod
+    def _is_fresh(entry, version, today):
+        return (
+            entry is not None
+            and entry['version'] == version
+            and entry['today'] == today
+            and time.time() - entry['built_at'] < DashboardSnapshot.ttl()
+        )
+
+    @staticmethod
+    def refresh(version=None):
+        """
+        Recomputes and stores the snapshot. The version is read before computing, so a
+        write that lands meanwhile leaves the new snapshot already stale.
+
+        Returns:
+            dict: the stats
+        """
+        if version is None:
+            version = DashboardSnapshot.version()
+        stats = DashboardStatsService.get_stats()
+        DashboardSnapshot.backend().set(DashboardSnapshot.KEY, {
+            'version': version,
+            'today': stats['today'],
+            'built_at': time.time(),
+            'stats': stats,
+        }, DashboardSnapshot.STALE_TIMEOUT)
+        return stats
+
+    @staticmethod
+    def get_stats():
+        """
+        Same dict as DashboardStatsService.get_stats() for today, from the snapshot when possible.
+        """
+        cache = DashboardSnapshot.backend()
+        today = timezone.localdate()
+        version = DashboardSnapshot.version()
+        entry = cache.get(DashboardSnapshot.KEY)
+        if DashboardSnapshot._is_fresh(entry, version, today):
+            return entry['stats']
+
+        if cache.add(DashboardSnapshot.LOCK_KEY, 1, DashboardSnapshot.LOCK_TIMEOUT):
+            try:
+                return DashboardSnapshot.refresh(version)
+            finally:
+                cache.delete(DashboardSnapshot.LOCK_KEY)
+
+        # Another request is recomputing: a slightly stale snapshot of today is fine
+        if entry is not None and entry['today'] == today:
+            return entry['stats']
+
+        deadline = time.monotonic() + DashboardSnapshot.WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(DashboardSnapshot.POLL_SECONDS)
+            entry = cache.get(DashboardSnapshot.KEY)
+            if entry is not None and entry['today'] == today:
+                return entry['stats']
+        return DashboardStatsService.get_stats()
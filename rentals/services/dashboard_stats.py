@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db.models import Case, CharField, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from rentals.models import Booking, DailyRevenueRollup, Equipment, Product, Staff, Studio
+from rentals.services.revenue_rollup import REVENUE_STATUSES
+
+TREND_DAYS = 7
+
+
+def _growth(current, previous):
+    """
+    Percent change vs the previous period (100 when there was nothing before).
+    """
+    if previous > 0:
+        return round(float((current - previous) / previous * 100), 1)
+    return 100 if current > 0 else 0
+
+
+class DashboardStatsService:
+    """
+    Every counter shown on the dashboards (views.dashboard, views.dashboard_callback,
+    CustomAdminSite.index, {% get_dashboard_stats %}) in two queries:
+    one conditional aggregate over DailyRevenueRollup and one UNION ALL of grouped
+    counts over Equipment / Product / Studio / Staff / User.
+    """
+
+    @staticmethod
+    def booking_stats(today):
+        """
+        One DailyRevenueRollup.aggregate() with Sum(filter=...): counts per status come
+        from every row, month / day figures from date-filtered rows.
+        """
+        month_start = today.replace(day=1)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        last_month = (month_start - timedelta(days=1)).replace(day=1)
+
+        this_month_q = Q(date__gte=month_start, date__lt=next_month)
+        last_month_q = Q(date__gte=last_month, date__lt=month_start)
+        revenue_q = Q(status__in=REVENUE_STATUSES)
+        trend_days = [today - timedelta(days=i) for i in range(TREND_DAYS - 1, -1, -1)]
+
+        aggregates = {
+            'bookings_today': Sum('booking_count', filter=Q(date=today)),
+            'bookings_this_month': Sum('booking_count', filter=this_month_q),
+            'bookings_last_month': Sum('booking_count', filter=last_month_q),
+            'revenue_this_month': Sum('revenue', filter=this_month_q & revenue_q),
+            'revenue_last_month': Sum('revenue', filter=last_month_q & revenue_q),
+        }
+        for status, _ in Booking.STATUS_CHOICES:
+            aggregates[f'status_{status}'] = Sum('booking_count', filter=Q(status=status))
+        for index, day in enumerate(trend_days):
+            aggregates[f'revenue_day_{index}'] = Sum('revenue', filter=Q(date=day) & revenue_q)
+
+        # Sum() over no rows is NULL
+        row = {key: value or 0 for key, value in DailyRevenueRollup.objects.aggregate(**aggregates).items()}
+
+        status_counts = {status: row[f'status_{status}'] for status, _ in Booking.STATUS_CHOICES}
+        revenue_this_month = row['revenue_this_month']
+        revenue_last_month = row['revenue_last_month']
+        return {
+            'bookings_today': row['bookings_today'],
+            'bookings_pending': status_counts['draft'],
+            'bookings_this_month': row['bookings_this_month'],
+            'bookings_last_month': row['bookings_last_month'],
+            'bookings_growth': _growth(row['bookings_this_month'], row['bookings_last_month']),
+            'revenue_this_month': revenue_this_month,
+            'revenue_last_month': revenue_last_month,
+            'revenue_growth': _growth(revenue_this_month, revenue_last_month),
+            'status_counts': status_counts,
+            'daily_revenue': [
+                (day, float(row[f'revenue_day_{index}'])) for index, day in enumerate(trend_days)
+            ],
+        }
+
+    @staticmethod
+    def resource_stats():
+        """
+        One query: (kind, state, count) rows for serials, products, studios, staff and users.
+        """
+        def grouped(queryset, kind, state):
+            return queryset.order_by().annotate(
+                kind=Value(kind, output_field=CharField()), state=state
+            ).values_list('kind', 'state').annotate(total=Count('pk'))
+
+        is_true = lambda **conditions: Case(
+            When(then=Value('yes'), **conditions), default=Value('no'), output_field=CharField()
+        )
+        rows = grouped(Equipment.objects.all(), 'equipment', F('status')).union(
+            grouped(Product.objects.all(), 'product', is_true(is_active=True, quantity__gt=0)),
+            grouped(Studio.objects.all(), 'studio', Value('yes', output_field=CharField())),
+            grouped(Staff.objects.all(), 'staff', is_true(is_active=True)),
+            grouped(User.objects.all(), 'user', is_true(is_staff=True, is_active=True)),
+            all=True
+        )
+
+        counts = {}
+        for kind, state, total in rows:
+            counts[(kind, state)] = total
+            counts[(kind, None)] = counts.get((kind, None), 0) + total
+
+        return {
+            'equipment_total': counts.get(('equipment', None), 0),
+            'equipment_available': counts.get(('equipment', 'available'), 0),
+            'equipment_maintenance': counts.get(('equipment', 'maintenance'), 0),
+            'equipment_lost': counts.get(('equipment', 'lost'), 0),
+            'product_total': counts.get(('product', None), 0),
+            'product_available': counts.get(('product', 'yes'), 0),
+            'studio_total': counts.get(('studio', None), 0),
+            'staff_active': counts.get(('staff', 'yes'), 0),
+            'user_staff_active': counts.get(('user', 'yes'), 0),
+            'total_users': counts.get(('user', None), 0),
+        }
+
+    @staticmethod
+    def get_stats(today=None):
+        """
+        Returns:
+            dict: booking counters (today / pending / this and last month / per status),
+            revenue (month, last month, growth, 7-day daily_revenue), serial states,
+            product, studio, staff and user counts - two queries in total.
+        """
+        today = today or timezone.localdate()
+        stats = {'today': today}
+        stats.update(DashboardStatsService.booking_stats(today))
+        stats.update(DashboardStatsService.resource_stats())
+        return stats
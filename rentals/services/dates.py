@@ -0,0 +1,14 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+def on_local_day(field, day):
+    """
+    Q() matching datetimes of `field` inside the local calendar date `day`, as the
+    half-open range [00:00, next day 00:00). Use it instead of field__date=day,
+    which wraps the column in a function and cannot use an index.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return Q(**{f'{field}__gte': start, f'{field}__lt': start + timedelta(days=1)})
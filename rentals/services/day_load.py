@@ -0,0 +1,136 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from rentals.models import Booking, BookingItem, ProductDayLoad
+from rentals.services.availability import AvailabilityService
+
+
+def booking_days(start_time, end_time):
+    """
+    Returns the local calendar dates touched by [start_time, end_time).
+    A booking ending exactly at midnight does not occupy the next day.
+    """
+    if not start_time or not end_time or start_time >= end_time:
+        return []
+
+    first_day = timezone.localtime(start_time).date()
+    last_day = timezone.localtime(end_time - timedelta(microseconds=1)).date()
+    return [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+
+
+class DayLoadService:
+    """
+    Maintains the ProductDayLoad table (reserved units per product per day).
+    Writers call apply_delta() from signals; AvailabilityService.get_daily_availability() reads it.
+    """
+
+    @staticmethod
+    def apply_delta(product_id, days, delta):
+        """
+        Adds `delta` units to every (product, day) row, creating missing rows.
+        Rows that drop back to zero are removed to keep the table small.
+        """
+        if not days or not delta:
+            return
+
+        with transaction.atomic():
+            ProductDayLoad.objects.bulk_create(
+                [ProductDayLoad(product_id=product_id, date=day, reserved=0) for day in days],
+                ignore_conflicts=True
+            )
+            rows = ProductDayLoad.objects.filter(product_id=product_id, date__in=days)
+            rows.update(reserved=F('reserved') + delta)
+            if delta < 0:
+                rows.filter(reserved__lte=0).delete()
+
+    @staticmethod
+    def apply_booking(booking_id, status, start_time, end_time, sign):
+        """
+        Adds (sign=1) or removes (sign=-1) the contribution of every item of a booking.
+        """
+        if status not in AvailabilityService.ACTIVE_STATUSES:
+            return
+
+        days = booking_days(start_time, end_time)
+        if not days:
+            return
+
+        items = BookingItem.objects.filter(booking_id=booking_id).values_list('product_id', 'quantity')
+        for product_id, quantity in items:
+            DayLoadService.apply_delta(product_id, days, sign * quantity)
+
+    @staticmethod
+    def apply_booking_item(booking_id, product_id, quantity, sign):
+        """
+        Adds (sign=1) or removes (sign=-1) one BookingItem, using its booking's current dates.
+        """
+        booking = Booking.objects.filter(pk=booking_id).values_list('status', 'start_time', 'end_time').first()
+        if not booking:
+            return
+        status, start_time, end_time = booking
+        if status not in AvailabilityService.ACTIVE_STATUSES:
+            return
+        DayLoadService.apply_delta(product_id, booking_days(start_time, end_time), sign * quantity)
+
+    @staticmethod
+    def compute_expected():
+        """
+        Recomputes the whole table from live BookingItem/Booking data.
+
+        Returns:
+            dict: {(product_id, date): reserved}
+        """
+        expected = {}
+        rows = BookingItem.objects.filter(
+            booking__status__in=AvailabilityService.ACTIVE_STATUSES
+        ).values_list('product_id', 'quantity', 'booking__start_time', 'booking__end_time')
+
+        for product_id, quantity, start_time, end_time in rows.iterator(chunk_size=2000):
+            for day in booking_days(start_time, end_time):
+                key = (product_id, day)
+                expected[key] = expected.get(key, 0) + quantity
+        return {key: value for key, value in expected.items() if value}
+
+    @staticmethod
+    def rebuild():
+        """
+        Drops and rebuilds the table from scratch.
+
+        Returns:
+            int: number of rows written
+        """
+        expected = DayLoadService.compute_expected()
+        with transaction.atomic():
+            ProductDayLoad.objects.all().delete()
+            ProductDayLoad.objects.bulk_create(
+                [
+                    ProductDayLoad(product_id=product_id, date=day, reserved=reserved)
+                    for (product_id, day), reserved in expected.items()
+                ],
+                batch_size=2000
+            )
+        return len(expected)
+
+    @staticmethod
+    def verify():
+        """
+        Compares the stored table against live data.
+
+        Returns:
+            list of (product_id, date, stored, expected) for every mismatching row.
+        """
+        expected = DayLoadService.compute_expected()
+        stored = {
+            (product_id, day): reserved
+            for product_id, day, reserved in ProductDayLoad.objects.values_list('product_id', 'date', 'reserved')
+            if reserved
+        }
+
+        mismatches = []
+        for key in sorted(set(expected) | set(stored)):
+            if expected.get(key, 0) != stored.get(key, 0):
+                mismatches.append((key[0], key[1], stored.get(key, 0), expected.get(key, 0)))
+        return mismatches
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from rentals.models import Booking, StockHold
+from rentals.services.availability import AvailabilityService
+from rentals.services.availability_cache import AvailabilityCache
+
+
+class StockHoldService:
+    """
+    Short-lived cart holds (StockHold) and the sweeper that expires stale holds and drafts.
+    A cart's holds are always rebuilt as a whole from its contents, so there is
+    never more than one hold per (session, product).
+    """
+
+    @staticmethod
+    def hold_minutes():
+        return getattr(settings, 'STOCK_HOLD_MINUTES', 20)
+
+    @staticmethod
+    def hold_cart(session_key, cart, start_time, end_time):
+        """
+        Replaces the session's holds with one hold per product in the cart
+        (packages expanded), each expiring STOCK_HOLD_MINUTES from now.
+
+        Returns:
+            int: number of holds written
+        """
+        if not session_key:
+            return 0
+
+        expires_at = timezone.now() + timedelta(minutes=StockHoldService.hold_minutes())
+        holds = [
+            StockHold(
+                session_key=session_key,
+                product=product,
+                quantity=quantity,
+                start_time=start_time,
+                end_time=end_time,
+                expires_at=expires_at,
+            )
+            for product, quantity in AvailabilityService.cart_requirements(cart)
+        ]
+
+        with transaction.atomic():
+            old_holds = StockHold.objects.filter(session_key=session_key)
+            touched = set(old_holds.values_list('product_id', flat=True)) | {hold.product_id for hold in holds}
+            old_holds.delete()
+            StockHold.objects.bulk_create(holds)
+            AvailabilityCache.bump(touched)
+        return len(holds)
+
+    @staticmethod
+    def release(session_key):
+        """
+        Drops every hold of a session (cart emptied or converted into a Booking).
+        """
+        if session_key:
+            holds = StockHold.objects.filter(session_key=session_key)
+            AvailabilityCache.bump(holds.values_list('product_id', flat=True))
+            holds.delete()
+
+    @staticmethod
+    def expire(now=None, draft_days=None, batch_size=500):
+        """
+        Sweeper: deletes expired holds and moves drafts untouched for `draft_days`
+        (default DRAFT_EXPIRY_DAYS) to 'expired', in batches of `batch_size` so the
+        write lock is never held for long.
+
+        Drafts are saved one by one so the ProductDayLoad signals and history still run.
+
+        Returns:
+            (holds_deleted, drafts_expired)
+        """
+        now = now or timezone.now()
+        if draft_days is None:
+            draft_days = getattr(settings, 'DRAFT_EXPIRY_DAYS', 3)
+
+        holds_deleted = 0
+        while True:
+            rows = list(StockHold.objects.filter(expires_at__lte=now).values_list('id', 'product_id')[:batch_size])
+            if not rows:
+                break
+            ids = [hold_id for hold_id, _ in rows]
+            AvailabilityCache.bump(product_id for _, product_id in rows)
+            holds_deleted += StockHold.objects.filter(id__in=ids).delete()[0]
+
+        drafts_expired = 0
+        cutoff = now - timedelta(days=draft_days)
+        while True:
+            with transaction.atomic():
+                drafts = list(Booking.objects.filter(status='draft', updated_at__lt=cutoff).order_by('id')[:batch_size])
+                for booking in drafts:
+                    booking.status = 'expired'
+                    booking.save(update_fields=['status', 'updated_at'])
+            drafts_expired += len(drafts)
+            if len(drafts) < batch_size:
+                break
+
+        return holds_deleted, drafts_expired
@@ -0,0 +1,263 @@
+import hashlib
+import random
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from time import sleep
+
+from django.core.signing import Signer
+from django.db import OperationalError, transaction
+from django.db.models import Count, Exists, Max, OuterRef
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from rentals.models import Booking, FeedChange, Staff, Studio
+
+# kind ใน URL -> (Model, ชื่อ M2M field บน Booking)
+FEED_RESOURCES = {
+    'staff': (Staff, 'staff'),
+    'studio': (Studio, 'studios'),
+}
+
+ICS_STATUSES = {
+    'draft': 'TENTATIVE',
+    'quotation_sent': 'TENTATIVE',
+    'pending_deposit': 'TENTATIVE',
+}
+
+
+def ics_text(value):
+    """Escapes a TEXT value (RFC 5545 3.3.11)."""
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def ics_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def fold_line(line):
+    """Folds a content line at 75 octets without splitting a UTF-8 character."""
+    parts = []
+    current, size, limit = '', 0, 75
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > limit:
+            parts.append(current)
+            current, size, limit = ' ', 1, 75
+        current += char
+        size += width
+    parts.append(current)
+    return '\r\n'.join(parts)
+
+
+class IcsFeedService:
+    """
+    iCalendar (.ics) feeds of a Staff member's / Studio's bookings in a rolling window.
+
+    - Full feed: bookings in [today - PAST_DAYS, today + FUTURE_DAYS), strong ETag from one
+      aggregate over those bookings, so unchanged polls end in a 304 without building the body.
+    - Incremental feed (?since=<sync token>): only this resource's bookings with a FeedChange
+      row after the token. Those no longer in the feed (moved out of the window, expired)
+      are sent as STATUS:CANCELLED, and so are bookings the resource was removed from or
+      that were deleted since the token. Bookings that never belonged to this resource are
+      not sent at all.
+
+    The sync token is the last FeedChange id. Signals write those rows in on_commit, so ids
+    follow commit order: a change committed after a token was handed out always gets a
+    larger id (updated_at is set at save time and could land below an earlier token).
+    Events carry no SEQUENCE; clients order revisions by LAST-MODIFIED / DTSTAMP.
+    """
+
+    PAST_DAYS = 30
+    FUTURE_DAYS = 365
+    HIDDEN_STATUSES = ['expired']
+    SALT = 'rentals.ics_feed'
+    # SQLite ตอบ "database is locked" เมื่อเขียนพร้อมกัน -> ลองใหม่ (เหมือน BookingService)
+    WRITE_ATTEMPTS = 20
+    WRITE_BACKOFF_SECONDS = 0.01
+
+    @staticmethod
+    def feed_key(kind, pk):
+        """Secret for the feed URL (calendar apps cannot log in)."""
+        return Signer(salt=IcsFeedService.SALT).signature(f"{kind}:{pk}")
+
+    @staticmethod
+    def check_key(kind, pk, key):
+        return bool(key) and constant_time_compare(key, IcsFeedService.feed_key(kind, pk))
+
+    @staticmethod
+    def feed_url(kind, pk):
+        return f"{reverse('ics_feed', args=[kind, pk])}?key={IcsFeedService.feed_key(kind, pk)}"
+
+    @staticmethod
+    def window(today=None):
+        today = today or timezone.localdate()
+        start = timezone.make_aware(datetime.combine(today - timedelta(days=IcsFeedService.PAST_DAYS), time.min))
+        return start, start + timedelta(days=IcsFeedService.PAST_DAYS + IcsFeedService.FUTURE_DAYS)
+
+    @staticmethod
+    def feed_bookings(field, resource, start, end):
+        return Booking.objects.filter(
+            **{field: resource}, start_time__lt=end, end_time__gt=start
+        ).exclude(status__in=IcsFeedService.HIDDEN_STATUSES)
+
+    # --- Sync token ---
+
+    @staticmethod
+    def sync_token():
+        return str(FeedChange.objects.aggregate(value=Max('id'))['value'] or 0)
+
+    @staticmethod
+    def parse_sync_token(token):
+        """
+        Raises:
+            ValueError: if the token was not made by sync_token()
+        """
+        change_id = int(token)
+        if change_id < 0:
+            raise ValueError("Invalid sync token")
+        return change_id
+
+    # --- ETag ---
+
+    @staticmethod
+    def etag(kind, resource, start, end, since=None, token=None):
+        """
+        Strong ETag of the feed body. Full feed: one aggregate over the resource's bookings.
+        Incremental feed: the body depends on every change since `since`, so the current
+        global `token` is the fingerprint.
+        """
+        if since is None:
+            state = IcsFeedService.feed_bookings(FEED_RESOURCES[kind][1], resource, start, end).aggregate(
+                booking_rows=Count('id'), last_updated=Max('updated_at'),
+            )
+            fingerprint = f"{state['booking_rows']}|{state['last_updated']}"
+        else:
+            fingerprint = f"{since}|{token}"
+        raw = f"{kind}:{resource.pk}|{resource}|{start.isoformat()}|{fingerprint}"
+        return '"' + hashlib.md5(raw.encode()).hexdigest() + '"'
+
+    # --- Body ---
+
+    @staticmethod
+    def vevent(uid, booking_id, customer_name, status, start_time, end_time, updated_at):
+        return [
+            'BEGIN:VEVENT',
+            f'UID:{uid}',
+            f'DTSTAMP:{ics_datetime(updated_at)}',
+            f'LAST-MODIFIED:{ics_datetime(updated_at)}',
+            f'DTSTART:{ics_datetime(start_time)}',
+            f'DTEND:{ics_datetime(end_time)}',
+            f'SUMMARY:{ics_text(customer_name)}',
+            f'DESCRIPTION:{ics_text(f"Booking #{booking_id} ({status})")}',
+            f'STATUS:{ICS_STATUSES.get(status, "CONFIRMED")}',
+            'END:VEVENT',
+        ]
+
+    @staticmethod
+    def cancelled_vevent(uid, start_time, stamp):
+        return [
+            'BEGIN:VEVENT',
+            f'UID:{uid}',
+            f'DTSTAMP:{ics_datetime(stamp)}',
+            f'DTSTART:{ics_datetime(start_time)}',
+            'STATUS:CANCELLED',
+            'END:VEVENT',
+        ]
+
+    @staticmethod
+    def uid(booking_id):
+        return f"booking-{booking_id}@rentals"
+
+    @staticmethod
+    def events(kind, resource, start, end, since=None):
+        """
+        Returns:
+            list of content lines for the VEVENTs (1 query, or 2 when incremental)
+        """
+        field = FEED_RESOURCES[kind][1]
+        columns = ('id', 'customer_name', 'status', 'start_time', 'end_time', 'updated_at')
+        lines = []
+
+        if since is None:
+            rows = IcsFeedService.feed_bookings(field, resource, start, end).order_by('start_time', 'id').values_list(*columns)
+            for row in rows:
+                lines += IcsFeedService.vevent(IcsFeedService.uid(row[0]), *row)
+            return lines
+
+        changes = FeedChange.objects.filter(id__gt=since)
+        in_feed = Exists(IcsFeedService.feed_bookings(field, resource, start, end).filter(pk=OuterRef('pk')))
+        changed = Booking.objects.filter(
+            **{field: resource}, pk__in=changes.filter(resource_id=None).values('booking_id')
+        ).annotate(in_feed=in_feed).order_by('start_time', 'id').values_list(*columns, 'in_feed')
+        sent = set()
+        for *row, visible in changed:
+            sent.add(row[0])
+            if visible:
+                lines += IcsFeedService.vevent(IcsFeedService.uid(row[0]), *row)
+            else:
+                lines += IcsFeedService.cancelled_vevent(IcsFeedService.uid(row[0]), row[3], row[5])
+
+        removed = changes.filter(
+            kind=kind, resource_id=resource.pk
+        ).order_by('id').values_list('booking_id', 'start_time', 'created_at')
+        for booking_id, start_time, removed_at in removed:
+            # ถอดออกแล้วใส่กลับ (อยู่ใน changed แล้ว) หรือถูกถอดซ้ำ -> ส่งครั้งเดียว
+            if booking_id in sent:
+                continue
+            sent.add(booking_id)
+            lines += IcsFeedService.cancelled_vevent(IcsFeedService.uid(booking_id), start_time, removed_at)
+        return lines
+
+    # --- Change log (called from signals) ---
+
+    @staticmethod
+    def record_changes(booking_ids):
+        """Logs bookings whose feed content may have changed, after the transaction commits."""
+        rows = [FeedChange(booking_id=booking_id) for booking_id in booking_ids]
+        if rows:
+            transaction.on_commit(lambda: IcsFeedService._write_changes(rows))
+
+    @staticmethod
+    def record_removals(kind, links):
+        """
+        Logs (booking_id, resource_id, start_time) links that are about to disappear
+        (resource removed from the booking, or the booking deleted), after the
+        transaction commits.
+        """
+        rows = [
+            FeedChange(kind=kind, resource_id=resource_id, booking_id=booking_id, start_time=start_time)
+            for booking_id, resource_id, start_time in links
+        ]
+        if rows:
+            transaction.on_commit(lambda: IcsFeedService._write_changes(rows))
+
+    @staticmethod
+    def _write_changes(rows):
+        # รันหลัง Commit: Booking บันทึกแล้ว ห้ามโยน "locked" กลับไปให้ผู้เรียกลองทำรายการซ้ำ
+        for attempt in range(IcsFeedService.WRITE_ATTEMPTS):
+            try:
+                FeedChange.objects.bulk_create(rows)
+                return
+            except OperationalError as e:
+                if 'locked' not in str(e) or attempt == IcsFeedService.WRITE_ATTEMPTS - 1:
+                    raise
+                sleep(IcsFeedService.WRITE_BACKOFF_SECONDS * (attempt + 1) * (1 + random.random()))
+
+    @staticmethod
+    def calendar(kind, resource, start, end, since=None):
+        """The whole VCALENDAR as CRLF-separated, folded text."""
+        lines = [
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            'PRODID:-//rentals//Booking Feed//TH',
+            'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH',
+            f'X-WR-CALNAME:{ics_text(resource)}',
+            'X-WR-TIMEZONE:' + timezone.get_current_timezone_name(),
+        ]
+        lines += IcsFeedService.events(kind, resource, start, end, since)
+        lines.append('END:VCALENDAR')
+        return '\r\n'.join(fold_line(line) for line in lines) + '\r\n'
@@ -0,0 +1,190 @@
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from rentals.models import Booking, DailyRevenueRollup
+from rentals.services.dates import on_local_day
+
+REVENUE_STATUSES = ['approved', 'completed']
+
+
+def local_day(value):
+    return timezone.localtime(value).date() if value else None
+
+
+class RevenueRollupService:
+    """
+    Maintains DailyRevenueRollup: one row per (local start date, status) with the
+    booking count and Sum(total_amount). A day is always recomputed as a whole from
+    Booking, so writers only need to say which days they touched:
+    - signals (status / start_time changes, deletes)
+    - BookingTotalsService.refresh() (total_amount changes)
+    QuerySet.update() sends no signals: run rebuild_revenue_rollup afterwards.
+    """
+
+    @staticmethod
+    def _aggregate(rows):
+        rollup = {}
+        for start_time, status, total_amount in rows:
+            key = (local_day(start_time), status)
+            count, revenue = rollup.get(key, (0, 0))
+            rollup[key] = (count + 1, revenue + (total_amount or 0))
+        return rollup
+
+    @staticmethod
+    def compute_days(days):
+        """
+        Returns:
+            dict: {(date, status): (booking_count, revenue)} for bookings starting on `days`
+        """
+        days = sorted({day for day in days if day})
+        if not days:
+            return {}
+        rows = Booking.objects.filter(
+            reduce(or_, (on_local_day('start_time', day) for day in days))
+        ).values_list('start_time', 'status', 'total_amount')
+        return RevenueRollupService._aggregate(rows)
+
+    @staticmethod
+    def refresh_days(days):
+        """
+        Rewrites the rollup rows of these local dates.
+
+        Returns:
+            int: number of rows written
+        """
+        days = {day for day in days if day}
+        if not days:
+            return 0
+
+        with transaction.atomic():
+            computed = RevenueRollupService.compute_days(days)
+            DailyRevenueRollup.objects.filter(date__in=days).delete()
+            DailyRevenueRollup.objects.bulk_create([
+                DailyRevenueRollup(date=day, status=status, booking_count=count, revenue=revenue)
+                for (day, status), (count, revenue) in computed.items()
+            ])
+        return len(computed)
+
+    @staticmethod
+    def refresh_bookings(booking_ids):
+        """
+        Rewrites the days on which these bookings start.
+        """
+        booking_ids = {booking_id for booking_id in booking_ids if booking_id}
+        if booking_ids:
+            RevenueRollupService.refresh_days(
+                local_day(start_time)
+                for start_time in Booking.objects.filter(pk__in=booking_ids).values_list('start_time', flat=True)
+            )
+
+    @staticmethod
+    def compute_expected():
+        rows = Booking.objects.exclude(start_time=None).values_list('start_time', 'status', 'total_amount')
+        return RevenueRollupService._aggregate(rows.iterator(chunk_size=2000))
+
+    @staticmethod
+    def rebuild():
+        """
+        Drops and rebuilds the table from scratch.
+
+        Returns:
+            int: number of rows written
+        """
+        expected = RevenueRollupService.compute_expected()
+        with transaction.atomic():
+            DailyRevenueRollup.objects.all().delete()
+            DailyRevenueRollup.objects.bulk_create(
+                [
+                    DailyRevenueRollup(date=day, status=status, booking_count=count, revenue=revenue)
+                    for (day, status), (count, revenue) in expected.items()
+                ],
+                batch_size=2000
+            )
+        return len(expected)
+
+    @staticmethod
+    def verify():
+        """
+        Compares the stored table against live data.
+
+        Returns:
+            list of (date, status, stored, expected), each a (booking_count, revenue)
+        """
+        expected = RevenueRollupService.compute_expected()
+        stored = {
+            (day, status): (count, revenue)
+            for day, status, count, revenue in DailyRevenueRollup.objects.values_list(
+                'date', 'status', 'booking_count', 'revenue'
+            )
+        }
+
+        mismatches = []
+        for key in sorted(set(expected) | set(stored)):
+            if expected.get(key, (0, 0)) != stored.get(key, (0, 0)):
+                mismatches.append((key[0], key[1], stored.get(key, (0, 0)), expected.get(key, (0, 0))))
+        return mismatches
+
+    @staticmethod
+    def get_daily_revenue(start_date, end_date, statuses=REVENUE_STATUSES):
+        """
+        Revenue per day over an inclusive date range, one range scan on the rollup.
+
+        Returns:
+            list of (date, revenue as float), one entry per day including empty days
+        """
+        totals = dict(
+            DailyRevenueRollup.objects.filter(
+                date__gte=start_date, date__lte=end_date, status__in=statuses
+            ).values('date').annotate(total=Sum('revenue')).values_list('date', 'total')
+        )
+        return [
+            (start_date + timedelta(days=i), float(totals.get(start_date + timedelta(days=i)) or 0))
+            for i in range((end_date - start_date).days + 1)
+        ]
+
+    @staticmethod
+    def get_monthly_revenue(start_date, end_date, statuses=REVENUE_STATUSES):
+        """
+        Revenue and booking count per calendar month, for every month touched by
+        [start_date, end_date]. One TruncMonth-grouped query; empty months are filled in.
+
+        Returns:
+            list of dicts: {'month': first day of month, 'revenue': Decimal, 'count': int}
+        """
+        first_month = start_date.replace(day=1)
+        after_last = (end_date.replace(day=1) + timedelta(days=32)).replace(day=1)
+        totals = {
+            month: (revenue, count)
+            for month, revenue, count in DailyRevenueRollup.objects.filter(
+                date__gte=first_month, date__lt=after_last, status__in=statuses
+            ).annotate(month=TruncMonth('date')).values('month').annotate(
+                revenue=Sum('revenue'), count=Sum('booking_count')
+            ).order_by('month').values_list('month', 'revenue', 'count')
+        }
+
+        months = []
+        month = first_month
+        while month < after_last:
+            revenue, count = totals.get(month, (0, 0))
+            months.append({'month': month, 'revenue': revenue or 0, 'count': count or 0})
+            month = (month + timedelta(days=32)).replace(day=1)
+        return months
+
+    @staticmethod
+    def get_status_counts(start_date, end_date):
+        """
+        Bookings per status starting within the inclusive date range.
+
+        Returns:
+            list of dicts: {'status', 'total'}
+        """
+        return list(
+            DailyRevenueRollup.objects.filter(date__gte=start_date, date__lte=end_date)
+            .values('status').annotate(total=Sum('booking_count')).order_by('status')
+        )
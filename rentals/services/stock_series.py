@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from rentals.services.availability import AvailabilityService
+
+
+class StockSeriesService:
+    """
+    Free stock per product for every day of a date range (e.g. the next quarter).
+
+    Uses AvailabilityService.get_daily_availability(): one range read of ProductDayLoad plus
+    the live cart holds spread with a cumulative sum over the (products x days) matrix,
+    so the number of queries does not grow with the number of days. "Free" follows the booking rules
+    (drafts and cart holds reserve stock), not the inventory dashboard's ledger statuses.
+    """
+
+    DEFAULT_DAYS = 92  # ~ 1 ไตรมาส
+    MAX_DAYS = 366
+
+    @staticmethod
+    def parse_range(start=None, end=None):
+        """
+        Returns:
+            (start_date, end_date) inclusive. Defaults to today .. DEFAULT_DAYS ahead;
+            ranges longer than MAX_DAYS are cut.
+
+        Raises:
+            ValueError: on unparsable dates or end < start
+        """
+        start_date = parse_date(start) if start else timezone.localdate()
+        if start_date is None:
+            raise ValueError("Dates must be YYYY-MM-DD")
+        end_date = parse_date(end) if end else start_date + timedelta(days=StockSeriesService.DEFAULT_DAYS - 1)
+        if end_date is None:
+            raise ValueError("Dates must be YYYY-MM-DD")
+        if end_date < start_date:
+            raise ValueError("end must not be before start")
+        return start_date, min(end_date, start_date + timedelta(days=StockSeriesService.MAX_DAYS - 1))
+
+    @staticmethod
+    def dates(start_date, end_date):
+        return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+    @staticmethod
+    def series(products, start_date, end_date):
+        """
+        Returns:
+            list of (product, [free units per day]) in the order of `products`
+        """
+        products = list(products)
+        free = AvailabilityService.get_daily_availability(products, start_date, (end_date - start_date).days + 1)
+        return [(product, free[product.id]) for product in products]
+
+    @staticmethod
+    def compact(series, start_date, end_date):
+        """
+        JSON-ready form for charts: dates are implied by start + index.
+
+        Returns:
+            dict: {'start', 'end', 'days', 'columns', 'products': [[id, name, quantity, [free...]], ...]}
+        """
+        return {
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'days': (end_date - start_date).days + 1,
+            'columns': ['id', 'name', 'quantity', 'free'],
+            'products': [[product.id, product.name, product.quantity, free] for product, free in series],
+        }
+
+    @staticmethod
+    def csv_rows(series):
+        """One row per product, one column per day (matches dates())."""
+        for product, free in series:
+            yield [product.id, product.name, product.category, product.quantity, *free]
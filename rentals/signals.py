@@ -0,0 +1,227 @@
+"""
+Signals สำหรับอัปเดตข้อมูลสรุป (Denormalized Tables) ให้ตรงกับการจองเสมอ
+หมายเหตุ: QuerySet.update() ไม่ส่ง Signal -> ใช้คำสั่ง rebuild_day_load เพื่อซ่อมข้อมูล
+"""
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Booking, BookingItem, Product
+from .services.availability_cache import AvailabilityCache
+from .services.booking_totals import STORED_FIELDS, BookingTotalsService
+from .services.dashboard_snapshot import DashboardSnapshot
+from .services.day_load import DayLoadService
+from .services.ics_feed import IcsFeedService
+from .services.revenue_rollup import RevenueRollupService, local_day
+
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_state(sender, instance, raw=False, **kwargs):
+    """เก็บสถานะ/วันเวลาเดิมไว้ก่อนบันทึก เพื่อคำนวณส่วนต่าง"""
+    instance._day_load_old = None
+    if raw or not instance.pk:
+        return
+    instance._day_load_old = Booking.objects.filter(pk=instance.pk).values_list(
+        'status', 'start_time', 'end_time'
+    ).first()
+
+
+@receiver(post_save, sender=Booking)
+def update_day_load_for_booking(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    old = getattr(instance, '_day_load_old', None)
+    new = (instance.status, instance.start_time, instance.end_time)
+    if old == new:
+        return
+
+    if old:
+        DayLoadService.apply_booking(instance.pk, *old, sign=-1)
+    DayLoadService.apply_booking(instance.pk, *new, sign=1)
+
+
+@receiver(pre_save, sender=BookingItem)
+def remember_booking_item_state(sender, instance, raw=False, **kwargs):
+    instance._day_load_old = None
+    if raw or not instance.pk:
+        return
+    instance._day_load_old = BookingItem.objects.filter(pk=instance.pk).values_list(
+        'booking_id', 'product_id', 'quantity'
+    ).first()
+
+
+@receiver(post_save, sender=BookingItem)
+def update_day_load_for_booking_item(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    old = getattr(instance, '_day_load_old', None)
+    new = (instance.booking_id, instance.product_id, instance.quantity)
+    if old == new:
+        return
+
+    if old:
+        DayLoadService.apply_booking_item(*old, sign=-1)
+    DayLoadService.apply_booking_item(*new, sign=1)
+
+
+@receiver(pre_delete, sender=BookingItem)
+def remove_day_load_for_booking_item(sender, instance, **kwargs):
+    # pre_delete: ตอน Cascade จาก Booking ตัว Booking ยังอยู่ใน DB ให้อ่านวันที่ได้
+    DayLoadService.apply_booking_item(instance.booking_id, instance.product_id, instance.quantity, sign=-1)
+
+
+# --- Availability cache invalidation (bump per-product version counters) ---
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def bump_availability_for_booking(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # post_delete: items were cascaded first and already bumped their products
+    AvailabilityCache.bump(BookingItem.objects.filter(booking_id=instance.pk).values_list('product_id', flat=True))
+
+
+@receiver(post_save, sender=BookingItem)
+@receiver(post_delete, sender=BookingItem)
+def bump_availability_for_booking_item(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_day_load_old', None)
+    AvailabilityCache.bump([instance.product_id, old[1] if old else None])
+
+
+@receiver(post_save, sender=Product)
+def bump_availability_for_product(sender, instance, raw=False, **kwargs):
+    # จำนวนสต็อกทั้งหมด (quantity) อาจเปลี่ยน
+    if not raw:
+        AvailabilityCache.bump([instance.pk])
+
+
+# --- Stored booking totals (Booking.rental_days / subtotal / total_amount) ---
+
+def writes_stored_totals(update_fields):
+    return update_fields is None or bool(set(update_fields) & set(STORED_FIELDS))
+
+
+@receiver(post_save, sender=Booking)
+def refresh_totals_for_booking(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # save() เขียนยอดรวมในหน่วยความจำ (อาจเก่ากว่า DB) ทับลงไป -> คำนวณใหม่ทุกครั้งที่บันทึกฟิลด์เหล่านี้
+    if not raw and writes_stored_totals(update_fields):
+        BookingTotalsService.refresh([instance.pk])
+
+
+@receiver(post_save, sender=BookingItem)
+@receiver(post_delete, sender=BookingItem)
+def refresh_totals_for_booking_item(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_day_load_old', None)
+    BookingTotalsService.refresh([instance.booking_id, old[0] if old else None])
+
+
+@receiver(m2m_changed, sender=Booking.studios.through)
+@receiver(m2m_changed, sender=Booking.equipment.through)
+def refresh_totals_for_booking_resources(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        BookingTotalsService.refresh([instance.pk])
+    elif pk_set:
+        # เปลี่ยนจากฝั่ง Studio/Equipment: pk_set คือ Booking ที่ได้รับผล
+        BookingTotalsService.refresh(pk_set)
+
+
+# --- ICS feed: บันทึก FeedChange (Sync token) และขยับ Booking.updated_at (ETag / LAST-MODIFIED) ---
+
+@receiver(post_save, sender=Booking)
+def record_feed_change_for_booking(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    IcsFeedService.record_changes([instance.pk])
+
+
+@receiver(m2m_changed, sender=Booking.staff.through)
+@receiver(m2m_changed, sender=Booking.studios.through)
+def touch_booking_for_feed_resources(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            booking_ids = [instance.pk]
+        else:
+            return
+    elif action in ('post_add', 'post_remove') and pk_set:
+        booking_ids = pk_set
+    elif action == 'pre_clear':
+        # post_clear ไม่มี pk_set -> เก็บ Booking ที่ได้รับผลก่อนลบ
+        booking_ids = list(sender.objects.filter(**{instance._meta.model_name: instance}).values_list('booking_id', flat=True))
+    else:
+        return
+    Booking.objects.filter(pk__in=booking_ids).update(updated_at=timezone.now())
+    if action == 'post_add':
+        # การถอดออกบันทึกใน record_feed_removals แล้ว
+        IcsFeedService.record_changes(booking_ids)
+
+
+# ถอดพนักงาน/สตูดิโอ หรือลบ Booking -> บันทึก FeedChange (kind + resource_id) ให้ ICS feed ส่ง CANCELLED เฉพาะปฏิทินที่เคยมีงานนั้น
+FEED_THROUGHS = {
+    Booking.staff.through: ('staff', 'staff_id'),
+    Booking.studios.through: ('studio', 'studio_id'),
+}
+
+
+@receiver(m2m_changed, sender=Booking.staff.through)
+@receiver(m2m_changed, sender=Booking.studios.through)
+def record_feed_removals(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('pre_remove', 'pre_clear'):
+        return
+    kind, column = FEED_THROUGHS[sender]
+    links = sender.objects.filter(**{column if reverse else 'booking_id': instance.pk})
+    if action == 'pre_remove':
+        links = links.filter(**{'booking_id__in' if reverse else f'{column}__in': pk_set})
+    IcsFeedService.record_removals(kind, links.values_list('booking_id', column, 'booking__start_time'))
+
+
+@receiver(pre_delete, sender=Booking)
+def record_feed_removals_for_deleted_booking(sender, instance, **kwargs):
+    for through, (kind, column) in FEED_THROUGHS.items():
+        IcsFeedService.record_removals(kind, [
+            (instance.pk, resource_id, instance.start_time)
+            for resource_id in through.objects.filter(booking_id=instance.pk).values_list(column, flat=True)
+        ])
+
+
+# --- DailyRevenueRollup (ยอด total_amount ที่เปลี่ยนถูกอัปเดตใน BookingTotalsService.refresh) ---
+
+@receiver(post_save, sender=Booking)
+def refresh_revenue_rollup_for_booking(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_day_load_old', None)
+    if not old or old == (instance.status, instance.start_time, instance.end_time):
+        return
+    # วันใหม่ถูกคำนวณแล้วใน refresh_totals_for_booking เว้นแต่ update_fields ข้ามยอดรวม
+    old_day, new_day = local_day(old[1]), local_day(instance.start_time)
+    days = {old_day} if old_day != new_day else set()
+    if not writes_stored_totals(update_fields):
+        days.add(new_day)
+    RevenueRollupService.refresh_days(days)
+
+
+@receiver(post_delete, sender=Booking)
+def refresh_revenue_rollup_for_deleted_booking(sender, instance, **kwargs):
+    RevenueRollupService.refresh_days([local_day(instance.start_time)])
+
+
+# --- Dashboard snapshot invalidation ---
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=BookingItem)
+@receiver(post_delete, sender=BookingItem)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_dashboard_snapshot(sender, raw=False, **kwargs):
+    # BookingItem เปลี่ยน total_amount ของ Booking (bulk_update ไม่ส่ง Signal)
+    if not raw:
+        DashboardSnapshot.invalidate()
@@ -0,0 +1,63 @@
+import json
+
+from django.contrib.admin.models import ADDITION, CHANGE, LogEntry
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.test import TestCase
+
+from rentals.models import Product
+from rentals.services.activity_feed import ActivityFeedService, summarize_change_message
+
+
+class ActivityFeedTest(TestCase):
+    def setUp(self):
+        caches[ActivityFeedService.ALIAS].clear()
+        self.user = User.objects.create_user('admin', password='pw', is_staff=True)
+        content_type = ContentType.objects.get_for_model(Product)
+        self.entries = [
+            LogEntry.objects.log_action(
+                self.user.pk, content_type.pk, str(i), f"Product {i}",
+                ADDITION if i % 2 else CHANGE,
+                json.dumps([{'changed': {'fields': ['price']}}]) if i % 2 == 0 else json.dumps([{'added': {}}])
+            )
+            for i in range(25)
+        ]
+
+    def test_keyset_pages_cover_the_feed_once(self):
+        seen = []
+        cursor = None
+        while True:
+            entries, cursor = ActivityFeedService.page(cursor, limit=10)
+            seen.extend(entry['id'] for entry in entries)
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted((entry.id for entry in self.entries), reverse=True))
+
+    def test_cached_page_is_one_query(self):
+        with self.assertNumQueries(2):
+            first, _ = ActivityFeedService.page()
+        with self.assertNumQueries(1):
+            again, _ = ActivityFeedService.page()
+        self.assertEqual(first, again)
+        self.assertEqual(first[0]['username'], 'admin')
+        self.assertEqual(first[0]['message'], "Changed: price")
+        self.assertTrue(first[1]['is_addition'])
+
+    def test_summarize_change_message(self):
+        self.assertEqual(summarize_change_message('[{"deleted": {}}]'), "Deleted")
+        self.assertEqual(summarize_change_message('not json'), "not json")
+        self.assertEqual(summarize_change_message(''), "Changed")
+
+    def test_load_more_api(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/rentals/api/activity/', {'limit': 20})
+        data = response.json()
+        self.assertEqual(len(data['items']), 20)
+
+        response = self.client.get('/rentals/api/activity/', {'before': data['next_cursor']})
+        data = response.json()
+        self.assertEqual(len(data['items']), 5)
+        self.assertIsNone(data['next_cursor'])
+
+        self.assertEqual(self.client.get('/rentals/api/activity/', {'before': 'x'}).status_code, 400)
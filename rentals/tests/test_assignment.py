@@ -0,0 +1,65 @@
+from datetime import timedelta
+from django.db.models.signals import m2m_changed
+from django.test import TestCase
+from django.utils import timezone
+from rentals.models import Booking, BookingItem, Equipment, Product
+from rentals.services.assignment import SerialAssignmentService
+
+
+class SerialAssignmentTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Wireless Mic", price=500, quantity=3)
+        self.serials = [Equipment.objects.create(product=self.product, serial_number=f"MIC-{i}") for i in range(3)]
+        Equipment.objects.filter(pk=self.serials[2].pk).update(status='maintenance')
+        self.base = timezone.now() + timedelta(days=1)
+
+    def _book(self, start_hours, end_hours, quantity):
+        booking = Booking.objects.create(
+            customer_name=f"Job {start_hours}",
+            start_time=self.base + timedelta(hours=start_hours),
+            end_time=self.base + timedelta(hours=end_hours),
+            status='approved'
+        )
+        BookingItem.objects.create(booking=booking, product=self.product, quantity=quantity)
+        return booking
+
+    def test_back_to_back_jobs_reuse_the_same_serial(self):
+        first = self._book(0, 4, 1)
+        second = self._book(4, 8, 1)
+        assignments, shortages = SerialAssignmentService.assign(self.base, self.base + timedelta(days=1))
+
+        self.assertEqual(shortages, [])
+        self.assertEqual(len(assignments), 2)
+        self.assertEqual(list(first.equipment.all()), list(second.equipment.all()))
+
+    def test_maintenance_serials_are_skipped_and_shortage_reported(self):
+        existing = self._book(0, 4, 2)
+        existing.equipment.add(self.serials[0])
+        overlapping = self._book(2, 6, 2)
+
+        assignments, shortages = SerialAssignmentService.assign(self.base, self.base + timedelta(days=1))
+
+        self.assertEqual(set(existing.equipment.all()), {self.serials[0], self.serials[1]})
+        self.assertEqual(overlapping.equipment.count(), 0)
+        self.assertEqual(shortages, [(overlapping.id, self.product.id, 2)])
+        self.assertNotIn(self.serials[2].id, [equipment_id for _, equipment_id in assignments])
+
+    def test_assignments_go_through_equipment_add(self):
+        first = self._book(0, 4, 2)
+        added = []
+
+        def record(sender, instance, action, pk_set, **kwargs):
+            if action == 'post_add':
+                added.append((instance.pk, pk_set))
+
+        m2m_changed.connect(record, sender=Booking.equipment.through)
+        try:
+            SerialAssignmentService.assign(self.base, self.base + timedelta(days=1))
+        finally:
+            m2m_changed.disconnect(record, sender=Booking.equipment.through)
+
+        self.assertEqual(added, [(first.pk, {self.serials[0].pk, self.serials[1].pk})])
+
+        # รอบที่สองไม่มีอะไรต้องจัดเพิ่ม (Serial ที่จัดแล้วถูกนับ)
+        assignments, shortages = SerialAssignmentService.assign(self.base, self.base + timedelta(days=1))
+        self.assertEqual((assignments, shortages), ([], []))
@@ -0,0 +1,194 @@
+from django.test import TestCase
+from django.utils import timezone
+from datetime import datetime, timedelta
+from decimal import Decimal
+from rentals.models import Booking, BookingItem, Package, PackageItem, Product
+from rentals.services.availability import AvailabilityService, peak_concurrent_usage
+from rentals.services.booking_service import BookingService
+
+
+class PeakConcurrencyTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Sony A7S III", price=1500, quantity=2)
+        self.base_time = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=10)
+
+    def _book(self, start_offset, end_offset, quantity=1, status='approved'):
+        booking = Booking.objects.create(
+            customer_name=f"Customer {start_offset}-{end_offset}",
+            start_time=self.base_time + timedelta(days=start_offset),
+            end_time=self.base_time + timedelta(days=end_offset),
+            status=status
+        )
+        BookingItem.objects.create(booking=booking, product=self.product, quantity=quantity)
+        return booking
+
+    def test_back_to_back_rentals_use_one_unit(self):
+        """Two sequential 1-unit rentals inside the window only block 1 unit"""
+        self._book(0, 2)
+        self._book(2, 4)
+        window_end = self.base_time + timedelta(days=7)
+
+        self.assertEqual(AvailabilityService.get_booked_quantity(self.product, self.base_time, window_end), 1)
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.base_time, window_end), 1)
+
+    def test_overlapping_rentals_are_summed(self):
+        """Overlapping rentals add up at the instant they overlap"""
+        self._book(0, 3)
+        self._book(2, 5)
+        window_end = self.base_time + timedelta(days=7)
+
+        is_valid, msg = AvailabilityService.check_availability(self.product, self.base_time, window_end, 1)
+        self.assertFalse(is_valid)
+        self.assertIn("เหลือ 0 ชิ้น", msg)
+
+    def test_completed_and_excluded_bookings_are_ignored(self):
+        self._book(0, 3, quantity=2, status='completed')
+        own = self._book(0, 3, quantity=2)
+        window_end = self.base_time + timedelta(days=3)
+
+        self.assertEqual(AvailabilityService.get_booked_quantity(self.product, self.base_time, window_end), 2)
+        self.assertEqual(
+            AvailabilityService.get_booked_quantity(self.product, self.base_time, window_end, exclude_booking_id=own.id),
+            0
+        )
+
+    def test_naive_datetimes_are_accepted(self):
+        self._book(0, 3)
+        naive_start = timezone.make_naive(self.base_time)
+        naive_end = timezone.make_naive(self.base_time + timedelta(days=3))
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, naive_start, naive_end), 1)
+
+    def test_sweep_releases_before_pickups(self):
+        self.assertEqual(peak_concurrent_usage([(1, 2, 3), (2, 3, 3)]), 3)
+        self.assertEqual(peak_concurrent_usage([(1, 3, 3), (2, 4, 1), (5, 5, 9)]), 4)
+        self.assertEqual(peak_concurrent_usage([]), 0)
+
+
+class BatchedAvailabilityTest(TestCase):
+    def setUp(self):
+        self.camera = Product.objects.create(name="Camera", price=1000, quantity=3)
+        self.lens = Product.objects.create(name="Lens", price=300, quantity=1)
+        self.start = timezone.now() + timedelta(days=5)
+        self.end = self.start + timedelta(days=2)
+
+        booking = Booking.objects.create(customer_name="Existing", start_time=self.start, end_time=self.end, status='approved')
+        BookingItem.objects.create(booking=booking, product=self.camera, quantity=2)
+        BookingItem.objects.create(booking=booking, product=self.lens, quantity=1)
+
+    def test_get_available_quantities_uses_one_query(self):
+        with self.assertNumQueries(1):
+            available = AvailabilityService.get_available_quantities([self.camera, self.lens], self.start, self.end)
+        self.assertEqual(available, {self.camera.id: 1, self.lens.id: 0})
+
+    def test_validate_cart_reports_first_shortage(self):
+        cart = [
+            {'product': self.camera, 'quantity': 1},
+            {'product': self.lens, 'quantity': 1},
+        ]
+        is_valid, msg = AvailabilityService.validate_cart(cart, self.start, self.end)
+        self.assertFalse(is_valid)
+        self.assertIn("Lens", msg)
+
+        is_valid, msg = AvailabilityService.validate_cart(cart[:1], self.start, self.end)
+        self.assertTrue(is_valid)
+
+
+class DailyAvailabilityTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Tripod", price=200, quantity=3)
+        self.start_date = (timezone.localtime() + timedelta(days=20)).date()
+        start = timezone.make_aware(datetime.combine(self.start_date, datetime.min.time()))
+
+        # Day 1 10:00 -> Day 3 10:00 (2 units), Day 2 -> Day 2 (1 unit)
+        b1 = Booking.objects.create(customer_name="A", start_time=start + timedelta(days=1, hours=10),
+                                    end_time=start + timedelta(days=3, hours=10), status='approved')
+        BookingItem.objects.create(booking=b1, product=self.product, quantity=2)
+        b2 = Booking.objects.create(customer_name="B", start_time=start + timedelta(days=2, hours=8),
+                                    end_time=start + timedelta(days=2, hours=18), status='draft')
+        BookingItem.objects.create(booking=b2, product=self.product, quantity=1)
+
+    def test_daily_matrix(self):
+        free = AvailabilityService.get_daily_availability([self.product], self.start_date, 5)
+        self.assertEqual(free[self.product.id], [3, 1, 0, 1, 3])
+
+    def test_calendar_api(self):
+        response = self.client.get('/rentals/api/availability/calendar/', {
+            'product': self.product.id, 'start': self.start_date.isoformat(), 'days': 500
+        })
+        data = response.json()
+        self.assertEqual(data['days'], 90)
+        self.assertEqual(data['free'][str(self.product.id)][:5], [3, 1, 0, 1, 3])
+
+
+class AvailableSlotSearchTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Drone", price=2500, quantity=1)
+        self.start_date = (timezone.localtime() + timedelta(days=10)).date()
+        midnight = timezone.make_aware(datetime.combine(self.start_date, datetime.min.time()))
+
+        # Busy on day 0-2 and on day 5 (afternoon only)
+        for start, end in [(midnight, midnight + timedelta(days=3)),
+                           (midnight + timedelta(days=5, hours=13), midnight + timedelta(days=5, hours=17))]:
+            booking = Booking.objects.create(customer_name="Busy", start_time=start, end_time=end, status='approved')
+            BookingItem.objects.create(booking=booking, product=self.product, quantity=1)
+
+    def test_finds_earliest_non_overlapping_windows_with_one_query(self):
+        with self.assertNumQueries(1):
+            slots = AvailabilityService.find_available_slots([(self.product, 1)], self.start_date, 2, count=2)
+        day = lambda n: self.start_date + timedelta(days=n)
+        self.assertEqual(slots, [(day(3), day(4)), (day(6), day(7))])
+
+    def test_impossible_quantity_returns_nothing(self):
+        self.assertEqual(AvailabilityService.find_available_slots([(self.product, 2)], self.start_date, 1), [])
+
+    def test_api_rejects_bad_parameters(self):
+        params = {'product': self.product.id, 'days': 2, 'count': 1, 'start': self.start_date.isoformat()}
+        response = self.client.get('/rentals/api/availability/slots/', params)
+        self.assertEqual(response.json()['slots'], [{'start_date': (self.start_date + timedelta(days=3)).isoformat(),
+                                                     'end_date': (self.start_date + timedelta(days=4)).isoformat()}])
+
+        for bad in ({'product': 'abc'}, {'quantity': 'two'}, {'start': '10/01/2030'}):
+            response = self.client.get('/rentals/api/availability/slots/', {**params, **bad})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': 'Invalid parameters'})
+
+
+class PackageAvailabilityTest(TestCase):
+    def setUp(self):
+        self.camera = Product.objects.create(name="Camera", price=1000, quantity=4)
+        self.light = Product.objects.create(name="Light", price=500, quantity=3)
+        self.package = Package.objects.create(name="Interview Set", price=Decimal('2000.00'))
+        PackageItem.objects.create(package=self.package, product=self.camera, quantity=1)
+        PackageItem.objects.create(package=self.package, product=self.light, quantity=2)
+        self.start = timezone.now() + timedelta(days=5)
+        self.end = self.start + timedelta(days=2)
+
+        booking = Booking.objects.create(customer_name="Existing", start_time=self.start, end_time=self.end, status='approved')
+        BookingItem.objects.create(booking=booking, product=self.light, quantity=1)
+
+    def test_max_quantity_and_bottleneck(self):
+        packages = Package.objects.prefetch_related('items__product')
+        # packages + items + products (prefetch) + one availability query for all components
+        with self.assertNumQueries(4):
+            info = AvailabilityService.get_packages_availability(packages, self.start, self.end)[self.package.id]
+        self.assertEqual(info['max_quantity'], 1)
+        self.assertEqual(info['bottleneck'], self.light)
+
+        is_valid, msg = AvailabilityService.check_package_availability(self.package, self.start, self.end, 2)
+        self.assertFalse(is_valid)
+        self.assertIn("Light", msg)
+
+    def test_cart_requirements_merge_package_components(self):
+        cart = [{'package': self.package, 'quantity': 1}, {'product': self.light, 'quantity': 1}]
+        self.assertEqual(
+            sorted((product.name, quantity) for product, quantity in AvailabilityService.cart_requirements(cart)),
+            [("Camera", 1), ("Light", 3)]
+        )
+        is_valid, msg = AvailabilityService.validate_cart(cart, self.start, self.end)
+        self.assertFalse(is_valid)
+        self.assertIn("Light", msg)
+
+    def test_package_prices_add_up_to_package_price(self):
+        self.package.price = Decimal('1999.99')
+        lines = BookingService.package_item_prices(self.package)
+        self.assertEqual(sum(unit_price * quantity for _, quantity, unit_price in lines), Decimal('1999.99'))
@@ -0,0 +1,51 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rentals.models import Booking, BookingItem, Product
+from rentals.services.availability import AvailabilityService
+from rentals.services.availability_cache import AvailabilityCache
+from rentals.services.holds import StockHoldService
+
+
+class AvailabilityCacheTest(TestCase):
+    def setUp(self):
+        AvailabilityCache.backend().clear()
+        AvailabilityCache.reset_stats()
+        self.product = Product.objects.create(name="Sony A7S III", price=1500, quantity=3)
+        self.start = timezone.now() + timedelta(days=12)
+        self.end = self.start + timedelta(days=3)
+
+    def test_repeated_question_is_served_from_cache(self):
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.start, self.end), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.start, self.end), 3)
+        self.assertEqual(AvailabilityCache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_booking_changes_bump_the_version(self):
+        AvailabilityService.get_available_quantity(self.product, self.start, self.end)
+
+        booking = Booking.objects.create(customer_name="Bump", start_time=self.start, end_time=self.end, status='approved')
+        item = BookingItem.objects.create(booking=booking, product=self.product, quantity=2)
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.start, self.end), 1)
+
+        item.delete()
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.start, self.end), 3)
+
+        self.product.quantity = 5
+        self.product.save()
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.start, self.end), 5)
+
+    def test_holds_bump_the_version(self):
+        AvailabilityService.get_available_quantity(self.product, self.start, self.end)
+        StockHoldService.hold_cart('session-a', [{'product': self.product, 'quantity': 1}], self.start, self.end)
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.start, self.end), 2)
+
+        StockHoldService.release('session-a')
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.start, self.end), 3)
+
+    def test_evicted_version_counter_never_reuses_old_entries(self):
+        AvailabilityService.get_available_quantity(self.product, self.start, self.end)
+        Booking.objects.create(customer_name="Evict", start_time=self.start, end_time=self.end, status='approved') \
+            .items.create(product=self.product, quantity=3)
+        AvailabilityCache.backend().delete(AvailabilityCache._version_key(self.product.id))
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.start, self.end), 0)
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import Sum
+from django.template.loader import render_to_string
+from django.test import TestCase
+from django.utils import timezone
+from rentals.models import Booking, BookingItem, Equipment, Product, Studio
+
+
+class BookingTotalsTest(TestCase):
+    def setUp(self):
+        self.camera = Product.objects.create(name="FX6", price=Decimal('2500.00'), quantity=3)
+        self.light = Product.objects.create(name="Nanlite", price=Decimal('333.33'), quantity=5)
+        self.studio = Studio.objects.create(name="Studio A", daily_rate=Decimal('4999.99'))
+        self.start = timezone.make_aware(datetime(2030, 5, 1, 9, 0))
+
+    def _booking(self, duration, status='approved'):
+        return Booking.objects.create(
+            customer_name=f"Totals {duration}", start_time=self.start, end_time=self.start + duration, status=status
+        )
+
+    def test_annotations_match_python_method(self):
+        exact = self._booking(timedelta(days=2))
+        BookingItem.objects.create(booking=exact, product=self.camera, quantity=2)
+        BookingItem.objects.create(booking=exact, product=self.light, quantity=3, price_at_booking=Decimal('333.33'))
+
+        partial = self._booking(timedelta(days=2, microseconds=1))
+        BookingItem.objects.create(booking=partial, product=self.light, quantity=1)
+        partial.studios.add(self.studio)
+
+        short = self._booking(timedelta(hours=3))
+        short.studios.add(self.studio)
+
+        legacy = self._booking(timedelta(days=1, hours=1))
+        legacy.equipment.add(Equipment.objects.create(product=self.camera, serial_number="FX6-001"))
+
+        expected = {booking.pk: Booking.objects.get(pk=booking.pk).calculate_total_price()
+                    for booking in [exact, partial, short, legacy]}
+        self.assertEqual(expected[exact.pk], Decimal('11999.98'))
+        self.assertEqual(expected[legacy.pk], Decimal('5000.00'))
+
+        with self.assertNumQueries(1):
+            annotated = {booking.pk: booking for booking in Booking.objects.with_totals()}
+            for pk, total in expected.items():
+                self.assertEqual(annotated[pk].total_price, total)
+                self.assertEqual(annotated[pk].calculate_total_price(), total)
+
+        self.assertEqual(annotated[partial.pk].computed_rental_days, 3)
+        self.assertEqual(annotated[short.pk].computed_rental_days, 1)
+        self.assertEqual(annotated[legacy.pk].equipment_subtotal, Decimal('2500.00'))
+        self.assertEqual(annotated[exact.pk].equipment_subtotal, 0)
+
+    def test_per_day_price_of_legacy_equipment_booking(self):
+        legacy = self._booking(timedelta(days=1, hours=1))
+        legacy.equipment.add(Equipment.objects.create(product=self.camera, serial_number="FX6-001"))
+        legacy.studios.add(self.studio)
+
+        legacy = Booking.objects.get(pk=legacy.pk)
+        self.assertEqual(legacy.calculate_total_price_per_day(), Decimal('7499.99'))
+        self.assertEqual(legacy.calculate_total_price(), Decimal('14999.98'))
+
+        # หน้า booking_success แสดงราคาต่อวันนี้
+        html = render_to_string('rentals/public/booking_success.html', {'booking': legacy})
+        self.assertIn('฿7,499.99', html)
+
+    def test_revenue_is_one_aggregate(self):
+        for _ in range(3):
+            booking = self._booking(timedelta(days=1))
+            BookingItem.objects.create(booking=booking, product=self.light, quantity=1)
+
+        with self.assertNumQueries(1):
+            revenue = Booking.objects.with_totals().aggregate(total=Sum('total_price'))['total']
+        self.assertEqual(revenue, Decimal('999.99'))
+
+
+class StoredBookingTotalsTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Aputure 300d", price=Decimal('800.00'), quantity=4)
+        self.studio = Studio.objects.create(name="Studio B", daily_rate=Decimal('3000.00'))
+        start = timezone.make_aware(datetime(2030, 6, 1, 8, 0))
+        self.booking = Booking.objects.create(
+            customer_name="Stored", start_time=start, end_time=start + timedelta(days=2), status='approved'
+        )
+
+    def _stored(self):
+        return Booking.objects.values_list('rental_days', 'subtotal', 'total_amount').get(pk=self.booking.pk)
+
+    def test_signals_keep_stored_totals_current(self):
+        item = BookingItem.objects.create(booking=self.booking, product=self.product, quantity=2)
+        self.assertEqual(self._stored(), (2, Decimal('1600.00'), Decimal('3200.00')))
+
+        self.booking.studios.add(self.studio)
+        self.assertEqual(self._stored(), (2, Decimal('4600.00'), Decimal('9200.00')))
+
+        self.booking.end_time += timedelta(hours=1)
+        self.booking.save()
+        self.assertEqual(self._stored()[0], 3)
+
+        item.delete()
+        self.booking.studios.clear()
+        self.assertEqual(self._stored(), (3, Decimal('0.00'), Decimal('0.00')))
+
+    def test_save_of_stale_instance_keeps_stored_totals(self):
+        # self.booking ในหน่วยความจำยังมียอดรวมเป็น 0 หลังเพิ่มรายการ
+        BookingItem.objects.create(booking=self.booking, product=self.product, quantity=1)
+        self.booking.customer_name = "Renamed"
+        self.booking.save()
+        self.assertEqual(self._stored(), (2, Decimal('800.00'), Decimal('1600.00')))
+
+    def test_calculate_total_price_prefers_stored_total(self):
+        BookingItem.objects.create(booking=self.booking, product=self.product, quantity=1)
+        Booking.objects.filter(pk=self.booking.pk).update(total_amount=Decimal('1234.00'))
+
+        with self.assertNumQueries(1):
+            booking = Booking.objects.with_totals().get(pk=self.booking.pk)
+            self.assertEqual(booking.total_price, Decimal('1600.00'))
+            self.assertEqual(booking.calculate_total_price(), Decimal('1234.00'))
+
+        # ไม่ได้โหลด total_amount -> ใช้ค่าจาก with_totals() โดยไม่ Query เพิ่ม
+        with self.assertNumQueries(1):
+            booking = Booking.objects.with_totals().defer('total_amount').get(pk=self.booking.pk)
+            self.assertEqual(booking.calculate_total_price(), Decimal('1600.00'))
+
+    def test_command_backfills_and_verifies(self):
+        BookingItem.objects.create(booking=self.booking, product=self.product, quantity=1)
+        Booking.objects.update(rental_days=1, subtotal=0, total_amount=0)
+
+        out = StringIO()
+        call_command('recompute_booking_totals', '--verify-only', stdout=out)
+        self.assertIn('1 mismatching bookings', out.getvalue())
+
+        out = StringIO()
+        call_command('recompute_booking_totals', '--batch-size', '1', stdout=out)
+        self.assertIn('match line items', out.getvalue())
+        self.assertEqual(self._stored(), (2, Decimal('800.00'), Decimal('1600.00')))
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from rentals.models import Booking, BookingItem, Product
+from rentals.services.calendar_feed import CalendarFeedService, parse_calendar_datetime
+
+
+class CalendarFeedTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('staff', password='pw', is_staff=True, first_name='Somchai')
+        self.camera = Product.objects.create(name="FX6", price=Decimal('1000.00'), quantity=5)
+        self.window_start = timezone.make_aware(datetime(2030, 3, 1))
+        self.window_end = timezone.make_aware(datetime(2030, 4, 1))
+
+        for day in (-3, 5, 10, 40):
+            start = self.window_start + timedelta(days=day)
+            booking = Booking.objects.create(customer_name=f"Day {day}", start_time=start, end_time=start + timedelta(days=4),
+                                             status='approved', created_by=self.user)
+            BookingItem.objects.create(booking=booking, product=self.camera, quantity=1)
+        self.params = {'start': '2030-03-01T00:00:00+07:00', 'end': '2030-04-01T00:00:00+07:00'}
+
+    def test_events_are_scoped_to_the_window_in_one_query(self):
+        with self.assertNumQueries(1):
+            events = CalendarFeedService.events(self.window_start, self.window_end)
+        self.assertEqual([event['title'] for event in events], [
+            "Day -3 (1 รายการ) [โดย: Somchai]",
+            "Day 5 (1 รายการ) [โดย: Somchai]",
+            "Day 10 (1 รายการ) [โดย: Somchai]",
+        ])
+
+    def test_parse_window(self):
+        self.assertEqual(parse_calendar_datetime('2030-03-01T00:00:00 07:00'), self.window_start)
+        self.assertEqual(parse_calendar_datetime('2030-03-01'), self.window_start)
+        with self.assertRaises(ValueError):
+            CalendarFeedService.parse_window('2030-04-01', '2030-03-01')
+        start, end = CalendarFeedService.parse_window('2030-01-01', '2035-01-01')
+        self.assertEqual((end - start).days, CalendarFeedService.MAX_WINDOW_DAYS)
+
+    def test_unchanged_window_returns_304(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/rentals/api/bookings/', self.params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+        etag = response['ETag']
+
+        response = self.client.get('/rentals/api/bookings/', self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # A new item on a booking in the window changes the feed
+        BookingItem.objects.create(booking=Booking.objects.get(customer_name="Day 5"), product=self.camera, quantity=1)
+        response = self.client.get('/rentals/api/bookings/', self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        Booking.objects.get(customer_name="Day 10").delete()
+        response = self.client.get('/rentals/api/bookings/', self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+        # Changes outside the window keep the 304
+        etag = response['ETag']
+        Booking.objects.filter(customer_name="Day 40").update(customer_name="Moved")
+        response = self.client.get('/rentals/api/bookings/', self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_admin_approve_changes_the_feed(self):
+        booking = Booking.objects.get(customer_name="Day 5")
+        booking.status = 'draft'
+        booking.save()
+
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin)
+        response = self.client.get('/rentals/api/bookings/', self.params)
+        event = next(event for event in response.json() if event['id'] == booking.pk)
+        self.assertEqual(event['backgroundColor'], '#ffc107')
+        etag = response['ETag']
+
+        self.client.post('/admin/rentals/booking/', {'action': 'approve_bookings', '_selected_action': [booking.pk]})
+        response = self.client.get('/rentals/api/bookings/', self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        event = next(event for event in response.json() if event['id'] == booking.pk)
+        self.assertEqual(event['backgroundColor'], '#28a745')
+
+    def test_invalid_window(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/rentals/api/bookings/', {'start': 'soon'})
+        self.assertEqual(response.status_code, 400)
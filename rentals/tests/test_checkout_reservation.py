@@ -0,0 +1,85 @@
+import threading
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rentals.models import Booking, BookingItem, Product
+from rentals.services.booking_service import BookingService
+
+
+def booking_data(name, start, end):
+    return {
+        'customer_name': name,
+        'customer_phone': '0800000000',
+        'customer_email': 'test@example.com',
+        'start_time': start,
+        'end_time': end,
+    }
+
+
+class ReservationTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="FX3", price=1200, quantity=1)
+        self.start = timezone.now() + timedelta(days=3)
+        self.end = self.start + timedelta(days=1)
+        self.cart = [{'product': self.product, 'quantity': 1, 'price': self.product.price}]
+
+    def test_second_checkout_for_last_unit_is_rejected(self):
+        booking, error = BookingService.reserve_booking_from_cart(self.cart, booking_data("A", self.start, self.end))
+        self.assertIsNotNone(booking)
+        self.assertEqual(error, "")
+
+        booking, error = BookingService.reserve_booking_from_cart(self.cart, booking_data("B", self.start, self.end))
+        self.assertIsNone(booking)
+        self.assertIn("FX3", error)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_version, 2)
+
+
+class ConcurrentCheckoutStressTest(TransactionTestCase):
+    THREADS = 12
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Aputure 600d", price=900, quantity=3)
+        self.other = Product.objects.create(name="Sennheiser MKE 600", price=300, quantity=self.THREADS)
+        self.start = timezone.now() + timedelta(days=7)
+        self.end = self.start + timedelta(days=2)
+
+    def _run_parallel(self, carts):
+        barrier = threading.Barrier(len(carts))
+        results = []
+        errors = []
+
+        def checkout(index, cart):
+            try:
+                barrier.wait()
+                booking, _ = BookingService.reserve_booking_from_cart(cart, booking_data(f"Customer {index}", self.start, self.end))
+                results.append(booking)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(i, cart)) for i, cart in enumerate(carts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        return results
+
+    def test_parallel_checkouts_never_oversell(self):
+        cart = [{'product': self.product, 'quantity': 1, 'price': self.product.price}]
+        results = self._run_parallel([cart] * self.THREADS)
+
+        self.assertEqual(len([booking for booking in results if booking]), self.product.quantity)
+        self.assertEqual(Booking.objects.count(), self.product.quantity)
+        self.assertEqual(BookingItem.objects.filter(product=self.product).count(), self.product.quantity)
+
+    def test_parallel_checkouts_for_available_stock_all_succeed(self):
+        cart = [{'product': self.other, 'quantity': 1, 'price': self.other.price}]
+        results = self._run_parallel([cart] * self.THREADS)
+
+        self.assertTrue(all(results))
+        self.assertEqual(Booking.objects.count(), self.THREADS)
@@ -0,0 +1,181 @@
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rentals.models import Booking, BookingItem, Equipment, Product, Staff, Studio
+from rentals.services.dashboard_snapshot import DashboardSnapshot
+from rentals.services.dashboard_stats import DashboardStatsService
+from rentals.services.revenue_rollup import RevenueRollupService
+
+
+class DashboardStatsServiceTest(TestCase):
+    def setUp(self):
+        self.today = date(2026, 3, 10)
+        at = lambda day, hour=10: timezone.make_aware(datetime.combine(day, time(hour)))
+
+        def book(day, status, total):
+            booking = Booking.objects.create(customer_name=status, start_time=at(day), end_time=at(day) + timedelta(days=1), status=status)
+            Booking.objects.filter(pk=booking.pk).update(total_amount=Decimal(total))
+
+        book(self.today, 'approved', '1000.00')
+        book(self.today, 'draft', '500.00')
+        book(self.today - timedelta(days=3), 'completed', '250.00')
+        book(date(2026, 2, 27), 'approved', '400.00')
+        # Midnight edge: 00:00 local on March 1st belongs to March
+        Booking.objects.create(customer_name="edge", start_time=at(date(2026, 3, 1), 0),
+                               end_time=at(date(2026, 3, 2), 0), status='problem')
+
+        camera = Product.objects.create(name="Camera", price=1000, quantity=2)
+        Product.objects.create(name="Retired", price=100, quantity=1, is_active=False)
+        Equipment.objects.create(product=camera, serial_number="CAM-1")
+        Equipment.objects.create(product=camera, serial_number="CAM-2", status='maintenance')
+        Studio.objects.create(name="Studio A", daily_rate=5000)
+        Staff.objects.create(name="Active", position="sound", phone="0")
+        Staff.objects.create(name="Former", position="sound", phone="0", is_active=False)
+        User.objects.create_user('admin', is_staff=True)
+        User.objects.create_user('customer')
+        # update() above sends no signals
+        RevenueRollupService.rebuild()
+
+    def test_all_counters_in_two_queries(self):
+        with self.assertNumQueries(2):
+            stats = DashboardStatsService.get_stats(self.today)
+
+        self.assertEqual(stats['bookings_today'], 2)
+        self.assertEqual(stats['bookings_pending'], 1)
+        self.assertEqual(stats['bookings_this_month'], 4)
+        self.assertEqual(stats['bookings_last_month'], 1)
+        self.assertEqual(stats['bookings_growth'], 300.0)
+        self.assertEqual(stats['revenue_this_month'], Decimal('1250.00'))
+        self.assertEqual(stats['revenue_last_month'], Decimal('400.00'))
+        self.assertEqual(stats['status_counts']['approved'], 2)
+        self.assertEqual(stats['status_counts']['problem'], 1)
+        self.assertEqual(stats['status_counts']['expired'], 0)
+        self.assertEqual([revenue for _, revenue in stats['daily_revenue']], [0, 0, 0, 250.0, 0, 0, 1000.0])
+
+        self.assertEqual((stats['equipment_total'], stats['equipment_available'], stats['equipment_maintenance']), (2, 1, 1))
+        self.assertEqual((stats['product_total'], stats['product_available']), (2, 1))
+        self.assertEqual(stats['studio_total'], 1)
+        self.assertEqual(stats['staff_active'], 1)
+        self.assertEqual((stats['user_staff_active'], stats['total_users']), (1, 2))
+
+    def test_empty_database(self):
+        Booking.objects.all().delete()
+        stats = DashboardStatsService.get_stats(self.today)
+        self.assertEqual(stats['revenue_this_month'], 0)
+        self.assertEqual(stats['bookings_growth'], 0)
+
+
+class DashboardEntryPointsTest(TestCase):
+    def setUp(self):
+        DashboardSnapshot.backend().clear()
+        self.user = User.objects.create_user('staff', password='pw', is_staff=True)
+        Booking.objects.create(customer_name="Today", start_time=timezone.now(),
+                               end_time=timezone.now() + timedelta(days=1), status='draft')
+
+    def test_staff_dashboard(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/rentals/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats']['bookings_pending'], 1)
+
+    def test_callback_and_template_tag(self):
+        from rentals.templatetags.dashboard_tags import get_dashboard_stats
+        from rentals.views import dashboard_callback
+
+        context = dashboard_callback(None, {})
+        self.assertEqual(context['stats']['status_counts']['draft'], 1)
+        self.assertEqual(len(context['stats']['chart_revenue']), 7)
+        self.assertEqual(get_dashboard_stats()['bookings_pending'], 1)
+
+
+class DashboardSnapshotTest(TestCase):
+    def setUp(self):
+        DashboardSnapshot.backend().clear()
+        self.start = timezone.now()
+
+    def _book(self, status='draft'):
+        return Booking.objects.create(customer_name="Snapshot", start_time=self.start,
+                                      end_time=self.start + timedelta(days=1), status=status)
+
+    @contextmanager
+    def assertRecomputes(self, count):
+        # Snapshot อยู่ใน Database cache (มี Query ของ Cache เอง) -> นับการคำนวณสถิติแทนจำนวน Query
+        with mock.patch.object(DashboardStatsService, 'get_stats', wraps=DashboardStatsService.get_stats) as get_stats:
+            yield
+        self.assertEqual(get_stats.call_count, count)
+
+    def test_snapshot_is_reused_until_a_booking_changes(self):
+        self._book()
+        self.assertEqual(DashboardSnapshot.get_stats()['bookings_pending'], 1)
+        with self.assertRecomputes(0):
+            self.assertEqual(DashboardSnapshot.get_stats()['bookings_pending'], 1)
+
+        self._book()
+        with self.assertRecomputes(1):
+            self.assertEqual(DashboardSnapshot.get_stats()['bookings_pending'], 2)
+
+    @override_settings(DASHBOARD_SNAPSHOT_SECONDS=0)
+    def test_expired_snapshot_is_recomputed(self):
+        DashboardSnapshot.get_stats()
+        with self.assertRecomputes(1):
+            DashboardSnapshot.get_stats()
+
+    def test_only_the_lock_holder_recomputes(self):
+        DashboardSnapshot.get_stats()
+        self._book()
+        cache = DashboardSnapshot.backend()
+        cache.add(DashboardSnapshot.LOCK_KEY, 1, DashboardSnapshot.LOCK_TIMEOUT)
+        # Someone else holds the lock: the stale snapshot is served without recomputing
+        with self.assertRecomputes(0):
+            self.assertEqual(DashboardSnapshot.get_stats()['bookings_pending'], 0)
+
+        cache.delete(DashboardSnapshot.LOCK_KEY)
+        self.assertEqual(DashboardSnapshot.get_stats()['bookings_pending'], 1)
+
+    def test_warm_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('warm_dashboard_stats', stdout=StringIO())
+        with self.assertRecomputes(0):
+            DashboardSnapshot.get_stats()
+
+    def test_snapshot_is_shared_between_processes(self):
+        # cron / Worker อื่นเห็น Snapshot และการ invalidate() เดียวกัน (ไม่ใช่ LocMemCache ของแต่ละ Process)
+        from django.core.cache.backends.db import DatabaseCache
+        self.assertIsInstance(DashboardSnapshot.backend(), DatabaseCache)
+
+
+class ApproveActionTest(TestCase):
+    def setUp(self):
+        DashboardSnapshot.backend().clear()
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(self.user)
+        start = timezone.now()
+        self.booking = Booking.objects.create(customer_name="Approve me", start_time=start,
+                                              end_time=start + timedelta(days=1), status='draft')
+        BookingItem.objects.create(booking=self.booking, product=Product.objects.create(name="Camera", price=1000, quantity=2),
+                                   quantity=1)
+
+    def test_admin_approve_refreshes_dashboard(self):
+        stats = DashboardSnapshot.get_stats()
+        self.assertEqual((stats['bookings_pending'], stats['revenue_this_month']), (1, 0))
+        updated_at = Booking.objects.get(pk=self.booking.pk).updated_at
+
+        response = self.client.post('/admin/rentals/booking/', {
+            'action': 'approve_bookings', '_selected_action': [self.booking.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+
+        booking = Booking.objects.get(pk=self.booking.pk)
+        self.assertEqual(booking.status, 'approved')
+        self.assertGreater(booking.updated_at, updated_at)
+        stats = DashboardSnapshot.get_stats()
+        self.assertEqual(stats['bookings_pending'], 0)
+        self.assertEqual(stats['revenue_this_month'], Decimal('1000.00'))
+        self.assertEqual(RevenueRollupService.verify(), [])
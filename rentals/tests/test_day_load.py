@@ -0,0 +1,110 @@
+import random
+from datetime import datetime, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rentals.models import Booking, BookingItem, Product, ProductDayLoad
+from rentals.services.availability import AvailabilityService
+from rentals.services.day_load import DayLoadService, booking_days
+
+
+class ProductDayLoadSignalTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Light Kit", price=800, quantity=4)
+        self.start = timezone.make_aware(datetime(2030, 3, 12, 9, 0))
+        self.booking = Booking.objects.create(
+            customer_name="Signal Test",
+            start_time=self.start,
+            end_time=self.start + timedelta(days=2),
+            status='approved'
+        )
+        self.item = BookingItem.objects.create(booking=self.booking, product=self.product, quantity=2)
+
+    def _loads(self):
+        return dict(ProductDayLoad.objects.filter(product=self.product).values_list('date', 'reserved'))
+
+    def test_item_and_booking_changes_are_applied_incrementally(self):
+        self.assertEqual(len(self._loads()), 3)
+        self.assertEqual(set(self._loads().values()), {2})
+
+        self.item.quantity = 3
+        self.item.save()
+        self.assertEqual(set(self._loads().values()), {3})
+
+        self.booking.end_time = self.start + timedelta(hours=4)
+        self.booking.save()
+        self.assertEqual(self._loads(), {self.start.date(): 3})
+
+        self.booking.status = 'completed'
+        self.booking.save()
+        self.assertEqual(self._loads(), {})
+        self.assertEqual(DayLoadService.verify(), [])
+
+    def test_delete_and_rebuild(self):
+        other = Booking.objects.create(
+            customer_name="Other",
+            start_time=self.start + timedelta(days=1),
+            end_time=self.start + timedelta(days=1, hours=2),
+            status='draft'
+        )
+        BookingItem.objects.create(booking=other, product=self.product, quantity=1)
+        free = AvailabilityService.get_daily_availability([self.product], self.start.date(), 3)
+        self.assertEqual(free[self.product.id], [2, 1, 2])
+
+        self.booking.delete()
+        self.assertEqual(DayLoadService.verify(), [])
+
+        ProductDayLoad.objects.all().delete()
+        self.assertNotEqual(DayLoadService.verify(), [])
+        call_command('rebuild_day_load', stdout=StringIO())
+        self.assertEqual(DayLoadService.verify(), [])
+
+
+class DailyAvailabilityConsistencyTest(TestCase):
+    """get_daily_availability() (ProductDayLoad + holds) must match the booking intervals."""
+
+    def test_matches_interval_sums_and_sweep_line(self):
+        rng = random.Random(7)
+        products = [Product.objects.create(name=f"P{i}", price=100, quantity=6) for i in range(3)]
+        start_date = timezone.localdate() + timedelta(days=30)
+        midnight = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+        statuses = ['draft', 'approved', 'active', 'completed', 'expired']
+
+        bookings = []
+        for i in range(25):
+            start = midnight + timedelta(hours=rng.randrange(-48, 24 * 12))
+            booking = Booking.objects.create(customer_name=f"R{i}", start_time=start,
+                                             end_time=start + timedelta(hours=rng.randrange(1, 24 * 4)),
+                                             status=rng.choice(statuses))
+            for product in rng.sample(products, rng.randrange(1, 3)):
+                BookingItem.objects.create(booking=booking, product=product, quantity=rng.randrange(1, 3))
+            bookings.append(booking)
+
+        # แก้ไข/ลบ ผ่าน save()/delete() ให้ Signals อัปเดตตาราง
+        for booking in rng.sample(bookings, 8):
+            booking.end_time += timedelta(hours=rng.randrange(1, 30))
+            booking.status = rng.choice(statuses)
+            booking.save()
+        for booking in rng.sample(bookings, 4):
+            booking.delete()
+        self.assertEqual(DayLoadService.verify(), [])
+
+        days = 10
+        with self.assertNumQueries(2):
+            free = AvailabilityService.get_daily_availability(products, start_date, days)
+
+        window_end = midnight + timedelta(days=days)
+        intervals = AvailabilityService.get_booking_intervals_by_product([p.id for p in products], midnight, window_end)
+        for product in products:
+            used = [0] * days
+            for b_start, b_end, quantity in intervals.get(product.id, []):
+                for day in booking_days(b_start, b_end):
+                    used[(day - start_date).days] += quantity
+            self.assertEqual(free[product.id], [max(0, product.quantity - u) for u in used])
+
+            # ระดับวันต้องไม่ว่างมากกว่าผลแบบ Sweep-line ของวันเดียวกัน
+            for i in range(days):
+                day_start = midnight + timedelta(days=i)
+                exact = AvailabilityService.get_available_quantity(product, day_start, day_start + timedelta(days=1))
+                self.assertLessEqual(free[product.id][i], exact)
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rentals.models import Booking, BookingItem, Product, ProductDayLoad, StockHold
+from rentals.services.availability import AvailabilityService
+from rentals.services.holds import StockHoldService
+
+
+class StockHoldTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Gimbal", price=700, quantity=2)
+        self.start = timezone.now() + timedelta(days=4)
+        self.end = self.start + timedelta(days=2)
+        self.cart = [{'product': self.product, 'quantity': 2}]
+
+    def test_live_hold_blocks_other_sessions_only(self):
+        StockHoldService.hold_cart('session-a', self.cart, self.start, self.end)
+
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.start, self.end), 0)
+        self.assertEqual(
+            AvailabilityService.get_available_quantity(self.product, self.start, self.end, exclude_session_key='session-a'),
+            2
+        )
+        is_valid, _ = AvailabilityService.validate_cart(self.cart, self.start, self.end, exclude_session_key='session-a')
+        self.assertTrue(is_valid)
+
+    def test_expired_hold_is_ignored_and_swept(self):
+        StockHoldService.hold_cart('session-a', self.cart, self.start, self.end)
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, self.start, self.end), 2)
+        self.assertEqual(StockHoldService.expire(), (1, 0))
+        self.assertFalse(StockHold.objects.exists())
+
+    def test_stale_drafts_expire_in_batches(self):
+        for i in range(3):
+            booking = Booking.objects.create(customer_name=f"Draft {i}", start_time=self.start, end_time=self.end)
+            BookingItem.objects.create(booking=booking, product=self.product, quantity=1)
+        fresh = Booking.objects.create(customer_name="Fresh", start_time=self.start, end_time=self.end)
+        Booking.objects.exclude(pk=fresh.pk).update(updated_at=timezone.now() - timedelta(days=10))
+
+        self.assertEqual(StockHoldService.expire(draft_days=3, batch_size=2), (0, 3))
+        self.assertEqual(Booking.objects.filter(status='expired').count(), 3)
+        self.assertEqual(Booking.objects.get(pk=fresh.pk).status, 'draft')
+        # Signals still ran, so the day-load table no longer counts the expired drafts
+        self.assertFalse(ProductDayLoad.objects.filter(product=self.product).exists())
+
+
+class CartHoldFlowTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Ronin 4D", price=5000, quantity=1)
+        self.day = (timezone.localtime() + timedelta(days=8)).date().isoformat()
+
+    def test_cart_add_holds_and_checkout_converts(self):
+        self.client.post(f'/rentals/cart/add/{self.product.id}/', {
+            'quantity': 1, 'start_date': self.day, 'end_date': self.day
+        })
+        hold = StockHold.objects.get()
+        self.assertEqual(hold.session_key, self.client.session.session_key)
+
+        # Another visitor sees the unit as taken
+        start = timezone.make_aware(datetime.strptime(self.day, "%Y-%m-%d"))
+        self.assertEqual(AvailabilityService.get_available_quantity(self.product, start, start + timedelta(days=1)), 0)
+
+        response = self.client.post('/rentals/checkout/', {
+            'customer_name': 'Hold Test', 'customer_phone': '0812345678', 'customer_email': 'hold@example.com',
+            'start_date': self.day, 'start_time': '09:00', 'end_date': self.day, 'end_time': '18:00',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Booking.objects.filter(customer_name='Hold Test').count(), 1)
+        self.assertFalse(StockHold.objects.exists())
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from rentals.models import Booking, Staff, Studio
+from rentals.services.ics_feed import IcsFeedService, fold_line, ics_datetime
+
+
+class IcsFeedTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.crew = Staff.objects.create(name="Somchai", position='cameraman', phone='0800000000')
+        self.other = Staff.objects.create(name="Somsri", position='sound', phone='0800000001')
+        self.studio = Studio.objects.create(name="Studio A", daily_rate=5000)
+        tomorrow = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), datetime.min.time()))
+
+        self.bookings = {}
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, day, status in (("Shoot; A", 0, 'approved'), ("Draft B", 3, 'draft'), ("Old C", -90, 'approved'),
+                                      ("Gone D", 5, 'expired')):
+                start = tomorrow + timedelta(days=day, hours=9)
+                booking = Booking.objects.create(customer_name=name, start_time=start, end_time=start + timedelta(hours=8),
+                                                 status=status, created_by=self.user)
+                booking.staff.add(self.crew)
+                self.bookings[name] = booking
+            self.bookings["Draft B"].studios.add(self.studio)
+        self.url = IcsFeedService.feed_url('staff', self.crew.pk)
+
+    def _events(self, response):
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        events = {}
+        for block in body.split('BEGIN:VEVENT\r\n')[1:]:
+            fields = dict(line.split(':', 1) for line in block.split('\r\n') if ':' in line)
+            events[fields['UID']] = fields
+        return events
+
+    def _uid(self, name):
+        return IcsFeedService.uid(self.bookings[name].pk)
+
+    def test_full_feed_and_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        events = self._events(response)
+        self.assertEqual(set(events), {self._uid("Shoot; A"), self._uid("Draft B")})
+        self.assertEqual(events[self._uid("Shoot; A")]['SUMMARY'], 'Shoot\\; A')
+        self.assertEqual(events[self._uid("Draft B")]['STATUS'], 'TENTATIVE')
+        self.assertNotIn('SEQUENCE', events[self._uid("Draft B")])
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # การจองของคนอื่นไม่ทำให้ ETag เปลี่ยน
+        self.bookings["Old C"].staff.add(self.other)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.bookings["Draft B"].status = 'approved'
+        self.bookings["Draft B"].save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_sync_token_returns_only_changes(self):
+        token = self.client.get(self.url)['X-Sync-Token']
+        self.assertEqual(self._events(self.client.get(f'{self.url}&since={token}')), {})
+
+        deleted_uid = self._uid("Old C")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bookings["Shoot; A"].customer_name = "Shoot A (moved)"
+            self.bookings["Shoot; A"].save()
+            self.bookings["Draft B"].staff.remove(self.crew)
+            self.bookings["Old C"].start_time = timezone.now()
+            self.bookings["Old C"].end_time = timezone.now() + timedelta(hours=1)
+            self.bookings["Old C"].save()
+            self.bookings["Old C"].delete()
+
+            # การจองที่ไม่เคยอยู่ในปฏิทินนี้ ไม่ถูกส่ง (ทั้งแก้ไขและลบ)
+            start = timezone.now() + timedelta(days=2)
+            strangers = [Booking.objects.create(customer_name=f"Stranger {i}", start_time=start, end_time=start + timedelta(hours=2),
+                                                status='approved', created_by=self.user) for i in range(2)]
+            strangers[0].staff.add(self.other)
+            strangers[0].staff.remove(self.other)
+            strangers[1].delete()
+
+        response = self.client.get(f'{self.url}&since={token}')
+        events = self._events(response)
+        self.assertEqual(events[self._uid("Shoot; A")]['SUMMARY'], 'Shoot A (moved)')
+        self.assertEqual(events[self._uid("Draft B")]['STATUS'], 'CANCELLED')
+        self.assertEqual(events[self._uid("Draft B")]['DTSTART'], ics_datetime(self.bookings["Draft B"].start_time))
+        self.assertEqual(events[deleted_uid]['STATUS'], 'CANCELLED')
+        self.assertIn('DTSTART', events[deleted_uid])
+        self.assertEqual(len(events), 3)
+
+        next_token = response['X-Sync-Token']
+        self.assertNotEqual(next_token, token)
+        self.assertEqual(self._events(self.client.get(f'{self.url}&since={next_token}')), {})
+
+    def test_change_committed_after_token_is_sent(self):
+        # บันทึกก่อนออก Token แต่ Commit ทีหลัง -> ยังต้องได้รับใน ?since= รอบถัดไป
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.bookings["Shoot; A"].customer_name = "Shoot A (late commit)"
+            self.bookings["Shoot; A"].save()
+            token = self.client.get(self.url)['X-Sync-Token']
+        for callback in callbacks:
+            callback()
+
+        events = self._events(self.client.get(f'{self.url}&since={token}'))
+        self.assertEqual(set(events), {self._uid("Shoot; A")})
+        self.assertEqual(events[self._uid("Shoot; A")]['SUMMARY'], 'Shoot A (late commit)')
+        self.assertEqual(self.client.get(f'{self.url}&since=0').status_code, 200)
+
+    def test_studio_feed_and_bad_requests(self):
+        response = self.client.get(IcsFeedService.feed_url('studio', self.studio.pk))
+        self.assertEqual(set(self._events(response)), {self._uid("Draft B")})
+
+        self.assertEqual(self.client.get(self.url.replace('key=', 'key=x')).status_code, 404)
+        self.assertEqual(self.client.get(f'/rentals/ics/staff/{self.other.pk}.ics', {'key': IcsFeedService.feed_key('staff', self.crew.pk)}).status_code, 404)
+        self.assertEqual(self.client.get(f'{self.url}&since=yesterday').status_code, 400)
+
+    def test_fold_line(self):
+        line = 'SUMMARY:' + 'ก' * 40
+        folded = fold_line(line)
+        self.assertTrue(all(len(part.encode()) <= 75 for part in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', ''), line)
@@ -0,0 +1,76 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from rentals.models import Booking, BookingItem, Equipment, Product
+from rentals.services.inventory_ledger import InventoryLedgerService
+
+
+class InventoryLedgerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.camera = Product.objects.create(name="FX6", price=Decimal('1000.00'), quantity=5)
+        self.light = Product.objects.create(name="Aputure", price=Decimal('500.00'), quantity=2)
+        self.serials = [Equipment.objects.create(product=self.camera, serial_number=f"FX6-00{i}") for i in (1, 2)]
+        self.day = date(2030, 3, 10)
+
+        # 10-11 มี.ค. กล้อง 2 ตัว (จัด Serial แล้ว) + ไฟ 1 ตัว
+        self.first = self._booking("First", 0, 2, 'approved')
+        BookingItem.objects.create(booking=self.first, product=self.camera, quantity=2)
+        BookingItem.objects.create(booking=self.first, product=self.light, quantity=1)
+        self.first.equipment.set(self.serials)
+        # 12 มี.ค. กล้อง 3 ตัว (ยังไม่จัด Serial)
+        second = self._booking("Second", 2, 1, 'pending_deposit')
+        BookingItem.objects.create(booking=second, product=self.camera, quantity=3)
+        # Draft ไม่นับ
+        draft = self._booking("Draft", 0, 7, 'draft')
+        BookingItem.objects.create(booking=draft, product=self.light, quantity=2)
+
+    def _booking(self, name, day, length, status):
+        start = timezone.make_aware(datetime.combine(self.day + timedelta(days=day), datetime.min.time()))
+        return Booking.objects.create(customer_name=name, start_time=start, end_time=start + timedelta(days=length) - timedelta(hours=1),
+                                      status=status, created_by=self.user)
+
+    def test_week_in_constant_queries(self):
+        products = Product.objects.order_by('name')
+        with self.assertNumQueries(3):
+            inventory = InventoryLedgerService.build(products, self.day, 7)
+
+        light, camera = inventory
+        self.assertEqual(camera['daily'], [3, 3, 2, 5, 5, 5, 5])
+        self.assertEqual(camera['available_stock'], 2)
+        self.assertEqual(light['daily'], [1, 1, 2, 2, 2, 2, 2])
+
+        self.assertEqual([entry['entry_title'] for entry in camera['ledger']], ["First", "Second"])
+        self.assertEqual(camera['ledger'][0]['detail'], "Assigned: FX6-001, FX6-002")
+        self.assertEqual(camera['ledger'][0]['date_display'], "10 มี.ค. - 11 มี.ค.")
+        self.assertEqual(camera['ledger'][1]['detail'], "Requested (Pending Assignment)")
+        self.assertEqual(camera['ledger'][1]['change'], -3)
+
+        # สินค้าเพิ่มไม่ทำให้ Query เพิ่ม
+        Product.objects.bulk_create([Product(name=f"Extra {i}", price=Decimal('1.00'), quantity=1) for i in range(20)])
+        with self.assertNumQueries(3):
+            InventoryLedgerService.build(Product.objects.all(), self.day, 1)
+
+    def test_dashboard_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/rentals/inventory/', {'date': '2030-03-12'})
+        self.assertEqual(response.status_code, 200)
+        camera = next(item for item in response.context['inventory'] if item['product'] == self.camera)
+        self.assertEqual(camera['available_stock'], 2)
+        self.assertEqual(response.context['day_columns'], [])
+
+        response = self.client.get('/rentals/inventory/', {'date': '2030-03-10', 'days': '7'})
+        self.assertEqual(len(response.context['day_columns']), 7)
+        self.assertContains(response, 'คงเหลือต่ำสุด')
+
+        response = self.client.get('/rentals/inventory/', {'date': '2030-03-10', 'days': '400'})
+        self.assertEqual(response.context['days'], InventoryLedgerService.MAX_DAYS)
+        self.assertEqual(response.context['day_options'][-1], InventoryLedgerService.MAX_DAYS)
+        self.assertContains(response, f'<option value="{InventoryLedgerService.MAX_DAYS}" selected>')
+
+        response = self.client.get('/rentals/inventory/', {'days': 'many'})
+        self.assertEqual(response.context['days'], 1)
@@ -0,0 +1,90 @@
+import re
+import unittest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rentals.models import Booking, Notification, Product
+from rentals.services.availability import AvailabilityService
+from rentals.services.dates import on_local_day
+
+# "SCAN rentals_booking" / "SCAN TABLE rentals_booking" (older SQLite) = full table scan;
+# "SCAN ... USING (COVERING) INDEX" / "SEARCH ..." are fine. \b stops \w+ from backtracking into the name.
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(rentals_\w+)\b(?! USING)')
+
+
+class FullScanPatternTest(unittest.TestCase):
+    def test_pattern(self):
+        self.assertEqual(FULL_SCAN.findall('SCAN rentals_booking'), ['rentals_booking'])
+        self.assertEqual(FULL_SCAN.findall('SCAN TABLE rentals_booking'), ['rentals_booking'])
+        self.assertEqual(FULL_SCAN.findall('SCAN rentals_booking USING INDEX booking_start_time'), [])
+        self.assertEqual(FULL_SCAN.findall('SCAN TABLE rentals_booking USING COVERING INDEX booking_start_time'), [])
+        self.assertEqual(FULL_SCAN.findall('SEARCH rentals_booking USING INDEX booking_status_end (status=?)'), [])
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class HotQueryPlanTest(TestCase):
+    """
+    Guards the composite indexes of the hot booking queries: fails if any of them
+    falls back to a full table scan.
+    """
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Plan Camera", price=1000, quantity=2)
+        self.user = User.objects.create(username="planner")
+        self.now = timezone.now()
+
+    def assertNoFullScan(self, plan):
+        scans = FULL_SCAN.findall(plan)
+        self.assertFalse(scans, f"Full table scan of {scans}:\n{plan}")
+
+    def explain_service_call(self, call):
+        """Captures the SQL a service call runs and returns EXPLAIN QUERY PLAN for each statement."""
+        with CaptureQueriesContext(connection) as ctx:
+            call()
+        self.assertTrue(ctx.captured_queries)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append('\n'.join(row[-1] for row in cursor.fetchall()))
+        return plans
+
+    def test_availability_interval_query(self):
+        plans = self.explain_service_call(
+            lambda: AvailabilityService._compute_available_quantities(
+                [self.product], self.now, self.now + timedelta(days=3), None, 'session'
+            )
+        )
+        for plan in plans:
+            self.assertNoFullScan(plan)
+        self.assertIn('bookingitem_product_booking', plans[0])
+
+    def test_booking_window_query(self):
+        plan = Booking.objects.filter(
+            status__in=AvailabilityService.RESOURCE_BLOCKING_STATUSES,
+            start_time__lt=self.now + timedelta(days=3),
+            end_time__gt=self.now
+        ).explain()
+        # Either status-leading index (booking_status_end / booking_revenue) is fine
+        self.assertNoFullScan(plan)
+
+    def test_overdue_query(self):
+        plan = Booking.objects.filter(status='active', end_time__lt=self.now).explain()
+        self.assertNoFullScan(plan)
+        self.assertIn('booking_status_end', plan)
+
+    def test_bookings_today_query(self):
+        plan = Booking.objects.filter(on_local_day('start_time', timezone.localdate())).explain()
+        self.assertNoFullScan(plan)
+        self.assertIn('booking_start_time', plan)
+
+    def test_notification_queries(self):
+        for queryset in [
+            Notification.objects.filter(recipient=self.user, is_read=False),
+            Notification.objects.filter(recipient=self.user).order_by('-created_at')[:5],
+        ]:
+            self.assertNoFullScan(queryset.explain())
@@ -0,0 +1,53 @@
+import csv
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.utils import timezone
+
+from rentals.models import Booking, BookingItem, Equipment, IssueReport, Product, Studio
+
+
+class StreamingExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(self.user)
+        camera = Product.objects.create(name="FX6", price=Decimal('1000.00'), quantity=5)
+        self.serial = Equipment.objects.create(product=camera, serial_number="FX6-001")
+        self.start = timezone.make_aware(datetime(2030, 2, 1, 9, 0))
+        self.booking = Booking.objects.create(customer_name="Export Co", start_time=self.start,
+                                              end_time=self.start + timedelta(days=2), status='approved', created_by=self.user)
+        BookingItem.objects.create(booking=self.booking, product=camera, quantity=3)
+
+        IssueReport.objects.create(title="Broken lens", description="-", equipment=self.serial,
+                                   booking=self.booking, reporter=self.user, priority='high')
+        IssueReport.objects.create(title="Leaking roof", description="-",
+                                   studio=Studio.objects.create(name="Studio A", daily_rate=5000))
+
+    def _rows(self, response):
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+
+    def test_maintenance_export_streams_with_equipment_names(self):
+        response = self.client.get('/rentals/reports/maintenance/', {'export': 'csv'})
+        rows = self._rows(response)
+        self.assertEqual(rows[0][4], 'Equipment')
+        by_title = {row[1]: row for row in rows[1:]}
+        self.assertEqual(by_title['Broken lens'][4], 'FX6 - FX6-001')
+        self.assertEqual(by_title['Broken lens'][6], f'Export Co ({self.booking.id})')
+        self.assertEqual(by_title['Leaking roof'][4:6], ['-', 'Studio A'])
+
+        filtered = self._rows(self.client.get('/rentals/reports/maintenance/', {'export': 'csv', 'priority': 'high'}))
+        self.assertEqual(len(filtered), 2)
+
+    def test_booking_export_uses_one_query(self):
+        response = self.client.get('/rentals/reports/', {
+            'export': 'bookings', 'start_date': '2030-02-01', 'end_date': '2030-02-28'
+        })
+        with self.assertNumQueries(1):
+            rows = self._rows(response)
+        self.assertEqual(rows[1][:3], [str(self.booking.id), 'Export Co', 'ยืนยันแล้ว / รอรับของ (Approved)'])
+        self.assertEqual(rows[1][3], '2030-02-01 09:00')
+        self.assertEqual(rows[1][5:], ['3', '2', '6000.00', 'admin'])
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rentals.forms import BookingAdminForm
+from rentals.models import Booking, Equipment, Product, Staff, Studio
+from rentals.services.availability import AvailabilityService
+
+
+class BulkResourceConflictTest(TestCase):
+    def setUp(self):
+        product = Product.objects.create(name="FX6", price=3000, quantity=5)
+        self.serials = [Equipment.objects.create(product=product, serial_number=f"FX6-{i}") for i in range(5)]
+        self.studio = Studio.objects.create(name="Studio A", daily_rate=15000)
+        self.crew = [Staff.objects.create(name=f"Crew {i}", position="cameraman", phone="0800000000") for i in range(3)]
+
+        self.start = timezone.now() + timedelta(days=3)
+        self.end = self.start + timedelta(hours=8)
+        self.existing = Booking.objects.create(customer_name="Blocker", start_time=self.start, end_time=self.end, status='approved')
+        self.existing.equipment.add(*self.serials[:2])
+        self.existing.studios.add(self.studio)
+        self.existing.staff.add(self.crew[0])
+
+    def test_reports_every_conflict_with_one_query_per_resource_type(self):
+        with self.assertNumQueries(3):
+            conflicts = AvailabilityService.check_resource_overlaps(
+                self.start + timedelta(hours=2), self.end + timedelta(hours=2),
+                equipment=self.serials, studios=[self.studio], staff=self.crew
+            )
+        self.assertEqual(
+            sorted((c['field'], c['resource'].pk) for c in conflicts),
+            sorted([('equipment', self.serials[0].pk), ('equipment', self.serials[1].pk),
+                    ('studios', self.studio.pk), ('staff', self.crew[0].pk)])
+        )
+        self.assertTrue(all(c['customer_name'] == "Blocker" for c in conflicts))
+
+    def test_exclude_and_non_overlapping(self):
+        self.assertEqual(AvailabilityService.check_resource_overlaps(
+            self.start, self.end, equipment=self.serials, staff=self.crew, exclude_booking_id=self.existing.pk
+        ), [])
+        self.assertEqual(AvailabilityService.check_resource_overlaps(
+            self.end, self.end + timedelta(hours=1), equipment=self.serials, studios=[self.studio]
+        ), [])
+
+    def test_get_issues_lists_conflicts(self):
+        other = Booking.objects.create(customer_name="Second", start_time=self.start, end_time=self.end, status='draft')
+        other.staff.add(self.crew[0])
+        other.equipment.add(self.serials[1])
+        issues = other.get_issues()
+        self.assertEqual(len(issues), 2)
+        self.assertTrue(any("ติดงานแล้วในช่วงเวลา" in issue for issue in issues))
+
+    def test_admin_form_collects_all_errors(self):
+        form = BookingAdminForm(data={
+            'customer_name': "Form Booking",
+            'start_time_0': timezone.localtime(self.start).strftime('%Y-%m-%d'),
+            'start_time_1': timezone.localtime(self.start).strftime('%H:%M'),
+            'end_time_0': timezone.localtime(self.end).strftime('%Y-%m-%d'),
+            'end_time_1': timezone.localtime(self.end).strftime('%H:%M'),
+            'status': 'approved',
+            'equipment': [e.pk for e in self.serials[:2]],
+            'staff': [self.crew[0].pk],
+        })
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.non_field_errors()), 3)
+
+    def test_admin_approve_blocks_overlapping_drafts(self):
+        drafts = []
+        for name in ("First", "Second"):
+            draft = Booking.objects.create(customer_name=name, start_time=self.start + timedelta(days=1),
+                                           end_time=self.end + timedelta(days=1), status='draft')
+            draft.staff.add(self.crew[1])
+            draft.equipment.add(self.serials[2])
+            drafts.append(draft)
+        blocked = Booking.objects.create(customer_name="Blocked", start_time=self.start, end_time=self.end, status='draft')
+        blocked.studios.add(self.studio)
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.client.post('/admin/rentals/booking/', {
+            'action': 'approve_bookings', '_selected_action': [d.pk for d in drafts] + [blocked.pk],
+        })
+
+        statuses = dict(Booking.objects.filter(pk__in=[d.pk for d in drafts] + [blocked.pk]).values_list('customer_name', 'status'))
+        # อนุมัติทีละรายการภายใต้ Lock: รายการที่สองเห็นรายการแรกเป็นการจองที่ Block แล้ว
+        self.assertEqual(sorted(statuses.values()), ['approved', 'draft', 'draft'])
+        self.assertEqual(statuses["Blocked"], 'draft')
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from rentals.models import Booking, Equipment, Product, Staff, Studio
+from rentals.services.resource_timeline import ResourceTimelineService
+
+
+class ResourceTimelineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('staff', password='pw', is_staff=True)
+        camera = Product.objects.create(name="FX6", price=Decimal('1000.00'), quantity=5)
+        self.serials = [Equipment.objects.create(product=camera, serial_number=f"FX6-00{i}") for i in (2, 1)]
+        self.studio = Studio.objects.create(name="Studio A", daily_rate=5000)
+        self.crew = Staff.objects.create(name="Somchai", position='cameraman', phone='0800000000')
+        self.window_start = timezone.make_aware(datetime(2030, 3, 1))
+        self.window_end = timezone.make_aware(datetime(2030, 4, 1))
+
+        self.bookings = {}
+        for day, status in ((-3, 'approved'), (5, 'draft'), (12, 'expired'), (40, 'approved')):
+            start = self.window_start + timedelta(days=day)
+            booking = Booking.objects.create(customer_name=f"Day {day}", start_time=start, end_time=start + timedelta(days=4),
+                                             status=status, created_by=self.user)
+            booking.equipment.set(self.serials)
+            booking.studios.add(self.studio)
+            booking.staff.add(self.crew)
+            self.bookings[day] = booking
+
+    def test_timeline_in_four_queries(self):
+        with self.assertNumQueries(4):
+            data = ResourceTimelineService.timeline(self.window_start, self.window_end)
+
+        self.assertEqual(data['resources']['equipment'], [
+            [self.serials[1].id, "FX6 - FX6-001"],
+            [self.serials[0].id, "FX6 - FX6-002"],
+        ])
+        self.assertEqual(data['resources']['studios'], [[self.studio.id, "Studio A"]])
+        self.assertEqual(data['resources']['staff'], [[self.crew.id, "Somchai"]])
+
+        # Expired and out-of-window bookings are left out
+        first, second = self.bookings[-3], self.bookings[5]
+        self.assertEqual(data['rows']['studios'], [
+            [self.studio.id, int(first.start_time.timestamp()), int(first.end_time.timestamp()), first.id, 'approved'],
+            [self.studio.id, int(second.start_time.timestamp()), int(second.end_time.timestamp()), second.id, 'draft'],
+        ])
+        self.assertEqual(len(data['rows']['equipment']), 4)
+        self.assertEqual([row[3] for row in data['rows']['staff']], [first.id, second.id])
+
+    def test_api_and_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/rentals/api/timeline/', {'start': '2030-03-01', 'end': '2030-04-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['start'], int(self.window_start.timestamp()))
+        self.assertEqual(len(response.json()['rows']['staff']), 2)
+
+        self.assertEqual(self.client.get('/rentals/api/timeline/', {'start': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get('/rentals/timeline/').status_code, 200)
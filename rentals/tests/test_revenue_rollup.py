@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rentals.models import Booking, BookingItem, DailyRevenueRollup, Product
+from rentals.services.revenue_rollup import RevenueRollupService
+
+
+class RevenueRollupTest(TestCase):
+    def setUp(self):
+        self.camera = Product.objects.create(name="FX6", price=Decimal('2500.00'), quantity=3)
+        self.day = date(2030, 5, 1)
+        self.start = timezone.make_aware(datetime(2030, 5, 1, 9, 0))
+
+    def _booking(self, status='draft', start=None):
+        start = start or self.start
+        booking = Booking.objects.create(customer_name="Rollup", start_time=start, end_time=start + timedelta(days=1), status=status)
+        BookingItem.objects.create(booking=booking, product=self.camera, quantity=1)
+        return booking
+
+    def _row(self, day, status):
+        return DailyRevenueRollup.objects.filter(date=day, status=status).values_list('booking_count', 'revenue').first()
+
+    def test_follows_booking_lifecycle(self):
+        booking = self._booking()
+        self.assertEqual(self._row(self.day, 'draft'), (1, Decimal('2500.00')))
+
+        booking.status = 'approved'
+        booking.save()
+        self.assertIsNone(self._row(self.day, 'draft'))
+        self.assertEqual(self._row(self.day, 'approved'), (1, Decimal('2500.00')))
+
+        BookingItem.objects.create(booking=booking, product=self.camera, quantity=1)
+        self.assertEqual(self._row(self.day, 'approved'), (1, Decimal('5000.00')))
+
+        booking.start_time += timedelta(days=2)
+        booking.end_time += timedelta(days=2)
+        booking.save()
+        self.assertIsNone(self._row(self.day, 'approved'))
+        self.assertEqual(self._row(self.day + timedelta(days=2), 'approved'), (1, Decimal('5000.00')))
+        self.assertEqual(RevenueRollupService.verify(), [])
+
+        booking.delete()
+        self.assertFalse(DailyRevenueRollup.objects.exists())
+
+    def test_daily_revenue_is_one_range_query(self):
+        self._booking('approved')
+        self._booking('completed', start=self.start + timedelta(days=2))
+        self._booking('draft', start=self.start + timedelta(days=2))
+
+        with self.assertNumQueries(1):
+            series = RevenueRollupService.get_daily_revenue(self.day, self.day + timedelta(days=3))
+        self.assertEqual([revenue for _, revenue in series], [2500.0, 0, 2500.0, 0])
+
+    def test_rebuild_command_repairs_bulk_updates(self):
+        booking = self._booking('approved')
+        Booking.objects.filter(pk=booking.pk).update(status='completed')
+
+        out = StringIO()
+        call_command('rebuild_revenue_rollup', '--verify-only', stdout=out)
+        self.assertIn('2 mismatching rows', out.getvalue())
+
+        call_command('rebuild_revenue_rollup', stdout=out)
+        self.assertEqual(self._row(self.day, 'completed'), (1, Decimal('2500.00')))
+        self.assertEqual(RevenueRollupService.verify(), [])
+
+
+class MonthlyRevenueReportTest(TestCase):
+    def setUp(self):
+        camera = Product.objects.create(name="FX6", price=Decimal('1000.00'), quantity=5)
+        for day, status in [(date(2030, 1, 31), 'approved'), (date(2030, 1, 5), 'completed'),
+                            (date(2030, 3, 1), 'approved'), (date(2030, 3, 2), 'draft')]:
+            start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+            booking = Booking.objects.create(customer_name="Report", start_time=start, end_time=start + timedelta(days=1), status=status)
+            BookingItem.objects.create(booking=booking, product=camera, quantity=1)
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+
+    def test_months_in_one_query_with_gaps_filled(self):
+        with self.assertNumQueries(1):
+            months = RevenueRollupService.get_monthly_revenue(date(2030, 1, 15), date(2030, 4, 10))
+        self.assertEqual(
+            [(row['month'], row['revenue'], row['count']) for row in months],
+            [(date(2030, 1, 1), Decimal('2000.00'), 2), (date(2030, 2, 1), 0, 0),
+             (date(2030, 3, 1), Decimal('1000.00'), 1), (date(2030, 4, 1), 0, 0)]
+        )
+
+    def test_html_and_csv_share_the_series(self):
+        self.client.force_login(self.user)
+        params = {'start_date': '2030-01-01', 'end_date': '2030-03-31'}
+        response = self.client.get('/rentals/reports/', params)
+        self.assertEqual([row['count'] for row in response.context['monthly_data']], [2, 0, 1])
+        self.assertEqual({row['status']: row['total'] for row in response.context['status_counts']},
+                         {'approved': 2, 'completed': 1, 'draft': 1})
+
+        response = self.client.get('/rentals/reports/', {**params, 'export': 'csv'})
+        rows = [line.split(',') for line in b''.join(response.streaming_content).decode().splitlines()[1:]]
+        self.assertEqual(
+            [(month, Decimal(revenue), int(count)) for month, revenue, count in rows],
+            [('January 2030', Decimal('2000'), 2), ('February 2030', 0, 0), ('March 2030', Decimal('1000'), 1)]
+        )
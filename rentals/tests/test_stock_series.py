@@ -0,0 +1,66 @@
+import csv
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from rentals.models import Booking, BookingItem, Product
+from rentals.services.stock_series import StockSeriesService
+
+
+class StockSeriesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(self.user)
+        self.camera = Product.objects.create(name="FX6", category='camera', price=Decimal('1000.00'), quantity=3)
+        self.light = Product.objects.create(name="Aputure", category='lighting', price=Decimal('500.00'), quantity=2)
+        self.start_date = date(2030, 1, 1)
+        start = timezone.make_aware(datetime(2030, 1, 2, 10))
+
+        booking = Booking.objects.create(customer_name="A", start_time=start, end_time=start + timedelta(days=2),
+                                         status='approved', created_by=self.user)
+        BookingItem.objects.create(booking=booking, product=self.camera, quantity=2)
+        later = Booking.objects.create(customer_name="B", start_time=start + timedelta(days=60),
+                                       end_time=start + timedelta(days=61), status='draft', created_by=self.user)
+        BookingItem.objects.create(booking=later, product=self.light, quantity=2)
+
+    def test_quarter_in_two_queries(self):
+        end_date = self.start_date + timedelta(days=StockSeriesService.DEFAULT_DAYS - 1)
+        products = list(Product.objects.order_by('name'))
+        # ProductDayLoad range + cart holds
+        with self.assertNumQueries(2):
+            series = StockSeriesService.series(products, self.start_date, end_date)
+
+        (light, light_free), (camera, camera_free) = series
+        self.assertEqual(len(camera_free), 92)
+        self.assertEqual(camera_free[:5], [3, 1, 1, 1, 3])
+        self.assertEqual(light_free[60:63], [2, 0, 0])
+
+    def test_parse_range(self):
+        start, end = StockSeriesService.parse_range('2030-01-01', None)
+        self.assertEqual((end - start).days + 1, StockSeriesService.DEFAULT_DAYS)
+        start, end = StockSeriesService.parse_range('2030-01-01', '2040-01-01')
+        self.assertEqual((end - start).days + 1, StockSeriesService.MAX_DAYS)
+        for bad in (('2030-02-01', '2030-01-01'), ('soon', None)):
+            with self.assertRaises(ValueError):
+                StockSeriesService.parse_range(*bad)
+
+    def test_json_csv_and_page(self):
+        params = {'start_date': '2030-01-01', 'end_date': '2030-01-07'}
+        data = self.client.get('/rentals/reports/stock/', {**params, 'format': 'json'}).json()
+        self.assertEqual(data['days'], 7)
+        self.assertEqual(data['products'][0], [self.camera.id, "FX6", 3, [3, 1, 1, 1, 3, 3, 3]])
+
+        response = self.client.get('/rentals/reports/stock/', {**params, 'export': 'csv'})
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:5], ['ID', 'Product', 'Category', 'Total', '2030-01-01'])
+        self.assertEqual(rows[1], [str(self.camera.id), 'FX6', 'camera', '3', '3', '1', '1', '1', '3', '3', '3'])
+
+        response = self.client.get('/rentals/reports/stock/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['dates']), 7)
+
+        response = self.client.get('/rentals/reports/stock/', {'start_date': 'soon', 'format': 'json'})
+        self.assertEqual(response.status_code, 400)
@@ -15,10 +15,14 @@ urlpatterns = [
     path('portfolio/', public_views.portfolio, name='portfolio'),
     path('faq/', public_views.faq, name='faq'),
     path('contact/', public_views.contact, name='contact'),
+    path('api/availability/calendar/', public_views.availability_calendar_api, name='availability_calendar_api'),
+    path('api/availability/slots/', public_views.available_slots_api, name='available_slots_api'),
     
     # Cart & Checkout
     path('cart/add/<int:product_id>/', public_views.cart_add, name='cart_add'),
     path('cart/remove/<int:product_id>/', public_views.cart_remove, name='cart_remove'),
+    path('cart/add-package/<int:package_id>/', public_views.cart_add_package, name='cart_add_package'),
+    path('cart/remove-package/<int:package_id>/', public_views.cart_remove_package, name='cart_remove_package'),
     path('cart/', public_views.cart_detail, name='cart_detail'),
     path('checkout/', public_views.checkout, name='checkout'),
 
@@ -36,12 +40,17 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),  # Keep legacy for compatibility
     path('calendar/', views.calendar_view, name='calendar'),
     path('api/bookings/', views.booking_api, name='booking_api'),
+    path('timeline/', views.resource_timeline, name='resource_timeline'),
+    path('api/timeline/', views.resource_timeline_api, name='resource_timeline_api'),
+    path('ics/<str:kind>/<int:pk>.ics', views.ics_feed, name='ics_feed'),
+    path('api/activity/', views.activity_feed_api, name='activity_feed_api'),
     path('api/notifications/', views.get_notifications, name='get_notifications'),
     path('api/notifications/read/<int:notification_id>/', views.mark_notification_read, name='mark_notification_read'),
     path('api/notifications/read/all/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
 
     path('reports/', reports_views.reports_dashboard, name='reports_dashboard'),
     path('reports/maintenance/', reports_views.reports_maintenance, name='reports_maintenance'),
+    path('reports/stock/', reports_views.reports_stock, name='reports_stock'),
     path('staff/quotation/<int:booking_id>/', views.staff_quotation, name='staff_quotation'),
     path('staff/work_order/<int:booking_id>/', views.staff_work_order, name='staff_work_order'),
     path('inventory/', views.inventory_dashboard, name='inventory_dashboard'),
@@ -1,14 +1,21 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.admin.views.decorators import staff_member_required
-from django.contrib.auth.models import User
-from django.db.models import Count, Q, Sum
+from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
 from simple_history.models import HistoricalRecords  # สำหรับ Audit Trailt
-from .models import Booking, Equipment, Studio, Staff, Notification, Product, BookingItem, PackageItem
-from django.http import JsonResponse
+from .models import Booking, Notification, Product, PackageItem
+from .services.dates import on_local_day
+from .services.activity_feed import ActivityFeedService
+from .services.calendar_feed import DEFAULT_COLOR, STATUS_COLORS, CalendarFeedService
+from .services.dashboard_snapshot import DashboardSnapshot
+from .services.ics_feed import FEED_RESOURCES, IcsFeedService
+from .services.inventory_ledger import InventoryLedgerService
+from .services.resource_timeline import ResourceTimelineService
+from django.http import Http404, HttpResponse, JsonResponse
 from django.views.decorators.http import require_POST
 from django.utils.timesince import timesince
+from django.utils.cache import get_conditional_response, patch_cache_control
 
 
 
@@ -19,79 +26,37 @@ def dashboard_callback(request, context):
     """
     import logging
     logger = logging.getLogger(__name__)
-    logger.warning("🎯 Dashboard callback called!")
+    logger.debug("🎯 Dashboard callback called!")
     
-    today = timezone.now().date()
-    logger.warning(f"Today's date: {today}")
-    
-    # สถิติการจอง
-    bookings_today = Booking.objects.filter(
-        start_time__date=today
-    ).count()
-    
-    bookings_pending = Booking.objects.filter(
-        status='draft'
-    ).count()
-    
-    bookings_this_month = Booking.objects.filter(
-        start_time__year=today.year,
-        start_time__month=today.month
-    ).count()
-    
-    # สถิติอุปกรณ์ (ใช้ Product model)
-    equipment_total = Product.objects.count()
-    equipment_available = Product.objects.filter(
-        is_active=True,
-        quantity__gt=0
-    ).count()
-    
-    # สถิติพนักงาน (ใช้ User model)
-    staff_active = User.objects.filter(is_staff=True, is_active=True).count()
+    stats_data = DashboardSnapshot.get_stats()
+    today = stats_data['today']
+    logger.debug("Today's date: %s", today)
     
     # รายการจองล่าสุด (5 รายการ)
     recent_bookings = Booking.objects.select_related(
         'created_by'
-    ).order_by('-created_at')[:5]
-    
-    # คำนวณรายได้เดือนนี้
-    revenue_this_month = 0
-    for booking in Booking.objects.filter(
-        start_time__year=today.year,
-        start_time__month=today.month,
-        status__in=['approved', 'completed']
-    ):
-        revenue_this_month += booking.calculate_total_price()
+    ).with_totals().order_by('-created_at')[:5]
     
+    # อุปกรณ์ใช้ Product model, พนักงานใช้ User model
     stats = {
-        'bookings_today': bookings_today,
-        'bookings_pending': bookings_pending,
-        'bookings_this_month': bookings_this_month,
-        'equipment_available': equipment_available,
-        'equipment_total': equipment_total,
-        'staff_active': staff_active,
-        'revenue_this_month': revenue_this_month,
+        'bookings_today': stats_data['bookings_today'],
+        'bookings_pending': stats_data['bookings_pending'],
+        'bookings_this_month': stats_data['bookings_this_month'],
+        'equipment_available': stats_data['product_available'],
+        'equipment_total': stats_data['product_total'],
+        'staff_active': stats_data['user_staff_active'],
+        'revenue_this_month': stats_data['revenue_this_month'],
     }
 
     # --- Chart Data Calculation (New) ---
-    # 1. 7-Day Revenue Trend
-    days = []
-    revenue_trend = []
-    for i in range(6, -1, -1):
-        d = today - timedelta(days=i)
-        days.append(d.strftime('%d %b')) # e.g. "16 Jan"
-        daily_rev = 0
-        # Naive calculation: sum of bookings starting on that day
-        for b in Booking.objects.filter(start_time__date=d, status__in=['approved', 'completed']):
-             daily_rev += float(b.calculate_total_price())
-        revenue_trend.append(daily_rev)
+    # 1. 7-Day Revenue Trend (sum of bookings starting on that day)
+    days = [d.strftime('%d %b') for d, _ in stats_data['daily_revenue']] # e.g. "16 Jan"
+    revenue_trend = [revenue for _, revenue in stats_data['daily_revenue']]
     
     # 2. Status Distribution
     status_counts = {
-        'draft': Booking.objects.filter(status='draft').count(),
-        'approved': Booking.objects.filter(status='approved').count(),
-        'completed': Booking.objects.filter(status='completed').count(),
-        'active': Booking.objects.filter(status='active').count(),
-        'problem': Booking.objects.filter(status='problem').count(),
+        status: stats_data['status_counts'][status]
+        for status in ('draft', 'approved', 'completed', 'active', 'problem')
     }
     
     # Thai Date for Header
@@ -109,8 +74,7 @@ def dashboard_callback(request, context):
     })
     # ------------------------------------
     
-    logger.warning(f"📊 Stats: {stats}")
-    logger.warning(f"📅 Recent bookings count: {len(list(recent_bookings))}")
+    logger.debug("📊 Stats: %s", stats)
     
     # Add data to context
     context.update({
@@ -118,7 +82,6 @@ def dashboard_callback(request, context):
         'recent_bookings': recent_bookings,
     })
     
-    logger.warning(f"✅ Context updated. Keys: {context.keys()}")
     return context
 
 
@@ -128,45 +91,17 @@ def dashboard(request):
     Dashboard หน้าหลักของ MCOT Rental System
     แสดงภาพรวม สถิติ และ Quick Actions
     """
-    today = timezone.now().date()
-    
-    # สถิติการจอง
-    bookings_today = Booking.objects.filter(
-        start_time__date=today
-    ).count()
-    
-    bookings_pending = Booking.objects.filter(
-        status='draft'
-    ).count()
-    
-    bookings_this_month = Booking.objects.filter(
-        start_time__year=today.year,
-        start_time__month=today.month
-    ).count()
-    
-    # สถิติอุปกรณ์
-    equipment_total = Equipment.objects.count()
-    equipment_available = Equipment.objects.filter(
-        status='available'
-    ).count()
-    equipment_maintenance = Equipment.objects.filter(
-        status='maintenance'
-    ).count()
-    
-    # สถิติสตูดิโอ
-    studio_total = Studio.objects.count()
-    
-    # สถิติพนักงาน
-    staff_active = Staff.objects.filter(is_active=True).count()
+    stats_data = DashboardSnapshot.get_stats()
+    today = stats_data['today']
     
     # รายการจองล่าสุด (5 รายการ)
     recent_bookings = Booking.objects.select_related().prefetch_related(
         'equipment', 'studios', 'staff'
-    ).order_by('-id')[:5]
+    ).with_totals().order_by('-id')[:5]
     
     # Alerts: อุปกรณ์ที่ต้องคืนวันนี้
     ending_today = Booking.objects.filter(
-        end_time__date=today,
+        on_local_day('end_time', today),
         status='approved'
     ).prefetch_related('equipment').order_by('end_time')
     
@@ -175,33 +110,21 @@ def dashboard(request):
         status='draft'
     ).prefetch_related('equipment', 'studios').order_by('-id')[:5]
     
-    # คำนวณรายได้เดือนนี้ (ประมาณการ)
-    revenue_this_month = 0
-    for booking in Booking.objects.filter(
-        start_time__year=today.year,
-        start_time__month=today.month,
-        status__in=['approved', 'completed']
-    ):
-        revenue_this_month += booking.calculate_total_price()
-    
     context = {
         'today': today,
         'stats': {
-            'bookings_today': bookings_today,
-            'bookings_pending': bookings_pending,
-            'bookings_this_month': bookings_this_month,
-            'equipment_available': equipment_available,
-            'equipment_total': equipment_total,
-            'equipment_maintenance': equipment_maintenance,
-            'studio_total': studio_total,
-            'staff_active': staff_active,
-            'revenue_this_month': revenue_this_month,
+            key: stats_data[key]
+            for key in (
+                'bookings_today', 'bookings_pending', 'bookings_this_month',
+                'equipment_available', 'equipment_total', 'equipment_maintenance',
+                'studio_total', 'staff_active', 'revenue_this_month',
+            )
         },
         'recent_bookings': recent_bookings,
         'ending_today': ending_today,
         'pending_bookings': pending_bookings,
-        'equipment_total': equipment_total, # Pass directly to debug
-        'equipment_available': equipment_available,
+        'equipment_total': stats_data['equipment_total'], # Pass directly to debug
+        'equipment_available': stats_data['equipment_available'],
     }
     
     return render(request, 'rentals/dashboard.html', context)
@@ -217,47 +140,25 @@ def calendar_view(request):
 def booking_api(request):
     """
     API สำหรับส่งข้อมูลการจองให้ FullCalendar
+    GET ?start=...&end=... (FullCalendar ส่งช่วงที่แสดงอยู่มาให้เอง)
+    - ส่งเฉพาะการจองที่ซ้อนทับช่วงนั้น
+    - รองรับ If-None-Match: ไม่มีอะไรเปลี่ยน -> 304 (Query เดียว)
     """
-    from django.http import JsonResponse
-    
-    events = []
-    bookings = Booking.objects.all()
-    
-    for booking in bookings:
-        # Determine color based on status
-        color = '#3788d8' # Default blue
-        if booking.status == 'approved':
-            color = '#28a745' # Green
-        elif booking.status == 'draft':
-            color = '#ffc107' # Yellow/Orange for draft
-        elif booking.status == 'completed':
-            color = '#6c757d' # Gray
-            
-        # Get creator name (fallback to username if first_name is empty)
-        creator_name = 'Unknown'
-        if booking.created_by:
-            creator_name = booking.created_by.first_name or booking.created_by.username
-            
-        # ใช้ items.count() ถ้ามี หรือ equipment.count() ถ้ายังไม่ได้ใช้ BookingItem
-        item_count = booking.items.count() or booking.equipment.count()
-        title = f"{booking.customer_name} ({item_count} รายการ)"
-        if booking.created_by:
-             title += f" [โดย: {creator_name}]"
-            
-        events.append({
-            'title': title,
-            'start': booking.start_time.isoformat(),
-            'end': booking.end_time.isoformat(),
-            'url': f"/admin/rentals/booking/{booking.id}/change/",
-            'backgroundColor': color,
-            'borderColor': color,
-            'extendedProps': {
-                'creator': creator_name
-            }
-        })
-        
-    return JsonResponse(events, safe=False, json_dumps_params={'ensure_ascii': False})
+    try:
+        start, end = CalendarFeedService.parse_window(request.GET.get('start'), request.GET.get('end'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid parameters'}, status=400)
 
+    etag = CalendarFeedService.etag(start, end)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(
+            CalendarFeedService.events(start, end), safe=False, json_dumps_params={'ensure_ascii': False}
+        )
+    response['ETag'] = etag
+    # ให้ Browser ถามทุกครั้ง (แต่ได้ 304 ถ้าไม่มีการเปลี่ยนแปลง)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 @staff_member_required
 def staff_quotation(request, booking_id):
@@ -388,6 +289,91 @@ def staff_work_order(request, booking_id):
     
     return render(request, 'rentals/staff/work_order.html', context)
 
+@staff_member_required
+def resource_timeline(request):
+    """
+    หน้าตารางการใช้งานรายทรัพยากร (อุปกรณ์รายชิ้น / สตูดิโอ / พนักงาน) รายเดือน
+    """
+    return render(request, 'rentals/resource_timeline.html', {
+        'status_colors': {**STATUS_COLORS, 'default': DEFAULT_COLOR},
+    })
+
+@staff_member_required
+def resource_timeline_api(request):
+    """
+    API ข้อมูล Timeline รายทรัพยากร
+    GET ?start=...&end=... (ค่าเริ่มต้นเหมือน booking_api)
+    rows แต่ละแถว: [resource_id, start, end, booking_id, status] (เวลาเป็น epoch วินาที)
+    """
+    try:
+        start, end = CalendarFeedService.parse_window(request.GET.get('start'), request.GET.get('end'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid parameters'}, status=400)
+
+    return JsonResponse(ResourceTimelineService.timeline(start, end), json_dumps_params={'ensure_ascii': False})
+
+# --- iCalendar Feed (ไม่ต้อง Login: ใช้ key ที่ลงลายเซ็นไว้ใน URL) ---
+
+def ics_feed(request, kind, pk):
+    """
+    ปฏิทิน .ics ของพนักงาน / สตูดิโอ สำหรับเพิ่มในแอปปฏิทินบนมือถือ
+    GET /rentals/ics/<staff|studio>/<id>.ics?key=...[&since=<sync token>]
+    - ETag แบบ Strong -> ไม่มีอะไรเปลี่ยนได้ 304
+    - X-Sync-Token: ส่งกลับมาเป็น ?since= ครั้งถัดไปเพื่อรับเฉพาะที่เปลี่ยน
+    """
+    if kind not in FEED_RESOURCES or not IcsFeedService.check_key(kind, pk, request.GET.get('key')):
+        raise Http404
+    resource = get_object_or_404(FEED_RESOURCES[kind][0], pk=pk)
+
+    since = request.GET.get('since') or None
+    if since is not None:
+        try:
+            since = IcsFeedService.parse_sync_token(since)
+        except ValueError:
+            return HttpResponse('Invalid sync token', status=400, content_type='text/plain; charset=utf-8')
+
+    start, end = IcsFeedService.window()
+    token = IcsFeedService.sync_token()
+    etag = IcsFeedService.etag(kind, resource, start, end, since=since, token=token)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            IcsFeedService.calendar(kind, resource, start, end, since=since),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'inline; filename="{kind}-{pk}.ics"'
+    response['ETag'] = etag
+    response['X-Sync-Token'] = token
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+# --- Activity Feed API ---
+
+@staff_member_required
+def activity_feed_api(request):
+    """
+    API โหลดประวัติการใช้งานระบบเพิ่ม (Load more) แบบ Keyset Pagination
+    GET ?before=<cursor>&limit=10
+    """
+    try:
+        before = int(request.GET['before']) if request.GET.get('before') else None
+        limit = int(request.GET.get('limit', ActivityFeedService.PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid parameters'}, status=400)
+
+    entries, next_cursor = ActivityFeedService.page(before, limit)
+    return JsonResponse({
+        'items': [
+            {
+                **{key: entry[key] for key in ('id', 'username', 'object_repr', 'message', 'is_addition', 'is_change', 'is_deletion')},
+                'action_time': entry['action_time'].isoformat(),
+                'time_ago': timesince(entry['action_time']),
+            }
+            for entry in entries
+        ],
+        'next_cursor': next_cursor,
+    })
+
 # --- Notification API ---
 
 def get_notifications(request):
@@ -434,6 +420,10 @@ def mark_all_notifications_read(request):
 
 @staff_member_required
 def inventory_dashboard(request):
+    """
+    แดชบอร์ดคลังสินค้า: คงเหลือของสินค้าทุกตัวในวันที่เลือก
+    GET ?date=YYYY-MM-DD&days=7 -> แสดงคงเหลือรายวันต่อเนื่องหลายวัน (Query เท่าเดิม)
+    """
     # 1. Determine Selected Date
     date_str = request.GET.get('date')
     if date_str:
@@ -444,93 +434,29 @@ def inventory_dashboard(request):
     else:
         target_date = timezone.localtime().date()
 
-    # Create time range for the selected date (Start of day to End of day)
-    target_start = timezone.make_aware(datetime.combine(target_date, datetime.min.time()))
-    target_end = timezone.make_aware(datetime.combine(target_date, datetime.max.time()))
+    try:
+        days = max(1, min(int(request.GET.get('days', 1)), InventoryLedgerService.MAX_DAYS))
+    except ValueError:
+        days = 1
 
     products = Product.objects.filter(is_active=True).order_by('category', 'name')
-    inventory_data = []
-
-    for product in products:
-        # Calculate Ledger (Keep showing all future/recent active logs for context, or filter? 
-        # Requirement implies "check stock for that day", so ledger can remain "recent view" or be filtered.
-        # For now, let's keep ledger showing *relevant* activity around that time?)
-        # Actually, let's keep the ledger as a general "what is going on" view, 
-        # but the AVAILABLE COUNT must be specific to the date.
-        
-        ledger = []
-        
-        # Find bookings relevant to this product (for Ledger)
-        booking_items = BookingItem.objects.filter(
-            product=product,
-            booking__status__in=['approved', 'active', 'pending_deposit', 'quotation_sent'], 
-            booking__start_time__lte=target_end,
-            booking__end_time__gte=target_start
-        ).select_related('booking')
-
-        for bi in booking_items:
-            # Check assigned equipment (Serial Numbers)
-            assigned_equipment = bi.booking.equipment.filter(product=product)
-            if assigned_equipment.exists():
-                detail_text = f"Assigned: {', '.join([e.serial_number for e in assigned_equipment])}"
-                qty = assigned_equipment.count()
-            else:
-                detail_text = "Requested (Pending Assignment)"
-                qty = bi.quantity
-
-            # Format Date Range to show temporary usage (Thai)
-            thai_months = [
-                "", "ม.ค.", "ก.พ.", "มี.ค.", "เม.ย.", "พ.ค.", "มิ.ย.",
-                "ก.ค.", "ส.ค.", "ก.ย.", "ต.ค.", "พ.ย.", "ธ.ค."
-            ]
-            
-            def to_thai_date(dt):
-                return f"{dt.day} {thai_months[dt.month]}"
-
-            start_str = to_thai_date(bi.booking.start_time)
-            end_str = to_thai_date(bi.booking.end_time)
-            date_display = f"{start_str} - {end_str}" if start_str != end_str else start_str
-
-            ledger.append({
-                'date': bi.booking.start_time,
-                'booking': bi.booking,
-                'date': bi.booking.start_time,
-                'booking': bi.booking,
-                'date_display': date_display, # Renamed to fix rendering
-                # Combined string to avoid template parsing issues
-                'entry_title': f"{bi.booking.customer_name}",
-                'change': -qty,
-                'detail': detail_text,
-                'package_name': None 
-            })
+    inventory_data = InventoryLedgerService.build(products, target_date, days)
 
-        # Sort ledger by date
-        ledger.sort(key=lambda x: x['date'])
-
-        # --- KEY CHANGE: Calculate Available Stock for TARGET DATE ---
-        from django.db.models import Sum
-        booked_qty_result = BookingItem.objects.filter(
-             product=product,
-             booking__status__in=['approved', 'active', 'pending_deposit', 'quotation_sent'], # Include pending to be safe
-             # Overlap Logic: Booking Start <= Target End AND Booking End >= Target Start
-             booking__start_time__lte=target_end,
-             booking__end_time__gte=target_start
-        ).aggregate(Sum('quantity'))
-        
-        booked_qty = booked_qty_result['quantity__sum'] or 0
-        available_stock = max(0, product.quantity - booked_qty)
-
-        inventory_data.append({
-            'product': product,
-            'total_stock': product.quantity,
-            'available_stock': available_stock, 
-            'ledger': ledger
-        })
+    last_date = target_date + timedelta(days=days - 1)
+    pretty_date = target_date.strftime('%d %B %Y')
+    if days > 1:
+        pretty_date = f"{pretty_date} - {last_date.strftime('%d %B %Y')}"
 
     return render(request, 'admin/inventory_dashboard.html', {
         'inventory': inventory_data,
         'title': 'Inventory Dashboard',
         'selected_date': target_date.strftime('%Y-%m-%d'),
-        'pretty_date': target_date.strftime('%d %B %Y')
+        'pretty_date': pretty_date,
+        'days': days,
+        # ตัวเลือกสูงสุด = ช่วงยาวสุดที่ Ledger รับได้ (ค่าที่เกินถูกตัดไว้ข้างบนแล้ว)
+        'day_options': [option for option in (1, 7, 14) if option < InventoryLedgerService.MAX_DAYS] + [InventoryLedgerService.MAX_DAYS],
+        # แสดงคอลัมน์รายวันเฉพาะโหมดหลายวัน
+        'day_columns': [target_date + timedelta(days=i) for i in range(days)] if days > 1 else [],
+        'table_columns': 5 + (days if days > 1 else 0),
     })
 